@@ -0,0 +1,117 @@
+"""Benchmark the full SwarmCoordinator pipeline offline.
+
+Runs on synthetic PDFs with the fake LLM and embedding backends and prints
+per-stage latencies (from the run trace) and document/page throughput.
+
+    python -m scripts.benchmark_pipeline --documents 4 --pages 20 --concurrency 2
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import fitz  # PyMuPDF
+
+from src.config import Config
+from src.utils.executor import LoopLagMonitor
+from src.utils.tracing import Tracer, trace_span
+
+HEADINGS = ["Overview", "Requirements", "Validation Rules", "Workflow", "Integration", "Reporting"]
+WORDS = (
+    "system user must shall validate record field required process approval data "
+    "report member claim provider status update workflow rule account date value"
+).split()
+
+
+def make_synthetic_pdf(path: Path, pages: int, seed: int = 0) -> Path:
+    """Write a PDF with headings and requirement-style paragraphs on every page"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 72
+        page.insert_text((72, y), f"{page_num + 1}. {rng.choice(HEADINGS)}", fontsize=16)
+        y += 30
+        for _ in range(6):
+            sentence = " ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + "."
+            page.insert_text((72, y), sentence, fontsize=10)
+            y += 16
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+async def run_benchmark(pdf_paths: List[Path], concurrency: int, cache_dir: str) -> dict:
+    # Imported late so the backend overrides below are in place first
+    from src.coordinator import SwarmCoordinator
+
+    tracer = Tracer(run_id=f"benchmark-{int(time.time())}")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process(pdf_path: Path):
+        async with semaphore:
+            coordinator = SwarmCoordinator()
+            coordinator.document_processor.cache_dir = cache_dir
+            return await coordinator.process_document(str(pdf_path))
+
+    start = time.perf_counter()
+    with tracer.activate(), trace_span("benchmark", documents=len(pdf_paths)):
+        async with LoopLagMonitor() as loop_monitor:
+            results = await asyncio.gather(*(process(path) for path in pdf_paths))
+    elapsed = time.perf_counter() - start
+
+    pages = 0
+    for path in pdf_paths:
+        with fitz.open(path) as doc:
+            pages += len(doc)
+    return {
+        "tracer": tracer,
+        "results": results,
+        "elapsed": elapsed,
+        "documents_per_s": len(pdf_paths) / elapsed,
+        "pages_per_s": pages / elapsed,
+        "loop_lag": loop_monitor.stats()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+    parser.add_argument("--documents", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--llm-latency", type=float, default=Config.FAKE_LLM_LATENCY["mean"],
+                        help="Mean fake LLM latency in seconds")
+    parser.add_argument("--warm", action="store_true",
+                        help="Run twice and report the second run, with vector stores cached")
+    args = parser.parse_args()
+
+    Config.LLM_BACKEND = "fake"
+    Config.EMBEDDING_BACKEND = "fake"
+    Config.FAKE_LLM_LATENCY = dict(Config.FAKE_LLM_LATENCY, mean=args.llm_latency)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_paths = [
+            make_synthetic_pdf(Path(work_dir) / f"synthetic_{i}.pdf", args.pages, seed=i)
+            for i in range(args.documents)
+        ]
+        cache_dir = str(Path(work_dir) / "cache")
+        Path(cache_dir).mkdir()
+        stats = asyncio.run(run_benchmark(pdf_paths, args.concurrency, cache_dir))
+        if args.warm:
+            stats = asyncio.run(run_benchmark(pdf_paths, args.concurrency, cache_dir))
+
+    print(stats["tracer"].format_summary())
+    print(
+        f"\n{args.documents} documents x {args.pages} pages, concurrency {args.concurrency}: "
+        f"{stats['elapsed']:.2f}s, {stats['documents_per_s']:.2f} docs/s, "
+        f"{stats['pages_per_s']:.1f} pages/s"
+    )
+    lag = stats["loop_lag"]
+    print(f"Event loop lag: mean {lag['mean_lag_ms']} ms, max {lag['max_lag_ms']} ms, {lag['stalls']} stalls")
+
+
+if __name__ == "__main__":
+    main()
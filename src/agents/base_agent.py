@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
 from langchain_anthropic import ChatAnthropic
 from ..config import Config
+from ..fake_backends import create_fake_chat_model
+from ..utils.tracing import trace_span
+from ..utils.accounting import extract_usage, record_usage
 import logging
 import time
-from typing import Dict, List
+from typing import Callable, Dict, List
 
 logger = logging.getLogger(__name__)
 
@@ -13,12 +16,15 @@ class BaseAgent(ABC):
         logger.info(f"Initializing {agent_name}...")
         
         # Initialize Claude
-        self.claude = ChatAnthropic(
-            model_name=Config.CLAUDE_MODEL,
-            temperature=0.3,
-            max_tokens=4096,
-            anthropic_api_key=Config.ANTHROPIC_API_KEY
-        )
+        if Config.LLM_BACKEND == "fake":
+            self.claude = create_fake_chat_model(agent_name)
+        else:
+            self.claude = ChatAnthropic(
+                model_name=Config.CLAUDE_MODEL,
+                temperature=0.3,
+                max_tokens=4096,
+                anthropic_api_key=Config.ANTHROPIC_API_KEY
+            )
         
         self.token_limit = 100000  # Claude's context window
         self.chunk_overlap_tokens = 500
@@ -45,8 +51,23 @@ class BaseAgent(ABC):
             
             for chunk in user_prompt_chunks:
                 claude_messages[1]["content"] = chunk
-                claude_response = await self.claude.agenerate([claude_messages])
-                claude_response_parts.append(claude_response.generations[0][0].text)
+                with trace_span(f"llm.{self.name}", chunks=1) as span:
+                    call_start = time.perf_counter()
+                    claude_response = await self.claude.agenerate([claude_messages])
+                    latency = time.perf_counter() - call_start
+                    text = claude_response.generations[0][0].text
+                    
+                    # Prefer provider-reported usage; fall back to the word-count estimate
+                    reported = extract_usage(claude_response)
+                    usage = reported or (
+                        int(self._estimate_tokens(system_prompt + chunk)),
+                        int(self._estimate_tokens(text))
+                    )
+                    record_usage(self.name, usage[0], usage[1], latency, estimated=reported is None)
+                    span.set("llm_calls", 1)
+                    span.set("tokens_in", usage[0])
+                    span.set("tokens_out", usage[1])
+                claude_response_parts.append(text)
             
             responses['claude'] = "\n".join(claude_response_parts)
             elapsed_time = time.time() - start_time
@@ -57,6 +78,72 @@ class BaseAgent(ABC):
         
         return responses
     
+    async def stream_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        should_stop: Callable[[str], bool]
+    ) -> str:
+        """Stream one Claude response, stopping once should_stop(text_piece) is true.
+
+        Unlike generate_responses the prompt is not split, and errors are
+        raised so execute_with_retry can retry the call.
+        """
+        messages = [
+            {"role": "assistant", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        parts = []
+        prompt_tokens = completion_tokens = None
+        stopped_early = False
+        
+        with trace_span(f"llm.{self.name}", chunks=1) as span:
+            call_start = time.perf_counter()
+            stream = self.claude.astream(messages)
+            try:
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage_metadata", None)
+                    if usage:
+                        prompt_tokens = (prompt_tokens or 0) + int(usage.get("input_tokens", 0))
+                        completion_tokens = (completion_tokens or 0) + int(usage.get("output_tokens", 0))
+                    text = self._chunk_text(chunk)
+                    parts.append(text)
+                    if text and should_stop(text):
+                        stopped_early = True
+                        break
+            except Exception as e:
+                logger.error(f"{self.name}: Claude streaming error: {str(e)}")
+                raise
+            finally:
+                await stream.aclose()
+            latency = time.perf_counter() - call_start
+            text = "".join(parts)
+            
+            # Usage arrives with the final chunk, so it is missing when we stop early
+            estimated = stopped_early or prompt_tokens is None or not completion_tokens
+            if estimated:
+                prompt_tokens = prompt_tokens or int(self._estimate_tokens(system_prompt + user_prompt))
+                completion_tokens = int(self._estimate_tokens(text))
+            record_usage(self.name, prompt_tokens, completion_tokens, latency, estimated=estimated)
+            span.set("llm_calls", 1)
+            span.set("tokens_in", prompt_tokens)
+            span.set("tokens_out", completion_tokens)
+            span.set("stopped_early", stopped_early)
+        
+        logger.info(f"{self.name}: Claude response streamed in {latency:.2f} seconds")
+        return text
+    
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        """Text of a streamed message chunk (content may be a list of blocks)"""
+        content = getattr(chunk, "content", chunk)
+        if isinstance(content, str):
+            return content
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    
     def _split_into_chunks(self, text: str, chunk_size: int) -> list:
         """Split text into chunks of specified size"""
         return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
@@ -1,5 +1,9 @@
 from typing import Dict
 from .base_agent import BaseAgent
+from ..config import Config
+from ..retrieval import RetrievalPostProcessor
+from ..utils.tracing import trace_span
+from ..utils.executor import run_blocking
 import logging
 
 logger = logging.getLogger(__name__)
@@ -41,6 +45,11 @@ class ReaderAgent(BaseAgent):
         Note any PowerApps features requiring special handling.
         Identify potential conversion challenges.
         """
+        self.retrieval = RetrievalPostProcessor(
+            token_budget=Config.RETRIEVAL_TOKEN_BUDGET,
+            mmr_lambda=Config.RETRIEVAL_MMR_LAMBDA,
+            k=Config.RETRIEVAL_K
+        )
 
     async def process(self, context: dict) -> Dict[str, Dict]:
         vector_store = context.get('vector_store')
@@ -54,16 +63,17 @@ class ReaderAgent(BaseAgent):
             "What are the integration requirements and external system interfaces?"
         ]
         
-        all_relevant_text = []
-        for query in queries:
-            docs = vector_store.similarity_search(query)
-            relevant_text = "\n\n".join(doc.page_content for doc in docs)
-            all_relevant_text.append(f"Query: {query}\n\nFindings:\n{relevant_text}")
+        # Deduplicate overlapping chunks across queries and diversify under a token budget
+        with trace_span("retrieval", queries=len(queries)) as span:
+            retrieval = await run_blocking(self.retrieval.process, vector_store, queries)
+            span.set("chunks", retrieval.stats["selected_chunks"])
+            span.set("tokens_saved", retrieval.stats["tokens_saved"])
+        retrieved_context = self.retrieval.format_prompt_context(retrieval)
         
         analysis_prompt = f"""
         Analyze the following technical documentation for application development requirements:
 
-        {'\n\n'.join(all_relevant_text)}
+        {retrieved_context}
 
         Provide a detailed analysis focusing on:
         1. Application Requirements
@@ -111,6 +121,7 @@ class ReaderAgent(BaseAgent):
         - Explicitly note any missing critical information
         - Include technical specifications where available
         - Note any ambiguities or areas needing clarification
+        - Cite the page and section shown in brackets above each finding
 
         Format your response with clear sections and bullet points.
         """
@@ -121,6 +132,7 @@ class ReaderAgent(BaseAgent):
             'type': 'technical_analysis',
             'claude': {
                 'content': responses['claude'],
-                'sources': [doc.metadata for doc in docs]
+                'sources': retrieval.sources,
+                'retrieval_stats': retrieval.stats
             }
         }
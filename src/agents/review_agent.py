@@ -1,10 +1,57 @@
-from typing import Dict
+from typing import Any, Dict, Optional
 from .base_agent import BaseAgent
 from ..config import Config
+from ..utils.json_stream import JSONObjectStream, SchemaError, loads_tolerant, validate_schema
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# field: (type, required, default)
+REVIEW_VERDICT_SCHEMA = {
+    "needs_revision": (bool, True, None),
+    "critical_issues": (list, False, list),
+    "recommendations": (list, False, list),
+    "additional_notes": (str, False, "")
+}
+
+
+class ReviewVerdictError(ValueError):
+    """Raised when the review response holds no valid verdict"""
+
+
+class ReviewVerdictStream:
+    """Parses a streamed review response and reports when the rest is not needed.
+
+    Reading stops as soon as needs_revision is false (an approval needs no
+    further detail) or once the verdict object closes.
+    """
+
+    def __init__(self):
+        self.stream = JSONObjectStream()
+
+    def feed(self, text: str) -> bool:
+        """Add streamed text; returns True when the remaining output can be skipped"""
+        self.stream.feed(text)
+        return self.stream.done or self.stream.scan_boolean("needs_revision") is False
+
+    def verdict(self, full_text: Optional[str] = None) -> Dict[str, Any]:
+        data = self.stream.result
+        if data is None and self.stream.scan_boolean("needs_revision") is False:
+            data = {"needs_revision": False}
+        if data is None and full_text:
+            # Last resort: the whole response may be bare JSON with odd framing
+            try:
+                data = loads_tolerant(full_text.strip().strip("`").removeprefix("json"))
+            except json.JSONDecodeError:
+                data = None
+        if not isinstance(data, dict):
+            raise ReviewVerdictError("No JSON verdict found in review response")
+        try:
+            return validate_schema(data, REVIEW_VERDICT_SCHEMA)
+        except SchemaError as e:
+            raise ReviewVerdictError(f"Invalid review verdict: {str(e)}")
+
 class ReviewAgent(BaseAgent):
     def __init__(self):
         super().__init__("Review Agent")
@@ -91,12 +138,16 @@ class ReviewAgent(BaseAgent):
         - additional_notes (string)
         """
 
-        responses = await self.generate_responses(self.system_prompt, review_prompt)
+        parser = ReviewVerdictStream()
+        content = await self.stream_response(self.system_prompt, review_prompt, parser.feed)
+        verdict = parser.verdict(content)
+        logger.info(f"Review verdict: needs_revision={verdict['needs_revision']}")
         
         return {
             'type': 'review_report',
                  'claude': {
-                'content': responses['claude'],
+                'content': content,
+                'verdict': verdict,
                 'sources': {
                     'report': report_content.get('claude', {}).get('content', '')
                 }
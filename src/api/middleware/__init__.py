@@ -1,33 +1,44 @@
 from .error_handler import error_handler
-from .request_validator import RequestValidationMiddleware
-from .rate_limiter import RateLimiter
+from .request_validator import RequestValidationMiddleware, ASGIRequestValidationMiddleware
+from .rate_limiter import RateLimiter, ASGIRateLimiter
 from .auth_middleware import AuthMiddleware
-from .logging_middleware import LoggingMiddleware
+from .logging_middleware import LoggingMiddleware, ASGILoggingMiddleware
 from .cors_middleware import CustomCORSMiddleware, CORSConfig
-from .cache_middleware import CacheMiddleware
-from .compression_middleware import CompressionMiddleware
-from .metrics_middleware import MetricsMiddleware
-from .security_middleware import SecurityMiddleware
+from .cache_middleware import CacheMiddleware, ASGICacheMiddleware
+from .compression_middleware import CompressionMiddleware, StreamingCompressionMiddleware
+from .metrics_middleware import MetricsMiddleware, ASGIMetricsMiddleware
+from .security_middleware import SecurityMiddleware, ASGISecurityMiddleware
 from .db_middleware import DatabaseMiddleware, get_db
-from .timeout_middleware import TimeoutMiddleware, get_timeout
-from .response_middleware import ResponseFormattingMiddleware, APIResponse
+from .timeout_middleware import TimeoutMiddleware, ASGITimeoutMiddleware, get_timeout
+from .response_middleware import ResponseFormattingMiddleware, ASGIResponseFormattingMiddleware, APIResponse
+from .asgi import MiddlewareStack
 
 __all__ = [
     "error_handler",
     "RequestValidationMiddleware",
+    "ASGIRequestValidationMiddleware",
     "RateLimiter",
+    "ASGIRateLimiter",
     "AuthMiddleware",
     "LoggingMiddleware",
+    "ASGILoggingMiddleware",
     "CustomCORSMiddleware",
     "CORSConfig",
     "CacheMiddleware",
+    "ASGICacheMiddleware",
     "CompressionMiddleware",
+    "StreamingCompressionMiddleware",
     "MetricsMiddleware",
+    "ASGIMetricsMiddleware",
     "SecurityMiddleware",
+    "ASGISecurityMiddleware",
     "DatabaseMiddleware",
     "get_db",
     "TimeoutMiddleware",
+    "ASGITimeoutMiddleware",
     "get_timeout",
     "ResponseFormattingMiddleware",
-    "APIResponse"
+    "ASGIResponseFormattingMiddleware",
+    "APIResponse",
+    "MiddlewareStack"
 ]
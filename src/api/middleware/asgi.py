@@ -0,0 +1,141 @@
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from functools import partial
+import logging
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+ASGIApp = Callable[[Scope, Callable, Callable], Awaitable[None]]
+RawHeaders = List[Tuple[bytes, bytes]]
+
+def header_value(headers: RawHeaders, name: bytes) -> Optional[str]:
+    """First value of a header in raw ASGI headers (name must be lowercase)"""
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+def set_header(headers: RawHeaders, name: bytes, value: Optional[str]) -> RawHeaders:
+    """Copy of headers with name replaced (or removed when value is None)"""
+    updated = [(key, item) for key, item in headers if key.lower() != name]
+    if value is not None:
+        updated.append((name, value.encode("latin-1")))
+    return updated
+
+def scope_state(scope: Scope) -> Dict[str, Any]:
+    """Per-request state shared with request.state in routes and other layers"""
+    return scope.setdefault("state", {})
+
+def client_ip(scope: Scope) -> str:
+    """First X-Forwarded-For address, else the peer address"""
+    forwarded = header_value(scope.get("headers", []), b"x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+async def send_json(
+    scope: Scope,
+    receive: Callable,
+    send: Callable,
+    status_code: int,
+    content: Any,
+    headers: Optional[Dict[str, str]] = None
+):
+    """Answer directly from a middleware without calling the app"""
+    await JSONResponse(status_code=status_code, content=content, headers=headers)(scope, receive, send)
+
+async def empty_receive() -> Message:
+    """receive for requests replayed without a client (e.g. background cache refreshes)"""
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+class ForwardedResponse(Response):
+    """A response the app already sent to the client; sending it again does nothing"""
+
+    def __init__(self, status_code: int, raw_headers: RawHeaders):
+        super().__init__(status_code=status_code)
+        self.raw_headers = list(raw_headers)
+
+    async def __call__(self, scope: Scope, receive: Callable, send: Callable):
+        return
+
+async def call_app(
+    app: ASGIApp,
+    scope: Scope,
+    receive: Callable,
+    send: Optional[Callable] = None,
+    buffer_if: Optional[Callable[[int, RawHeaders], bool]] = None
+) -> Response:
+    """Run an ASGI app and return its response.
+
+    Responses are buffered into a Response when there is no client send or
+    buffer_if(status, headers) is true. Anything else is streamed to send
+    as it is produced and a ForwardedResponse is returned, so only layers
+    that need a body pay for holding one.
+    """
+    start: Optional[Message] = None
+    forward = False
+    chunks: List[bytes] = []
+
+    async def capture(message: Message):
+        nonlocal start, forward
+        if message["type"] == "http.response.start":
+            start = message
+            if send is not None and not (buffer_if and buffer_if(message["status"], message.get("headers", []))):
+                forward = True
+                await send(message)
+        elif message["type"] == "http.response.body" and not forward:
+            chunks.append(message.get("body", b""))
+        elif send is not None:
+            await send(message)
+
+    await app(scope, receive, capture)
+    if start is None:
+        raise RuntimeError("No response returned.")
+    if forward:
+        return ForwardedResponse(start["status"], start.get("headers", []))
+    response = Response(content=b"".join(chunks), status_code=start["status"])
+    response.raw_headers = list(start.get("headers", []))
+    return response
+
+class MiddlewareStack:
+    """Pure ASGI middlewares composed around an app, listed outermost first.
+
+        stack = MiddlewareStack()
+        stack.add(StreamingCompressionMiddleware, minimum_size=500)
+        stack.add(ASGICacheMiddleware, ttl=300)
+        application = stack.build(app)
+
+    Each layer is built once as cls(app, **options), so a request only
+    passes through plain awaits: no per-layer Request/Response objects,
+    task hand-offs or body re-wrapping. Built layers are kept by class
+    name for stats endpoints.
+    """
+
+    def __init__(self):
+        self.layers: List[Tuple[str, Callable[[ASGIApp], ASGIApp]]] = []
+        self.instances: Dict[str, ASGIApp] = {}
+
+    def add(self, middleware_class: Callable, **options) -> "MiddlewareStack":
+        self.layers.append((middleware_class.__name__, partial(middleware_class, **options)))
+        return self
+
+    def add_call_next(self, middleware: Callable) -> "MiddlewareStack":
+        """Add a legacy (request, call_next) middleware; it keeps BaseHTTPMiddleware's per-request cost"""
+        name = type(middleware).__name__
+        self.layers.append((name, lambda app: BaseHTTPMiddleware(app, dispatch=middleware)))
+        return self
+
+    def build(self, app: ASGIApp) -> ASGIApp:
+        for name, factory in reversed(self.layers):
+            app = factory(app)
+            self.instances[name] = app
+        logger.info(f"Built middleware stack: {' -> '.join(name for name, _ in self.layers)}")
+        return app
+
+    def get(self, name: str) -> Optional[ASGIApp]:
+        return self.instances.get(name)
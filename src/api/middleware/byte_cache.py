@@ -0,0 +1,213 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import heapq
+import itertools
+import sys
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rough fixed cost of an entry's dict, metadata and index slots
+ENTRY_OVERHEAD_BYTES = 512
+
+def entry_size(entry: Dict[str, Any]) -> int:
+    """Bytes held by a cached response: body, stored variants, headers and overhead"""
+    size = ENTRY_OVERHEAD_BYTES + len(entry.get("content", b""))
+    for variant in entry.get("variants", {}).values():
+        size += len(variant)
+    for key, value in entry.get("headers", {}).items():
+        size += len(key) + len(value)
+    for tag in entry.get("tags", []):
+        size += sys.getsizeof(tag)
+    return size
+
+def entry_deadline(entry: Dict[str, Any]) -> float:
+    """Wall-clock time after which an entry can no longer be served, even stale"""
+    return max(entry.get("expire_time", 0), entry.get("stale_until", 0), entry.get("error_until", 0))
+
+class ByteBudgetCache:
+    """Response store bounded by total bytes, evicting by GDSF priority.
+
+    Greedy-Dual-Size-Frequency: priority = clock + hits * cost / size, where
+    cost is how long the backend took to produce the response. Small, hot,
+    expensive responses stay; one large list response no longer flushes
+    dozens of small hot entries. The clock rises to each evicted priority,
+    so entries that stop being hit age out. A new entry is only admitted
+    if it outranks every entry it would displace, and entries larger than
+    max_entry_bytes never are. Expired entries are dropped lazily.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries: Optional[int] = None,
+        max_entry_bytes: Optional[int] = None
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 8
+        self.bytes_used = 0
+        self.stats = {"evictions": 0, "evicted_bytes": 0, "expired": 0, "rejected": 0}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # key -> [priority, hits, size, cost, deadline]
+        self._meta: Dict[str, List[float]] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self._clock = 0.0
+
+    def _push(self, key: str, meta: List[float]):
+        meta[0] = self._clock + meta[1] * meta[3] / meta[2]
+        heapq.heappush(self._heap, (meta[0], next(self._sequence), key))
+        # Lazy deletion leaves outdated heap items behind; rebuild when they dominate
+        if len(self._heap) > 4 * len(self._meta) + 64:
+            self._heap = [(m[0], next(self._sequence), k) for k, m in self._meta.items()]
+            heapq.heapify(self._heap)
+
+    def _remove(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.pop(key, None)
+        meta = self._meta.pop(key, None)
+        if meta is not None:
+            self.bytes_used -= int(meta[2])
+        return entry
+
+    def _pop_victim(self) -> Optional[Tuple[float, int, str]]:
+        """Lowest-priority live heap item, removed from the heap but not the cache"""
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            meta = self._meta.get(item[2])
+            if meta is not None and meta[0] == item[0]:
+                return item
+            # Outdated heap item
+        return None
+
+    def _evict(self, item: Tuple[float, int, str]):
+        priority, _, key = item
+        self._clock = priority
+        self.stats["evictions"] += 1
+        self.stats["evicted_bytes"] += int(self._meta[key][2])
+        self._remove(key)
+
+    def _evict_one(self) -> bool:
+        item = self._pop_victim()
+        if item is None:
+            return False
+        self._evict(item)
+        return True
+
+    def _make_room(self, size: int, priority: float, replacing: Optional[str] = None) -> bool:
+        """Evict until size fits, unless that would displace a higher-priority entry.
+
+        The entry being replaced counts as freed but is never a victim, so a
+        rejected replacement leaves it in place.
+        """
+        victims = []
+        skipped = []
+        replaced = self._meta.get(replacing) if replacing is not None else None
+        freed = int(replaced[2]) if replaced else 0
+        others = len(self._entries) - (1 if replaced else 0)
+        while len(victims) < others and (
+            self.bytes_used - freed + size > self.max_bytes or
+            (self.max_entries is not None and others - len(victims) >= self.max_entries)
+        ):
+            item = self._pop_victim()
+            if item is None:
+                break
+            if item[2] == replacing:
+                skipped.append(item)
+                continue
+            victims.append(item)
+            freed += int(self._meta[item[2]][2])
+            if item[0] > priority:
+                for victim in victims + skipped:
+                    heapq.heappush(self._heap, victim)
+                return False
+        for victim in victims:
+            self._evict(victim)
+        return True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        meta = self._meta[key]
+        if meta[4] <= time.time():
+            self._remove(key)
+            self.stats["expired"] += 1
+            return default
+        meta[1] += 1
+        self._push(key, meta)
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any], cost: float = 1.0) -> bool:
+        """Insert or replace an entry; returns False (keeping any current entry) when it is not admitted"""
+        size = entry_size(entry)
+        if size > self.max_entry_bytes:
+            self.stats["rejected"] += 1
+            return False
+        cost = max(cost, 1e-3)
+        # A replacement is the same resource, so it keeps the hits earned so far
+        previous = self._meta.get(key)
+        hits = previous[1] if previous else 1
+        if not self._make_room(size, self._clock + hits * cost / size, replacing=key):
+            self.stats["rejected"] += 1
+            return False
+        self._remove(key)
+        self._entries[key] = entry
+        meta = [0.0, hits, size, cost, entry_deadline(entry)]
+        self._meta[key] = meta
+        self.bytes_used += size
+        self._push(key, meta)
+        return True
+
+    def resize(self, key: str):
+        """Re-account an entry whose stored bytes changed in place"""
+        meta = self._meta.get(key)
+        if meta is None:
+            return
+        size = entry_size(self._entries[key])
+        self.bytes_used += size - int(meta[2])
+        meta[2] = size
+        self._push(key, meta)
+        while self.bytes_used > self.max_bytes and self._evict_one():
+            pass
+
+    def __setitem__(self, key: str, entry: Dict[str, Any]):
+        self.set(key, entry)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        entry = self._remove(key)
+        return default if entry is None else entry
+
+    def expire(self) -> int:
+        """Drop every entry past its deadline; returns how many were removed"""
+        now = time.time()
+        expired = [key for key, meta in self._meta.items() if meta[4] <= now]
+        for key in expired:
+            self._remove(key)
+        self.stats["expired"] += len(expired)
+        return len(expired)
+
+    def size_of(self, key: str) -> int:
+        meta = self._meta.get(key)
+        return int(meta[2]) if meta else 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def keys(self):
+        return list(self._entries)
+
+    def items(self):
+        return list(self._entries.items())
+
+    def clear(self):
+        self._entries.clear()
+        self._meta.clear()
+        self._heap.clear()
+        self.bytes_used = 0
@@ -0,0 +1,160 @@
+from typing import Any, Dict, Optional, Set
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_HEADER_LENGTH = struct.Struct(">I")
+
+def serialize_entry(entry: Dict[str, Any]) -> bytes:
+    """Length-prefixed JSON header followed by the raw body (no base64 or pickle).
+
+    Precompressed variants stay in the process that computed them.
+    """
+    header = {key: value for key, value in entry.items() if key not in ("content", "variants")}
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return _HEADER_LENGTH.pack(len(header_bytes)) + header_bytes + entry["content"]
+
+def deserialize_entry(data: bytes) -> Dict[str, Any]:
+    (header_length,) = _HEADER_LENGTH.unpack_from(data)
+    start = _HEADER_LENGTH.size
+    entry = json.loads(data[start:start + header_length])
+    entry["content"] = bytes(data[start + header_length:])
+    return entry
+
+class SQLiteCacheBackend:
+    """Redis-compatible subset (get/set/delete/incr/expire/sadd/smembers) on a local SQLite file.
+
+    Lets every worker on a host share one cache without running Redis; a
+    redis.Redis client can be used in its place unchanged. WAL mode keeps
+    readers from blocking the single writer.
+    """
+
+    def __init__(self, path: str = os.path.join("cache", "http_cache.sqlite3")):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sets (key TEXT NOT NULL, member TEXT NOT NULL, PRIMARY KEY (key, member))"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS set_ttl (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self._conn().execute("DELETE FROM kv WHERE key = ? AND expires_at <= ?", (key, time.time()))
+            return None
+        return bytes(value)
+
+    def set(self, key: str, value, ex: Optional[int] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        elif isinstance(value, int):
+            value = str(value).encode("ascii")
+        expires_at = time.time() + ex if ex else None
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(value), expires_at)
+        )
+        return True
+
+    def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        placeholders = ",".join("?" * len(keys))
+        conn = self._conn()
+        removed = conn.execute(f"DELETE FROM kv WHERE key IN ({placeholders})", keys).rowcount
+        for key in set(keys):
+            conn.execute("DELETE FROM set_ttl WHERE key = ?", (key,))
+            if conn.execute("DELETE FROM sets WHERE key = ?", (key,)).rowcount:
+                removed += 1
+        return removed
+
+    def incr(self, key: str) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            value = int(row[0]) + 1 if row else 1
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, NULL)",
+                (key, str(value).encode("ascii"))
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def expire(self, key: str, seconds: int) -> bool:
+        """Set a TTL on a value or a set; returns False when the key does not exist"""
+        conn = self._conn()
+        expires_at = time.time() + seconds
+        found = conn.execute("UPDATE kv SET expires_at = ? WHERE key = ?", (expires_at, key)).rowcount > 0
+        if conn.execute("SELECT 1 FROM sets WHERE key = ? LIMIT 1", (key,)).fetchone():
+            conn.execute("INSERT OR REPLACE INTO set_ttl (key, expires_at) VALUES (?, ?)", (key, expires_at))
+            found = True
+        return found
+
+    def sadd(self, key: str, *members: str) -> int:
+        return self._conn().executemany(
+            "INSERT OR IGNORE INTO sets (key, member) VALUES (?, ?)",
+            [(key, member) for member in members]
+        ).rowcount
+
+    def smembers(self, key: str) -> Set[bytes]:
+        conn = self._conn()
+        row = conn.execute("SELECT expires_at FROM set_ttl WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[0] <= time.time():
+            self.delete(key)
+            return set()
+        rows = self._conn().execute("SELECT member FROM sets WHERE key = ?", (key,)).fetchall()
+        return {row[0].encode("utf-8") for row in rows}
+
+    def purge_expired(self) -> int:
+        conn = self._conn()
+        now = time.time()
+        removed = conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
+        expired_sets = [row[0] for row in conn.execute("SELECT key FROM set_ttl WHERE expires_at <= ?", (now,))]
+        if expired_sets:
+            removed += self.delete(*expired_sets)
+        return removed
+
+def create_l2_backend(url: str):
+    """Shared cache tier from a URL: sqlite:///path/to/file or redis://host:port/db"""
+    if url.startswith("sqlite:///"):
+        return SQLiteCacheBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("redis package is required for a redis:// cache backend")
+        return redis.Redis.from_url(url)
+    raise ValueError(f"Unsupported cache backend URL: {url}")
+
+def as_text(value) -> str:
+    """Decode bytes returned by Redis-style clients"""
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
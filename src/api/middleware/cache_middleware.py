@@ -1,30 +1,136 @@
 from fastapi import Request, Response
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List, Tuple
+from dataclasses import dataclass, replace
 import hashlib
 import json
+import re
 import time
 import asyncio
 from datetime import datetime
 import logging
-from cachetools import TTLCache, LRUCache
+from cachetools import LRUCache
+from .byte_cache import ByteBudgetCache
+from .conditional import compute_etag, find_last_modified, is_not_modified, not_modified_response
+from .cache_backends import create_l2_backend, serialize_entry, deserialize_entry, as_text
+from .compression_middleware import AdaptiveCompressor, compress_body, get_compressor, negotiate_encoding
+from .asgi import ASGIApp, ForwardedResponse, Scope, call_app, empty_receive, header_value
 
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True)
+class CachePolicy:
+    """Freshness windows (seconds) for cached responses on a route"""
+    ttl: int = 300
+    stale_while_revalidate: int = 0  # Serve expired entries while refreshing in the background
+    stale_if_error: int = 0  # Serve expired entries when the backend fails
+
+    @property
+    def retention(self) -> int:
+        return self.ttl + max(self.stale_while_revalidate, self.stale_if_error)
+
+# Resource tags per route. Reads tag their cache entries; successful writes
+# purge "invalidates" (defaulting to "tags"). Templates use path groups and
+# query parameters; a tag whose values are missing is skipped.
+DEFAULT_TAG_RULES = [
+    {"pattern": r"^/project/(?P<project_id>[^/]+)/", "tags": ["project:{project_id}"]},
+    {"pattern": r"^/products$", "tags": ["products", "products:flag:{flag}"]},
+    {"pattern": r"^/api/v1/projects/?$", "tags": ["projects"]},
+    {
+        "pattern": r"^/api/v1/projects/(?P<project_id>[^/]+)$",
+        "tags": ["project:{project_id}"],
+        "invalidates": ["project:{project_id}", "projects"]
+    },
+    {"pattern": r"^/api/v1/competitors/?$", "tags": ["competitors", "project:{project_id}"]},
+    {
+        "pattern": r"^/api/v1/competitors/(?P<competitor_id>[^/]+)$",
+        "tags": ["competitor:{competitor_id}"],
+        "invalidates": ["competitor:{competitor_id}", "competitors"]
+    },
+    {"pattern": r"^/api/v1/users/?$", "tags": ["users"]},
+    {
+        "pattern": r"^/api/v1/users/(?P<user_id>[^/]+)$",
+        "tags": ["user:{user_id}"],
+        "invalidates": ["user:{user_id}", "users"]
+    }
+]
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+PRECOMPRESSED_ENCODINGS = ("br", "gzip")
+PRECOMPRESS_EXCLUDED_TYPES = ("image/", "video/", "audio/")
+
 class CacheMiddleware:
     def __init__(
         self,
         ttl: int = 300,  # 5 minutes default TTL
         max_size: int = 1000,  # Maximum number of cached items
+        max_bytes: int = 64 * 1024 * 1024,  # Memory budget for cached responses
+        max_entry_bytes: Optional[int] = None,  # Larger responses are not cached (default max_bytes / 8)
+        stats_limit: int = 20,  # Hot keys listed by get_cache_stats
         ignore_paths: set = {"/health", "/metrics"},
         cache_by_auth: bool = True,
-        cache_by_query: bool = True
+        cache_by_query: bool = True,
+        coalesce_timeout: float = 10.0,  # Max seconds a request waits on an in-flight duplicate
+        stale_while_revalidate: int = 0,
+        stale_if_error: int = 0,
+        route_policies: Optional[Dict[str, Dict[str, int]]] = None,  # path regex -> CachePolicy overrides
+        refresh_ahead_hits: int = 10,  # Hit count that makes a key hot enough to refresh early
+        refresh_ahead_ratio: float = 0.2,  # Refresh hot keys in the last 20% of their TTL
+        tag_rules: Optional[List[Dict[str, Any]]] = None,
+        l2_backend: Any = None,  # Shared tier with a Redis-style get/set/delete/incr/expire/sadd/smembers API
+        l2_url: Optional[str] = None,  # Or build one: sqlite:///path or redis://host:port/db
+        l1_sync_interval: float = 1.0,  # Max seconds before a worker applies another worker's invalidations
+        precompress: bool = True,  # Keep br/gzip variants of cached bodies so hits skip compression
+        precompress_min_size: int = 500,  # Smaller bodies are always served uncompressed
+        compression_level: int = 6,  # gzip level for stored variants
+        brotli_quality: int = 4,  # Brotli quality for stored variants
+        compressor: Optional[AdaptiveCompressor] = None  # Moves large variant compression off the loop
     ):
-        self.cache = TTLCache(maxsize=max_size, ttl=ttl)
+        self.default_policy = CachePolicy(ttl, stale_while_revalidate, stale_if_error)
+        self.route_policies: List[Tuple[re.Pattern, CachePolicy]] = [
+            (re.compile(pattern), replace(self.default_policy, **policy))
+            for pattern, policy in (route_policies or {}).items()
+        ]
+        # Longest any entry stays in L2; tag sets and version stamps outlive their entries by this much
+        self.l2_retention = max(
+            [self.default_policy.retention] + [policy.retention for _, policy in self.route_policies]
+        ) + 1
+        self.refresh_ahead_hits = refresh_ahead_hits
+        self.refresh_ahead_ratio = refresh_ahead_ratio
+        # Entries expire individually once past their longest stale window
+        self.cache = ByteBudgetCache(max_bytes=max_bytes, max_entries=max_size, max_entry_bytes=max_entry_bytes)
+        self.stats_limit = stats_limit
         self.metadata_cache = LRUCache(maxsize=max_size)
         self.ignore_paths = ignore_paths
         self.cache_by_auth = cache_by_auth
         self.cache_by_query = cache_by_query
+        self.coalesce_timeout = coalesce_timeout
         self._cleanup_task = None
+        # cache_key -> future resolved with the leader's cache entry (or None)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesce_stats = {"coalesced": 0, "timeouts": 0, "fallbacks": 0}
+        self.tag_rules = [
+            (re.compile(rule["pattern"]), rule["tags"], rule.get("invalidates", rule["tags"]))
+            for rule in (DEFAULT_TAG_RULES if tag_rules is None else tag_rules)
+        ]
+        self.tag_index: Dict[str, set] = {}  # tag -> cache keys
+        # Bumped on every purge so fetches that started before a write are not cached
+        self._tag_versions: Dict[str, int] = {}
+        self.invalidation_stats = {"purges": 0, "entries_purged": 0, "skipped_stores": 0}
+        self._refresh_tasks: set = set()
+        # Two-tier cache: self.cache is the per-process L1, self.l2 is shared by all workers
+        self.l2 = l2_backend if l2_backend is not None else (create_l2_backend(l2_url) if l2_url else None)
+        self.l1_sync_interval = l1_sync_interval
+        self._invalidation_seq: Optional[int] = None
+        self._last_sync = 0.0
+        self.l2_stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0, "outdated": 0}
+        self.stale_stats = {"stale_served": 0, "stale_if_error": 0, "refreshes": 0, "refresh_ahead": 0}
+        self.precompress = precompress
+        self.precompress_min_size = precompress_min_size
+        self.compression_level = compression_level
+        self.brotli_quality = brotli_quality
+        self.compressor = compressor or get_compressor()
+        self.precompress_stats = {"compressed": 0, "served": 0, "identity": 0}
 
     async def init(self):
         """Initialize the cleanup task"""
@@ -36,9 +142,7 @@ class CacheMiddleware:
         while True:
             try:
                 current_time = time.time()
-                # Clean up TTLCache (it's done automatically, but we'll log it)
-                expired_count = len([k for k, v in self.cache.items() 
-                                  if v.get("expire_time", 0) < current_time])
+                expired_count = self.cache.expire()
                 if expired_count > 0:
                     logger.info(f"Cleaned up {expired_count} expired cache entries")
                 
@@ -48,6 +152,15 @@ class CacheMiddleware:
                 for key in expired_metadata:
                     self.metadata_cache.pop(key, None)
                 
+                if self.l2 is not None and hasattr(self.l2, "purge_expired"):
+                    await self._l2_call("purge_expired")
+                
+                # Drop evicted keys from the tag index
+                for tag in list(self.tag_index):
+                    self.tag_index[tag] = {k for k in self.tag_index[tag] if k in self.cache}
+                    if not self.tag_index[tag]:
+                        del self.tag_index[tag]
+                
             except Exception as e:
                 logger.error(f"Error during cache cleanup: {str(e)}")
             
@@ -71,75 +184,515 @@ class CacheMiddleware:
         return (
             request.method in ["GET", "HEAD"] and
             response.status_code == 200 and
-            request.url.path not in self.ignore_paths
+            request.url.path not in self.ignore_paths and
+            self._has_body(response)
+        )
+
+    def _has_body(self, response: Response) -> bool:
+        """Whether the response is still ours to store or replace (not already sent to the client)"""
+        return True
+
+    async def _read_body(self, response: Response) -> bytes:
+        """Response body, draining the iterator of streaming responses"""
+        body = getattr(response, "body", None)
+        if isinstance(body, bytes):
+            return body
+        chunks = []
+        async for chunk in response.body_iterator:
+            chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode(response.charset))
+        return b"".join(chunks)
+
+    def _precompressible(self, entry: Dict[str, Any]) -> bool:
+        headers = entry["headers"]
+        return (
+            self.precompress and
+            len(entry["content"]) >= self.precompress_min_size and
+            "content-encoding" not in headers and
+            not headers.get("content-type", "").startswith(PRECOMPRESS_EXCLUDED_TYPES)
         )
 
+    async def _select_variant(self, entry: Dict[str, Any], request: Request, cache_key: Optional[str]) -> Optional[str]:
+        """Encoding to serve, compressing it into the entry the first time a client accepts it"""
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), PRECOMPRESSED_ENCODINGS)
+        if encoding is None:
+            return None
+        variants = entry.setdefault("variants", {})
+        if encoding not in variants:
+            try:
+                # Variants are kept for the entry's lifetime, so always use the configured level
+                compressed = await self.compressor.run(
+                    encoding,
+                    compress_body,
+                    entry["content"],
+                    encoding,
+                    self.compression_level,
+                    self.brotli_quality
+                )
+            except Exception as e:
+                logger.error(f"Error precompressing cached response with {encoding}: {str(e)}")
+                return None
+            # An empty variant records that this encoding does not shrink the body
+            variants[encoding] = compressed if len(compressed) < len(entry["content"]) else b""
+            self.precompress_stats["compressed"] += 1
+            if cache_key is not None:
+                self.cache.resize(cache_key)
+        return encoding if variants[encoding] else None
+
+    async def _build_response(
+        self,
+        entry: Dict[str, Any],
+        cache_status: str,
+        request: Optional[Request] = None,
+        cache_key: Optional[str] = None
+    ) -> Response:
+        content = entry["content"]
+        headers = entry["headers"]
+        etag = entry.get("etag")
+        if request is not None and self._precompressible(entry):
+            headers = dict(headers)
+            vary = headers.get("vary")
+            if not vary:
+                headers["vary"] = "Accept-Encoding"
+            elif "accept-encoding" not in vary.lower():
+                headers["vary"] = f"{vary}, Accept-Encoding"
+            encoding = await self._select_variant(entry, request, cache_key)
+            if encoding is None:
+                self.precompress_stats["identity"] += 1
+            else:
+                self.precompress_stats["served"] += 1
+                content = entry["variants"][encoding]
+                # Each content-coding is its own representation with its own strong validator
+                if etag:
+                    etag = f'{etag[:-1]}-{encoding}"'
+                    headers["etag"] = etag
+                headers["content-encoding"] = encoding
+                headers["content-length"] = str(len(content))
+        if request is not None and is_not_modified(request, etag, entry.get("last_modified")):
+            # Client already holds this representation; answer without a body
+            response = not_modified_response(headers)
+            response.headers["X-Cache"] = cache_status
+            return response
+        response = Response(
+            content=content,
+            status_code=entry["status_code"],
+            headers=headers,
+            media_type=entry["media_type"]
+        )
+        response.headers["X-Cache"] = cache_status
+        return response
+
+    def _tags_for(self, request: Request, write: bool = False) -> set:
+        """Resource tags for a request path, rendered from path groups and query params"""
+        tags = set()
+        query = dict(request.query_params)
+        for pattern, read_tags, write_tags in self.tag_rules:
+            match = pattern.search(request.url.path)
+            if not match:
+                continue
+            values = {**query, **match.groupdict()}
+            for template in (write_tags if write else read_tags):
+                try:
+                    tags.add(template.format(**values))
+                except KeyError:
+                    continue
+        return tags
+
+    def _index_entry(self, cache_key: str, tags: set):
+        for tag in tags:
+            self.tag_index.setdefault(tag, set()).add(cache_key)
+
+    def invalidate_tags(self, tags) -> int:
+        """Purge this process's entries carrying any of the tags; returns entries removed"""
+        removed = 0
+        for tag in tags:
+            self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+            for cache_key in self.tag_index.pop(tag, set()):
+                if self.cache.pop(cache_key, None) is not None:
+                    removed += 1
+        if removed:
+            self.invalidation_stats["purges"] += 1
+            self.invalidation_stats["entries_purged"] += removed
+            logger.info(f"Invalidated {removed} cache entries for tags {sorted(tags)}")
+        return removed
+
+    async def invalidate(self, tags) -> int:
+        """Purge tags in L1 and L2 and publish the purge so other workers drop their L1 copies"""
+        tags = set(tags)
+        removed = self.invalidate_tags(tags)
+        if self.l2 is None or not tags:
+            return removed
+        for tag in tags:
+            # Bump the shared version first: an entry a slower worker writes after this purge
+            # still carries the old version and is rejected on lookup
+            await self._l2_call("incr", f"tagver:{tag}")
+            await self._l2_call("expire", f"tagver:{tag}", self.l2_retention)
+            members = await self._l2_call("smembers", f"tag:{tag}") or set()
+            keys = [f"entry:{as_text(member)}" for member in members]
+            await self._l2_call("delete", f"tag:{tag}", *keys)
+        seq = await self._l2_call("incr", "invalidation:seq")
+        if seq is not None:
+            await self._l2_call("set", f"invalidation:{int(seq)}", json.dumps(sorted(tags)), 3600)
+        return removed
+
+    async def _l2_call(self, method: str, *args) -> Any:
+        """Run an L2 operation in a thread; failures degrade to L1-only caching"""
+        try:
+            return await asyncio.to_thread(getattr(self.l2, method), *args)
+        except Exception as e:
+            self.l2_stats["errors"] += 1
+            logger.error(f"Shared cache {method} failed: {str(e)}")
+            return None
+
+    async def _sync_invalidations(self, force: bool = False):
+        """Replay purges published by other workers since the last sync"""
+        if self.l2 is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.l1_sync_interval:
+            return
+        self._last_sync = now
+        raw = await self._l2_call("get", "invalidation:seq")
+        seq = int(as_text(raw)) if raw else 0
+        if self._invalidation_seq is None or seq < self._invalidation_seq:
+            self._invalidation_seq = seq
+            return
+        for number in range(self._invalidation_seq + 1, seq + 1):
+            tags = await self._l2_call("get", f"invalidation:{number}")
+            if tags is None:
+                # Purge log entry expired or unreadable; dropping L1 is the only safe option
+                logger.warning("Missed shared cache invalidations; clearing local cache")
+                for tag in list(self.tag_index):
+                    self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+                self.cache.clear()
+                self.tag_index.clear()
+                break
+            self.invalidate_tags(json.loads(as_text(tags)))
+        self._invalidation_seq = seq
+
+    async def _lookup(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """L1 first, then the shared L2 (promoting hits into L1)"""
+        entry = self.cache.get(cache_key)
+        if entry is not None or self.l2 is None:
+            return entry
+        data = await self._l2_call("get", f"entry:{cache_key}")
+        if data is None:
+            self.l2_stats["misses"] += 1
+            return None
+        entry = deserialize_entry(data)
+        tags = entry.get("tags", [])
+        stamped = entry.get("tag_versions", {})
+        current = await self._shared_tag_versions(tags)
+        if any(stamped.get(tag, 0) != current[tag] for tag in tags):
+            # Fetched before a purge of one of its tags but written after it
+            self.l2_stats["outdated"] += 1
+            self.l2_stats["misses"] += 1
+            await self._l2_call("delete", f"entry:{cache_key}")
+            return None
+        self.l2_stats["hits"] += 1
+        if self.cache.set(cache_key, entry, cost=entry.get("cost", 1.0)):
+            self._index_entry(cache_key, set(entry.get("tags", [])))
+        return entry
+
+    async def _shared_tag_versions(self, tags) -> Dict[str, int]:
+        """Purge counters for tags in L2 (0 for tags never purged)"""
+        versions = {}
+        for tag in tags:
+            raw = await self._l2_call("get", f"tagver:{tag}")
+            versions[tag] = int(as_text(raw)) if raw else 0
+        return versions
+
+    async def _store_shared(self, cache_key: str, entry: Dict[str, Any], now: float):
+        retention = int(max(entry["expire_time"], entry["stale_until"], entry["error_until"]) - now) + 1
+        if await self._l2_call("set", f"entry:{cache_key}", serialize_entry(entry), retention):
+            self.l2_stats["writes"] += 1
+            for tag in entry["tags"]:
+                await self._l2_call("sadd", f"tag:{tag}", cache_key)
+                # Refreshed on every write so the set outlives each member without growing forever
+                await self._l2_call("expire", f"tag:{tag}", self.l2_retention)
+
+    def _policy_for(self, path: str) -> CachePolicy:
+        for pattern, policy in self.route_policies:
+            if pattern.search(path):
+                return policy
+        return self.default_policy
+
+    def _should_refresh_ahead(self, cache_key: str, entry: Dict[str, Any], policy: CachePolicy, now: float) -> bool:
+        """Hot keys are refreshed before expiry so readers never see a miss"""
+        hits = self.metadata_cache.get(cache_key, {}).get("hit_count", 0)
+        return (
+            hits >= self.refresh_ahead_hits and
+            entry["expire_time"] - now < policy.ttl * self.refresh_ahead_ratio
+        )
+
+    def _schedule_refresh(self, request: Request, call_next: Callable, cache_key: str, policy: CachePolicy):
+        """Refresh an entry in the background unless a fetch for it is already running"""
+        if cache_key in self._inflight:
+            return
+        self.stale_stats["refreshes"] += 1
+        task = asyncio.create_task(self._refresh(request, call_next, cache_key, policy))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, request: Request, call_next: Callable, cache_key: str, policy: CachePolicy):
+        try:
+            await self._fetch(request, call_next, cache_key, policy)
+        except Exception as e:
+            logger.warning(f"Background cache refresh failed for {request.url.path}: {str(e)}")
+
+    @staticmethod
+    def _can_serve_on_error(entry: Optional[Dict[str, Any]], now: float) -> bool:
+        return entry is not None and now < entry.get("error_until", 0)
+
+    async def _fetch(self, request: Request, call_next: Callable, cache_key: str, policy: CachePolicy) -> Response:
+        """Run call_next as the single in-flight leader for cache_key"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        entry = None
+        tags = self._tags_for(request)
+        versions = {tag: self._tag_versions.get(tag, 0) for tag in tags}
+        # Read before call_next: the L2 write happens after an await, so the local check below cannot cover it
+        shared_versions = await self._shared_tag_versions(tags) if self.l2 is not None else None
+        fetch_start = time.perf_counter()
+        try:
+            response = await call_next(request)
+            if not self._should_cache(request, response):
+                return response
+
+            body = await self._read_body(response)
+            now = time.time()
+            cost = time.perf_counter() - fetch_start
+            # Validators are computed once per entry and reused by every hit
+            headers = dict(response.headers)
+            etag = compute_etag(body)
+            last_modified = find_last_modified(body)
+            headers["etag"] = etag
+            if last_modified:
+                headers["last-modified"] = last_modified
+            entry = {
+                "content": body,
+                "status_code": response.status_code,
+                "headers": headers,
+                "etag": etag,
+                "last_modified": last_modified,
+                "media_type": response.media_type,
+                "expire_time": now + policy.ttl,
+                "stale_until": now + policy.ttl + policy.stale_while_revalidate,
+                "error_until": now + policy.ttl + policy.stale_if_error,
+                "tags": sorted(tags),
+                "cost": cost  # Seconds to produce; expensive responses are evicted last
+            }
+            if shared_versions is not None:
+                entry["tag_versions"] = shared_versions
+            # Pick up purges from other workers before deciding whether this body is still current
+            await self._sync_invalidations(force=True)
+            if any(self._tag_versions.get(tag, 0) != version for tag, version in versions.items()):
+                # A write invalidated these tags mid-fetch; the body may predate it
+                self.invalidation_stats["skipped_stores"] += 1
+                return await self._build_response(entry, "MISS", request)
+            try:
+                if self.cache.set(cache_key, entry, cost=cost):
+                    self._index_entry(cache_key, tags)
+                    self._update_metadata(cache_key, entry)
+            except Exception as e:
+                logger.error(f"Error caching response: {str(e)}")
+            if self.l2 is not None:
+                await self._store_shared(cache_key, entry, now)
+            return await self._build_response(entry, "MISS", request, cache_key)
+        finally:
+            # Waiters fall back to their own call_next when no entry was produced
+            self._inflight.pop(cache_key, None)
+            if not future.done():
+                future.set_result(entry)
+
+    async def _wait_for_inflight(self, future: asyncio.Future) -> Optional[Dict[str, Any]]:
+        try:
+            entry = await asyncio.wait_for(asyncio.shield(future), timeout=self.coalesce_timeout)
+        except asyncio.TimeoutError:
+            self.coalesce_stats["timeouts"] += 1
+            logger.warning(f"Coalesced request timed out after {self.coalesce_timeout}s; fetching directly")
+            return None
+        if entry is None:
+            self.coalesce_stats["fallbacks"] += 1
+        else:
+            self.coalesce_stats["coalesced"] += 1
+        return entry
+
     def _update_metadata(self, cache_key: str, response: Response):
         """Update cache metadata"""
         self.metadata_cache[cache_key] = {
             "last_accessed": time.time(),
             "hit_count": self.metadata_cache.get(cache_key, {}).get("hit_count", 0) + 1,
-            "size": len(response.body) if hasattr(response, "body") else 0
+            "size": self.cache.size_of(cache_key)
         }
 
     async def __call__(self, request: Request, call_next: Callable):
+        return await self._handle(request, call_next)
+
+    def _background_call_next(self, call_next: Callable) -> Optional[Callable]:
+        """call_next for refreshes that outlive the request, or None when there is none.
+
+        BaseHTTPMiddleware runs call_next in the request's own task group, so
+        it cannot be used once the response has been sent. This variant
+        therefore revalidates stale entries inline and skips refresh-ahead;
+        ASGICacheMiddleware replays the request through the app instead.
+        """
+        return None
+
+    async def _handle(self, request: Request, call_next: Callable) -> Response:
         await self.init()
         
-        # Skip caching for non-GET methods or ignored paths
+        # Successful writes purge the cached reads of the resources they touch
+        if request.method in MUTATING_METHODS:
+            response = await call_next(request)
+            if 200 <= response.status_code < 400:
+                await self.invalidate(self._tags_for(request, write=True))
+            return response
+
+        # Skip caching for other non-GET methods or ignored paths
         if request.method not in ["GET", "HEAD"] or request.url.path in self.ignore_paths:
             return await call_next(request)
 
         cache_key = self._generate_cache_key(request)
 
+        policy = self._policy_for(request.url.path)
+        now = time.time()
+
         # Try to get from cache
-        cached_response = self.cache.get(cache_key)
+        await self._sync_invalidations()
+        cached_response = await self._lookup(cache_key)
         if cached_response:
-            self._update_metadata(cache_key, cached_response)
-            response = Response(
-                content=cached_response["content"],
-                status_code=cached_response["status_code"],
-                headers=cached_response["headers"],
-                media_type=cached_response["media_type"]
-            )
-            response.headers["X-Cache"] = "HIT"
-            return response
+            background_call_next = self._background_call_next(call_next)
+            if now < cached_response["expire_time"]:
+                self._update_metadata(cache_key, cached_response)
+                if background_call_next is not None and self._should_refresh_ahead(cache_key, cached_response, policy, now):
+                    self.stale_stats["refresh_ahead"] += 1
+                    self._schedule_refresh(request, background_call_next, cache_key, policy)
+                return await self._build_response(cached_response, "HIT", request, cache_key)
 
-        # Get fresh response
-        response = await call_next(request)
+            if background_call_next is not None and now < cached_response.get("stale_until", 0):
+                # Stale-while-revalidate: answer now, refresh behind the response
+                self._update_metadata(cache_key, cached_response)
+                self.stale_stats["stale_served"] += 1
+                self._schedule_refresh(request, background_call_next, cache_key, policy)
+                return await self._build_response(cached_response, "STALE", request, cache_key)
 
-        # Cache if appropriate
-        if self._should_cache(request, response):
-            try:
-                response_body = await response.body()
-                self.cache[cache_key] = {
-                    "content": response_body,
-                    "status_code": response.status_code,
-                    "headers": dict(response.headers),
-                    "media_type": response.media_type,
-                    "expire_time": time.time() + self.cache.ttl
-                }
-                self._update_metadata(cache_key, response)
-                response.headers["X-Cache"] = "MISS"
-            except Exception as e:
-                logger.error(f"Error caching response: {str(e)}")
+        # Single flight: share an identical request's in-flight result instead of recomputing
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            entry = await self._wait_for_inflight(inflight)
+            if entry is not None:
+                return await self._build_response(entry, "COALESCED", request, cache_key)
+            return await call_next(request)
+
+        try:
+            response = await self._fetch(request, call_next, cache_key, policy)
+        except Exception as e:
+            if not self._can_serve_on_error(cached_response, now):
+                raise
+            logger.warning(f"Serving stale response for {request.url.path} after error: {str(e)}")
+            self.stale_stats["stale_if_error"] += 1
+            return await self._build_response(cached_response, "STALE-ERROR", request, cache_key)
 
+        if response.status_code >= 500 and self._has_body(response) and self._can_serve_on_error(cached_response, now):
+            self.stale_stats["stale_if_error"] += 1
+            return await self._build_response(cached_response, "STALE-ERROR", request, cache_key)
         return response
 
     def get_cache_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
-        total_size = sum(meta.get("size", 0) for meta in self.metadata_cache.values())
+        """Get cache statistics (bounded: only the hottest keys are listed)"""
         total_hits = sum(meta.get("hit_count", 0) for meta in self.metadata_cache.values())
+        hot_keys = sorted(
+            self.metadata_cache.items(),
+            key=lambda item: item[1].get("hit_count", 0),
+            reverse=True
+        )[:self.stats_limit]
         
         return {
             "cache_size": len(self.cache),
-            "total_memory": total_size,
+            "total_memory": self.cache.bytes_used,
+            "memory_budget": self.cache.max_bytes,
             "total_hits": total_hits,
-            "cache_keys": list(self.cache.keys()),
-            "metadata": self.metadata_cache
+            "eviction": dict(self.cache.stats),
+            "hot_keys": [{"key": key, **meta} for key, meta in hot_keys],
+            "inflight": len(self._inflight),
+            "coalescing": dict(self.coalesce_stats),
+            "staleness": dict(self.stale_stats),
+            "invalidation": dict(self.invalidation_stats, tags=len(self.tag_index)),
+            "l2": dict(self.l2_stats, enabled=self.l2 is not None),
+            "precompression": dict(self.precompress_stats)
         }
 
     def clear_cache(self):
         """Clear all cache entries"""
         self.cache.clear()
         self.metadata_cache.clear()
+        self.tag_index.clear()
         logger.info("Cache cleared")
+
+# Bodies produced incrementally are never cached, so they are streamed straight through
+STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+class ASGICacheMiddleware(CacheMiddleware):
+    """CacheMiddleware as a pure ASGI layer.
+
+    Hits are sent straight from the cache entry. On a miss the app's
+    response is only buffered when it could be stored (a 200 from GET or
+    HEAD) or replaced by a stale entry (a 5xx); everything else, including
+    event streams and every write, is forwarded to the client unbuffered.
+    A successful write purges its tags before its last body chunk goes
+    out, so the client's next read cannot find the pre-write entry.
+    """
+
+    def __init__(self, app: ASGIApp, **options):
+        super().__init__(**options)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope, receive)
+        if scope["method"] in MUTATING_METHODS:
+            await self.init()
+            await self.app(scope, receive, self._invalidating_send(request, send))
+            return
+        response = await self._handle(request, self._call_next(scope, receive, send))
+        await response(scope, receive, send)
+
+    def _invalidating_send(self, request: Request, send: Callable) -> Callable:
+        status = 0
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                if 200 <= status < 400:
+                    await self.invalidate(self._tags_for(request, write=True))
+            await send(message)
+
+        return send_wrapper
+
+    def _call_next(self, scope: Scope, receive: Callable, send: Optional[Callable]) -> Callable:
+        cacheable_method = scope["method"] in ("GET", "HEAD")
+
+        def buffer_if(status: int, headers) -> bool:
+            content_type = header_value(headers, b"content-type") or ""
+            return (
+                cacheable_method and
+                (status == 200 or status >= 500) and
+                not content_type.startswith(STREAMING_TYPES)
+            )
+
+        async def call_next(request: Request) -> Response:
+            return await call_app(self.app, scope, receive, send, buffer_if)
+
+        call_next.scope = scope
+        return call_next
+
+    def _has_body(self, response: Response) -> bool:
+        return not isinstance(response, ForwardedResponse)
+
+    def _background_call_next(self, call_next: Callable) -> Callable:
+        # No client send: the refresh always buffers, and never reads the finished request's body
+        return self._call_next(call_next.scope, empty_receive, None)
@@ -1,13 +1,181 @@
 from fastapi import Request, Response
-from typing import Callable, Optional, Dict, List
+from typing import Any, Callable, Optional, Dict, List, Tuple
 import gzip
 import brotli
 import zlib
+import os
+import time
+import threading
 import logging
 from functools import lru_cache
+from prometheus_client import Counter
+from src.utils.executor import BlockingExecutor, LoopLagMonitor
+from .asgi import header_value, set_header
 
 logger = logging.getLogger(__name__)
 
+COMPRESSION_BYTES_SAVED = Counter(
+    'swarmrag_compression_bytes_saved_total',
+    'Response bytes removed by compression',
+    ['encoding']
+)
+COMPRESSION_CPU_SECONDS = Counter(
+    'swarmrag_compression_cpu_seconds_total',
+    'CPU time spent compressing responses',
+    ['encoding']
+)
+
+SUPPORTED_ENCODINGS = ("br", "gzip", "deflate")  # Server preference order
+
+def negotiate_encoding(accept_encoding: str, available=SUPPORTED_ENCODINGS) -> Optional[str]:
+    """Best available encoding the client accepts; q=0 rules an encoding out"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    candidates = [(weights.get(encoding, wildcard), encoding) for encoding in available]
+    candidates = [candidate for candidate in candidates if candidate[0] > 0]
+    if not candidates:
+        return None
+    best = max(q for q, _ in candidates)
+    return next(encoding for q, encoding in candidates if q == best)
+
+def compress_body(
+    content: bytes,
+    encoding: str,
+    level: int = 6,
+    brotli_quality: int = 4,
+    brotli_window: int = 22
+) -> bytes:
+    """Compress a complete body with the given content-coding"""
+    if encoding == "br":
+        return brotli.compress(content, quality=brotli_quality, lgwin=brotli_window)
+    if encoding == "gzip":
+        return gzip.compress(content, compresslevel=level)
+    if encoding == "deflate":
+        return zlib.compress(content, level=level)
+    raise ValueError(f"Unsupported content-coding: {encoding}")
+
+def _timed_call(func: Callable, data: bytes, *args) -> Tuple[bytes, float]:
+    """func(data, *args) with the CPU time it took on this thread"""
+    start = time.thread_time()
+    result = func(data, *args)
+    return result, time.thread_time() - start
+
+def _cpu_load() -> float:
+    """1-minute load average per core; 0.0 where the platform has none"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return 0.0
+
+class AdaptiveCompressor:
+    """Runs compression for the middlewares without stalling the event loop.
+
+    Payloads of offload_threshold bytes or more are compressed on a small
+    dedicated thread pool (zlib and brotli release the GIL), smaller ones
+    inline. Levels drop as event loop lag or CPU load rise, trading ratio
+    for latency only while the process is under pressure. Bytes saved and
+    CPU time are counted per encoding.
+    """
+
+    def __init__(
+        self,
+        offload_threshold: int = 64 * 1024,
+        max_workers: int = 2,
+        lag_threshold: float = 0.05,  # Recent loop lag (s) treated as full pressure
+        load_threshold: float = 0.9  # Load average per core treated as full pressure
+    ):
+        self.offload_threshold = offload_threshold
+        self.lag_threshold = lag_threshold
+        self.load_threshold = load_threshold
+        self.executor = BlockingExecutor(thread_workers=max_workers)
+        self.monitor = LoopLagMonitor()
+        self.stats: Dict[str, Any] = {
+            "inline": 0,
+            "offloaded": 0,
+            "reduced_level": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "cpu_seconds": 0.0
+        }
+
+    def pressure(self) -> float:
+        """0 when idle, 1 or more when loop lag or CPU load is at its threshold"""
+        return max(self.monitor.recent_lag / self.lag_threshold, _cpu_load() / self.load_threshold)
+
+    def choose_levels(self, level: int, brotli_quality: int) -> Tuple[int, int]:
+        """(zlib level, brotli quality) to use right now, never above the configured ones"""
+        pressure = self.pressure()
+        if pressure >= 1.0:
+            levels = (1, 0)
+        elif pressure >= 0.5:
+            levels = (min(level, 3), min(brotli_quality, 2))
+        else:
+            return level, brotli_quality
+        if levels != (level, brotli_quality):
+            self.stats["reduced_level"] += 1
+        return levels
+
+    async def run(self, encoding: str, func: Callable, data: bytes, *args) -> bytes:
+        """func(data, *args) -> compressed bytes, moved off the loop when data is large"""
+        self.monitor.start()
+        if len(data) >= self.offload_threshold:
+            self.stats["offloaded"] += 1
+            result, cpu_seconds = await self.executor.run_blocking(_timed_call, func, data, *args)
+        else:
+            self.stats["inline"] += 1
+            result, cpu_seconds = _timed_call(func, data, *args)
+        self.stats["bytes_in"] += len(data)
+        self.stats["bytes_out"] += len(result)
+        self.stats["cpu_seconds"] += cpu_seconds
+        COMPRESSION_BYTES_SAVED.labels(encoding=encoding).inc(max(len(data) - len(result), 0))
+        COMPRESSION_CPU_SECONDS.labels(encoding=encoding).inc(cpu_seconds)
+        return result
+
+    async def compress(
+        self,
+        content: bytes,
+        encoding: str,
+        level: int = 6,
+        brotli_quality: int = 4,
+        brotli_window: int = 22,
+        adaptive: bool = True
+    ) -> bytes:
+        if adaptive:
+            level, brotli_quality = self.choose_levels(level, brotli_quality)
+        return await self.run(encoding, compress_body, content, encoding, level, brotli_quality, brotli_window)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+        stats["bytes_saved_per_cpu_ms"] = (
+            round(stats["bytes_saved"] / (stats["cpu_seconds"] * 1000), 1) if stats["cpu_seconds"] else 0.0
+        )
+        stats["recent_loop_lag_ms"] = round(self.monitor.recent_lag * 1000, 2)
+        return stats
+
+_default_compressor: Optional[AdaptiveCompressor] = None
+_default_lock = threading.Lock()
+
+def get_compressor() -> AdaptiveCompressor:
+    """Process-wide compressor shared by the compression and cache middlewares"""
+    global _default_compressor
+    with _default_lock:
+        if _default_compressor is None:
+            _default_compressor = AdaptiveCompressor()
+        return _default_compressor
+
 class CompressionMiddleware:
     def __init__(
         self,
@@ -17,7 +185,9 @@ class CompressionMiddleware:
         exclude_types: set = {"image/", "video/", "audio/"},
         brotli_quality: int = 4,  # Brotli quality level (0-11)
         brotli_window: int = 22,  # Brotli window size (10-24)
+        compressor: Optional[AdaptiveCompressor] = None
     ):
+        self.compressor = compressor or get_compressor()
         self.minimum_size = minimum_size
         self.compression_level = compression_level
         self.exclude_paths = exclude_paths
@@ -28,7 +198,8 @@ class CompressionMiddleware:
             "gzip": 0,
             "br": 0,
             "deflate": 0,
-            "uncompressed": 0
+            "uncompressed": 0,
+            "precompressed": 0
         }
 
     @lru_cache(maxsize=1000)
@@ -76,41 +247,31 @@ class CompressionMiddleware:
         encoding: str
     ) -> Optional[bytes]:
         """Compress content using specified encoding"""
+        if encoding not in SUPPORTED_ENCODINGS:
+            return None
         try:
-            if encoding == "br":
-                compressed = brotli.compress(
-                    content,
-                    quality=self.brotli_quality,
-                    lgwin=self.brotli_window
-                )
-                self.compression_stats["br"] += 1
-                return compressed
-
-            elif encoding == "gzip":
-                compressed = gzip.compress(
-                    content,
-                    compresslevel=self.compression_level
-                )
-                self.compression_stats["gzip"] += 1
-                return compressed
-
-            elif encoding == "deflate":
-                compressed = zlib.compress(
-                    content,
-                    level=self.compression_level
-                )
-                self.compression_stats["deflate"] += 1
-                return compressed
+            compressed = await self.compressor.compress(
+                content,
+                encoding,
+                level=self.compression_level,
+                brotli_quality=self.brotli_quality,
+                brotli_window=self.brotli_window
+            )
+            self.compression_stats[encoding] += 1
+            return compressed
 
         except Exception as e:
             logger.error(f"Compression error with {encoding}: {str(e)}")
             return None
 
-        return None
-
     async def __call__(self, request: Request, call_next: Callable):
         response = await call_next(request)
 
+        # Already encoded upstream (e.g. a precompressed cache variant): pass through untouched
+        if "content-encoding" in response.headers:
+            self.compression_stats["precompressed"] += 1
+            return response
+
         # Get response content
         response_body = await response.body()
         
@@ -156,11 +317,198 @@ class CompressionMiddleware:
         self.compression_stats["uncompressed"] += 1
         return response
 
-    def get_compression_stats(self) -> Dict[str, int]:
+    def get_compression_stats(self) -> Dict[str, Any]:
         """Get compression statistics"""
-        return self.compression_stats.copy()
+        return dict(self.compression_stats, cost=self.compressor.get_stats())
 
     def reset_stats(self):
         """Reset compression statistics"""
         for key in self.compression_stats:
             self.compression_stats[key] = 0
+
+class StreamingCompressor:
+    """Incremental encoder for one response body, fed chunk by chunk"""
+
+    def __init__(self, encoding: str, level: int = 6, brotli_quality: int = 4, brotli_window: int = 22):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality, lgwin=brotli_window)
+        elif encoding in ("gzip", "deflate"):
+            # wbits 31 writes a gzip wrapper, 15 the zlib wrapper HTTP "deflate" means
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31 if encoding == "gzip" else 15)
+        else:
+            raise ValueError(f"Unsupported content-coding: {encoding}")
+
+    def compress(self, chunk: bytes, flush: bool = False) -> bytes:
+        """Encode a chunk; flush forces everything so far out to the client"""
+        if self.encoding == "br":
+            data = self._brotli.process(chunk)
+            return data + self._brotli.flush() if flush else data
+        data = self._zlib.compress(chunk)
+        return data + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else data
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+class StreamingCompressionMiddleware:
+    """Pure ASGI compression that encodes the body as it is sent.
+
+    Nothing is buffered beyond the first body message: a Content-Length (or
+    a single-message body) below minimum_size is passed through, anything
+    else is compressed incrementally and sent with chunked transfer
+    encoding. Event streams are flushed after every chunk so clients see
+    each event as it is produced.
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        minimum_size: int = 500,
+        compression_level: int = 6,
+        exclude_paths: set = {"/health", "/metrics"},
+        exclude_types: set = {"image/", "video/", "audio/"},
+        brotli_quality: int = 4,
+        brotli_window: int = 22,
+        flush_types: Tuple[str, ...] = ("text/event-stream", "application/x-ndjson"),
+        compressor: Optional[AdaptiveCompressor] = None
+    ):
+        self.app = app
+        self.compressor = compressor or get_compressor()
+        self.minimum_size = minimum_size
+        self.compression_level = compression_level
+        self.exclude_paths = exclude_paths
+        self.exclude_types = tuple(exclude_types)
+        self.brotli_quality = brotli_quality
+        self.brotli_window = brotli_window
+        self.flush_types = flush_types
+        self.compression_stats: Dict[str, int] = {
+            "gzip": 0,
+            "br": 0,
+            "deflate": 0,
+            "uncompressed": 0,
+            "precompressed": 0,
+            "streamed": 0
+        }
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable):
+        if scope["type"] != "http" or scope.get("method") == "HEAD" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(header_value(scope.get("headers", []), b"accept-encoding") or "")
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(self, encoding, send))
+
+    def get_compression_stats(self) -> Dict[str, Any]:
+        """Get compression statistics"""
+        return dict(self.compression_stats, cost=self.compressor.get_stats())
+
+class _CompressingSend:
+    """ASGI send wrapper for one response: holds the start message until the first body chunk"""
+
+    def __init__(self, middleware: StreamingCompressionMiddleware, encoding: str, send: Callable):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Dict[str, Any]] = None
+        self.compressor: Optional[StreamingCompressor] = None
+        self.passthrough = False
+        self.flush_each_chunk = False
+
+    async def __call__(self, message: Dict[str, Any]):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not self._should_compress(body, more_body):
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            await self._begin(body, more_body)
+            return
+        data = await self.middleware.compressor.run(
+            self.encoding, self.compressor.compress, body, self.flush_each_chunk
+        )
+        if not more_body:
+            data += self.compressor.finish()
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _should_compress(self, body: bytes, more_body: bool) -> bool:
+        middleware = self.middleware
+        headers = self.start["headers"]
+        if header_value(headers, b"content-encoding") is not None:
+            middleware.compression_stats["precompressed"] += 1
+            return False
+        content_type = header_value(headers, b"content-type") or ""
+        content_length = header_value(headers, b"content-length")
+        # Decide on Content-Length when known, else on a complete single-message body
+        size = None  # Open-ended stream: always worth compressing
+        if content_length is not None:
+            try:
+                size = int(content_length)
+            except ValueError:
+                logger.debug(f"Ignoring invalid Content-Length {content_length!r}")
+        if size is None and not more_body:
+            size = len(body)
+        if (
+            self.start["status"] in (204, 304) or
+            content_type.startswith(middleware.exclude_types) or
+            (size is not None and size < middleware.minimum_size)
+        ):
+            middleware.compression_stats["uncompressed"] += 1
+            return False
+        return True
+
+    async def _begin(self, body: bytes, more_body: bool):
+        middleware = self.middleware
+        content_type = header_value(self.start["headers"], b"content-type") or ""
+        self.flush_each_chunk = content_type.startswith(middleware.flush_types)
+        level, brotli_quality = middleware.compressor.choose_levels(
+            middleware.compression_level, middleware.brotli_quality
+        )
+        self.compressor = StreamingCompressor(
+            self.encoding,
+            level=level,
+            brotli_quality=brotli_quality,
+            brotli_window=middleware.brotli_window
+        )
+        data = await middleware.compressor.run(
+            self.encoding, self.compressor.compress, body, self.flush_each_chunk and more_body
+        )
+        if not more_body:
+            data += self.compressor.finish()
+            if len(data) >= len(body):
+                # Compression did not help a complete body; send it as is
+                self.passthrough = True
+                middleware.compression_stats["uncompressed"] += 1
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+
+        headers = set_header(self.start["headers"], b"content-encoding", self.encoding)
+        # A known length is only kept for single-message bodies; streams go out chunked
+        headers = set_header(headers, b"content-length", str(len(data)) if not more_body else None)
+        vary = header_value(headers, b"vary")
+        if not vary:
+            headers = set_header(headers, b"vary", "Accept-Encoding")
+        elif "accept-encoding" not in vary.lower():
+            headers = set_header(headers, b"vary", f"{vary}, Accept-Encoding")
+        etag = header_value(headers, b"etag")
+        if etag and not etag.startswith("W/"):
+            # The encoded body is a different representation from the identity one
+            headers = set_header(headers, b"etag", f'{etag[:-1]}-{self.encoding}"')
+        middleware.compression_stats[self.encoding] += 1
+        if more_body:
+            middleware.compression_stats["streamed"] += 1
+        await self.send(dict(self.start, headers=headers))
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
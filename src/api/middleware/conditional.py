@@ -0,0 +1,76 @@
+from fastapi import Request, Response
+from typing import Any, Dict, Optional
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Headers a 304 must repeat from the full response (RFC 9110 15.4.5)
+NOT_MODIFIED_HEADERS = ("etag", "last-modified", "cache-control", "expires", "vary", "content-location")
+
+def compute_etag(body: bytes, weak: bool = False) -> str:
+    """Entity tag from a fast 128-bit hash of the body"""
+    tag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    return f"W/{tag}" if weak else tag
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # Model timestamps are stored as naive UTC (datetime.utcnow); HTTP dates must be in GMT
+    return parsed.astimezone(timezone.utc) if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def find_last_modified(body: bytes) -> Optional[str]:
+    """Latest updated_at in a JSON body (object, list, or {"data": ...} envelope) as an HTTP date"""
+    if b'"updated_at"' not in body:
+        return None
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if isinstance(data, dict) and "updated_at" not in data:
+        data = data.get("data", data)
+    items = data if isinstance(data, list) else [data]
+    timestamps = [
+        ts for ts in (
+            _parse_timestamp(item.get("updated_at")) for item in items if isinstance(item, dict)
+        ) if ts is not None
+    ]
+    if not timestamps:
+        return None
+    return format_datetime(max(timestamps).replace(microsecond=0), usegmt=True)
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since when no ETag condition is sent"""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    """Bodiless 304 carrying the validators and caching headers of the full response"""
+    kept = {key: value for key, value in headers.items() if key.lower() in NOT_MODIFIED_HEADERS}
+    return Response(status_code=304, headers=kept)
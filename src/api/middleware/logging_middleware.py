@@ -1,12 +1,13 @@
 import logging
 import time
 import json
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, List
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 import uuid
 import asyncio
 from datetime import datetime
+from .asgi import ASGIApp, Scope, Message, header_value, scope_state
 
 logger = logging.getLogger(__name__)
 
@@ -41,27 +42,30 @@ class LoggingMiddleware:
     async def _get_request_body(self, request: Request) -> str:
         """Safely get and format request body"""
         try:
-            body = await request.body()
-            if not body:
-                return ""
-            
-            body_str = body.decode()
-            if len(body_str) > self.max_body_length:
-                return f"{body_str[:self.max_body_length]}... (truncated)"
-            
-            try:
-                body_json = json.loads(body_str)
-                return json.dumps(self._mask_sensitive_data(body_json))
-            except json.JSONDecodeError:
-                return body_str
+            return self._format_body(await request.body())
         except Exception as e:
             logger.warning(f"Error reading request body: {str(e)}")
             return ""
 
+    def _format_body(self, body: bytes, truncated: bool = False) -> str:
+        """Body as a log string: truncated, and with sensitive JSON fields masked"""
+        if not body:
+            return ""
+        
+        body_str = body.decode(errors="replace")
+        if truncated or len(body_str) > self.max_body_length:
+            return f"{body_str[:self.max_body_length]}... (truncated)"
+        
+        try:
+            body_json = json.loads(body_str)
+            return json.dumps(self._mask_sensitive_data(body_json))
+        except json.JSONDecodeError:
+            return body_str
+
     def _format_log_message(
         self,
         request: Request,
-        response: Response,
+        status_code: int,
         request_body: str,
         response_body: str,
         duration: float,
@@ -75,10 +79,10 @@ class LoggingMiddleware:
             "method": request.method,
             "path": request.url.path,
             "query_params": str(request.query_params),
-            "client_ip": request.client.host,
+            "client_ip": request.client.host if request.client else None,
             "user_agent": request.headers.get("user-agent", ""),
             "request_body": request_body if self.log_request_body else "***",
-            "response_status": response.status_code,
+            "response_status": status_code,
             "response_body": response_body if self.log_response_body else "***",
             "duration_ms": round(duration * 1000, 2),
             "user_id": getattr(request.state, "user", {}).get("id", None)
@@ -107,32 +111,102 @@ class LoggingMiddleware:
             # Format and log the message
             log_data = self._format_log_message(
                 request=request,
-                response=response,
+                status_code=response.status_code,
                 request_body=request_body,
                 response_body=response_body,
                 duration=duration,
                 request_id=request_id
             )
-
-            # Log based on response status
-            if response.status_code >= 500:
-                logger.error(json.dumps(log_data))
-            elif response.status_code >= 400:
-                logger.warning(json.dumps(log_data))
-            else:
-                logger.info(json.dumps(log_data))
+            self._log(response.status_code, log_data)
 
             return response
 
         except Exception as e:
-            duration = time.time() - start_time
-            logger.error(json.dumps({
-                "timestamp": datetime.utcnow().isoformat(),
-                "request_id": request_id,
-                "app_name": self.app_name,
-                "method": request.method,
-                "path": request.url.path,
-                "error": str(e),
-                "duration_ms": round(duration * 1000, 2)
-            }))
+            self._log_error(request, request_id, e, time.time() - start_time)
             raise
+
+    def _log(self, status_code: int, log_data: Dict[str, Any]):
+        # Log based on response status
+        if status_code >= 500:
+            logger.error(json.dumps(log_data))
+        elif status_code >= 400:
+            logger.warning(json.dumps(log_data))
+        else:
+            logger.info(json.dumps(log_data))
+
+    def _log_error(self, request: Request, request_id: str, error: Exception, duration: float):
+        logger.error(json.dumps({
+            "timestamp": datetime.utcnow().isoformat(),
+            "request_id": request_id,
+            "app_name": self.app_name,
+            "method": request.method,
+            "path": request.url.path,
+            "error": str(error),
+            "duration_ms": round(duration * 1000, 2)
+        }))
+
+class ASGILoggingMiddleware(LoggingMiddleware):
+    """LoggingMiddleware as a pure ASGI layer.
+
+    The request body is logged from the chunks the app itself reads, and
+    the response body from the chunks it sends (JSON only), each capped at
+    max_body_length, so nothing is read ahead of the app or buffered.
+    """
+
+    def __init__(self, app: ASGIApp, **options):
+        super().__init__(**options)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = str(uuid.uuid4())
+        scope_state(scope)["request_id"] = request_id
+        request = Request(scope)
+        start_time = time.time()
+        limit = self.max_body_length + 1
+        request_chunks: List[bytes] = []
+        response_chunks: List[bytes] = []
+        status_code = 500
+        log_response = False
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if self.log_request_body and message["type"] == "http.request":
+                if sum(len(chunk) for chunk in request_chunks) < limit:
+                    request_chunks.append(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, log_response
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = header_value(message.get("headers", []), b"content-type") or ""
+                log_response = (
+                    self.log_response_body and
+                    content_type.startswith("application/json") and
+                    header_value(message.get("headers", []), b"content-encoding") is None
+                )
+            elif message["type"] == "http.response.body" and log_response:
+                if sum(len(chunk) for chunk in response_chunks) < limit:
+                    response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except Exception as e:
+            self._log_error(request, request_id, e, time.time() - start_time)
+            raise
+
+        request_body = b"".join(request_chunks)
+        response_body = b"".join(response_chunks)
+        log_data = self._format_log_message(
+            request=request,
+            status_code=status_code,
+            request_body=self._format_body(request_body[:limit], truncated=len(request_body) >= limit),
+            response_body=self._format_body(response_body[:limit], truncated=len(response_body) >= limit),
+            duration=time.time() - start_time,
+            request_id=request_id
+        )
+        self._log(status_code, log_data)
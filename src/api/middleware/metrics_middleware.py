@@ -5,7 +5,8 @@ import asyncio
 from collections import defaultdict
 from datetime import datetime, timedelta
 import logging
-from prometheus_client import Counter, Histogram, Gauge, generate_latest
+from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+from .asgi import ASGIApp, Scope, Message
 
 logger = logging.getLogger(__name__)
 
@@ -81,60 +82,61 @@ class MetricsMiddleware:
             # Process request
             response = await call_next(request)
             
-            # Calculate duration
-            duration = time.time() - start_time
-            
-            # Update metrics
-            status = str(response.status_code)
-            self.request_count.labels(
-                method=method,
-                endpoint=endpoint,
-                status=status
-            ).inc()
-            
-            self.request_latency.labels(
-                method=method,
-                endpoint=endpoint
-            ).observe(duration)
-            
             # Track response size
-            response_body = await response.body()
-            self.response_size.labels(
-                method=method,
-                endpoint=endpoint
-            ).observe(len(response_body))
-            
-            # Update internal metrics
-            self.status_codes[status] += 1
-            self.endpoint_usage[endpoint] += 1
-            
-            # Store recent request data
-            self.recent_requests.append({
-                "timestamp": datetime.utcnow().isoformat(),
-                "method": method,
-                "endpoint": endpoint,
-                "status": status,
-                "duration": duration,
-                "size": len(response_body)
-            })
-            
-            # Maintain recent requests limit
-            if len(self.recent_requests) > self.max_recent_requests:
-                self.recent_requests.pop(0)
-            
+            body = getattr(response, "body", b"")
+            self._record(method, endpoint, response.status_code, time.time() - start_time, len(body))
             return response
 
         except Exception as e:
-            # Track errors
-            error_type = type(e).__name__
-            self.errors[error_type] += 1
-            logger.error(f"Request error: {str(e)}")
+            self._record_error(e)
             raise
 
         finally:
             # Decrement in-progress requests
             self.requests_in_progress.labels(method=method).dec()
 
+    def _record(self, method: str, endpoint: str, status_code: int, duration: float, size: int):
+        """Update Prometheus and internal metrics for a finished request"""
+        status = str(status_code)
+        self.request_count.labels(
+            method=method,
+            endpoint=endpoint,
+            status=status
+        ).inc()
+        
+        self.request_latency.labels(
+            method=method,
+            endpoint=endpoint
+        ).observe(duration)
+        
+        self.response_size.labels(
+            method=method,
+            endpoint=endpoint
+        ).observe(size)
+        
+        # Update internal metrics
+        self.status_codes[status] += 1
+        self.endpoint_usage[endpoint] += 1
+        
+        # Store recent request data
+        self.recent_requests.append({
+            "timestamp": datetime.utcnow().isoformat(),
+            "method": method,
+            "endpoint": endpoint,
+            "status": status,
+            "duration": duration,
+            "size": size
+        })
+        
+        # Maintain recent requests limit
+        if len(self.recent_requests) > self.max_recent_requests:
+            self.recent_requests.pop(0)
+
+    def _record_error(self, error: Exception):
+        error_type = type(error).__name__
+        self.errors[error_type] += 1
+        logger.error(f"Request error: {str(error)}")
+
     def get_metrics_summary(self) -> Dict:
         """Get a summary of current metrics"""
         return {
@@ -155,3 +157,46 @@ class MetricsMiddleware:
         self.status_codes.clear()
         self.endpoint_usage.clear()
         self.recent_requests.clear()
+
+class ASGIMetricsMiddleware(MetricsMiddleware):
+    """MetricsMiddleware as a pure ASGI layer: status and size are read from the
+    messages as they pass, so the body is never buffered"""
+
+    def __init__(self, app: ASGIApp, **options):
+        super().__init__(**options)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == "/metrics":
+            await Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)(scope, receive, send)
+            return
+        if scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.time()
+        method = scope["method"]
+        endpoint = scope["path"]
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self.requests_in_progress.labels(method=method).inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+            self._record(method, endpoint, status_code, time.time() - start_time, size)
+        except Exception as e:
+            self._record_error(e)
+            raise
+        finally:
+            self.requests_in_progress.labels(method=method).dec()
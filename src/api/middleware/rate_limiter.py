@@ -1,10 +1,11 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
-from typing import Dict, Tuple
+from typing import Callable, Dict, Tuple
 import time
 import asyncio
 from datetime import datetime
 import logging
+from .asgi import ASGIApp, Scope, Message, client_ip, send_json
 
 logger = logging.getLogger(__name__)
 
@@ -46,13 +47,8 @@ class RateLimiter:
             return forwarded.split(",")[0]
         return request.client.host
 
-    async def __call__(self, request: Request, call_next):
-        await self.init()
-        
-        # Get client IP
-        client_ip = self._get_client_ip(request)
-        current_time = time.time()
-
+    def _register(self, client_ip: str, current_time: float) -> bool:
+        """Record a request from client_ip; False when it is over either limit"""
         # Initialize request list for new IPs
         if client_ip not in self.requests:
             self.requests[client_ip] = []
@@ -63,42 +59,74 @@ class RateLimiter:
             if current_time - req_time < self.expire_time
         ]
 
-        # Check burst limit
-        if len(self.requests[client_ip]) >= self.burst_limit:
-            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "error": "Too Many Requests",
-                    "detail": "Rate limit exceeded. Please try again later.",
-                    "retry_after": self.expire_time
-                }
-            )
-
-        # Check rate limit
+        # Check burst and rate limits
         request_count = len(self.requests[client_ip])
-        if request_count >= self.requests_per_minute:
+        if request_count >= self.burst_limit or request_count >= self.requests_per_minute:
             logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "error": "Too Many Requests",
-                    "detail": "Rate limit exceeded. Please try again later.",
-                    "retry_after": self.expire_time
-                }
-            )
+            return False
 
         # Add current request timestamp
         self.requests[client_ip].append(current_time)
+        return True
+
+    def _limit_exceeded_content(self) -> Dict:
+        return {
+            "error": "Too Many Requests",
+            "detail": "Rate limit exceeded. Please try again later.",
+            "retry_after": self.expire_time
+        }
+
+    def _limit_headers(self, client_ip: str, current_time: float) -> Dict[str, str]:
+        return {
+            "X-RateLimit-Limit": str(self.requests_per_minute),
+            "X-RateLimit-Remaining": str(
+                self.requests_per_minute - len(self.requests.get(client_ip, []))
+            ),
+            "X-RateLimit-Reset": str(int(current_time + self.expire_time))
+        }
+
+    async def __call__(self, request: Request, call_next):
+        await self.init()
+        
+        # Get client IP
+        client_ip = self._get_client_ip(request)
+        current_time = time.time()
+
+        if not self._register(client_ip, current_time):
+            return JSONResponse(status_code=429, content=self._limit_exceeded_content())
 
         # Add rate limit headers to response
         response = await call_next(request)
-        response.headers["X-RateLimit-Limit"] = str(self.requests_per_minute)
-        response.headers["X-RateLimit-Remaining"] = str(
-            self.requests_per_minute - len(self.requests[client_ip])
-        )
-        response.headers["X-RateLimit-Reset"] = str(
-            int(current_time + self.expire_time)
-        )
+        response.headers.update(self._limit_headers(client_ip, current_time))
 
         return response
+
+class ASGIRateLimiter(RateLimiter):
+    """RateLimiter as a pure ASGI layer; limit headers are added to the start message"""
+
+    def __init__(self, app: ASGIApp, **options):
+        super().__init__(**options)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        await self.init()
+
+        ip = client_ip(scope)
+        current_time = time.time()
+        if not self._register(ip, current_time):
+            await send_json(scope, receive, send, 429, self._limit_exceeded_content())
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                limit_headers = [
+                    (name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in self._limit_headers(ip, current_time).items()
+                ]
+                message = dict(message, headers=list(message.get("headers", [])) + limit_headers)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
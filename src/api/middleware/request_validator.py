@@ -1,8 +1,9 @@
 from fastapi import Request
 from fastapi.responses import JSONResponse
-from typing import Callable
+from typing import Callable, Dict, Optional, Tuple
 import uuid
 import json
+from .asgi import ASGIApp, Scope, Message, header_value, scope_state, send_json
 
 class RequestValidationMiddleware:
     def __init__(
@@ -17,28 +18,13 @@ class RequestValidationMiddleware:
         # Add request ID
         request.state.request_id = str(uuid.uuid4())
 
-        # Validate content type
-        content_type = request.headers.get("content-type", "").lower()
-        if request.method in ["POST", "PUT", "PATCH"]:
-            if not any(allowed in content_type for allowed in self.allowed_content_types):
-                return JSONResponse(
-                    status_code=415,
-                    content={
-                        "error": "Unsupported Media Type",
-                        "detail": f"Content-Type must be one of: {self.allowed_content_types}"
-                    }
-                )
-
-        # Validate content length
-        content_length = request.headers.get("content-length")
-        if content_length and int(content_length) > self.max_content_length:
-            return JSONResponse(
-                status_code=413,
-                content={
-                    "error": "Payload Too Large",
-                    "detail": f"Request body must not exceed {self.max_content_length} bytes"
-                }
-            )
+        error = self._validate(
+            request.method,
+            request.headers.get("content-type", ""),
+            request.headers.get("content-length")
+        )
+        if error is not None:
+            return JSONResponse(status_code=error[0], content=error[1])
 
         # Process the request
         response = await call_next(request)
@@ -47,3 +33,56 @@ class RequestValidationMiddleware:
         response.headers["X-Request-ID"] = request.state.request_id
         
         return response
+
+    def _validate(self, method: str, content_type: str, content_length: Optional[str]) -> Optional[Tuple[int, Dict]]:
+        """(status, error body) for a request that must be rejected, else None"""
+        # Validate content type
+        content_type = content_type.lower()
+        if method in ["POST", "PUT", "PATCH"]:
+            if not any(allowed in content_type for allowed in self.allowed_content_types):
+                return 415, {
+                    "error": "Unsupported Media Type",
+                    "detail": f"Content-Type must be one of: {self.allowed_content_types}"
+                }
+
+        # Validate content length
+        if content_length and int(content_length) > self.max_content_length:
+            return 413, {
+                "error": "Payload Too Large",
+                "detail": f"Request body must not exceed {self.max_content_length} bytes"
+            }
+        return None
+
+class ASGIRequestValidationMiddleware(RequestValidationMiddleware):
+    """RequestValidationMiddleware as a pure ASGI layer"""
+
+    def __init__(self, app: ASGIApp, **options):
+        super().__init__(**options)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Keep an id an outer layer (e.g. logging) already assigned
+        request_id = scope_state(scope).setdefault("request_id", str(uuid.uuid4()))
+
+        headers = scope.get("headers", [])
+        error = self._validate(
+            scope["method"],
+            header_value(headers, b"content-type") or "",
+            header_value(headers, b"content-length")
+        )
+        if error is not None:
+            await send_json(scope, receive, send, error[0], error[1])
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message = dict(
+                    message,
+                    headers=list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
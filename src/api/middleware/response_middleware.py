@@ -1,10 +1,13 @@
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
-from typing import Any, Dict, Optional, Union, List
+from typing import Any, Dict, Optional, Union, List, Callable
+import json
 import time
 import logging
 from datetime import datetime
 from pydantic import BaseModel, Field
+from .conditional import compute_etag, find_last_modified, is_not_modified, not_modified_response
+from .asgi import ASGIApp, Scope, call_app, header_value
 
 logger = logging.getLogger(__name__)
 
@@ -126,6 +129,9 @@ class ResponseFormattingMiddleware:
         return metadata
 
     async def __call__(self, request: Request, call_next: Callable):
+        return await self._handle(request, call_next)
+
+    async def _handle(self, request: Request, call_next: Callable) -> Response:
         if request.url.path in self.exclude_paths:
             return await call_next(request)
 
@@ -134,15 +140,32 @@ class ResponseFormattingMiddleware:
         try:
             response = await call_next(request)
             
-            # Skip formatting for non-JSON responses
-            if not response.headers.get("content-type", "").startswith("application/json"):
+            # Skip formatting for non-JSON and already-encoded responses
+            if (
+                not response.headers.get("content-type", "").startswith("application/json") or
+                "content-encoding" in response.headers
+            ):
                 return response
                 
             status_code = response.status_code
             success = 200 <= status_code < 400
             
-            # Get response content
-            body = await response.body()
+            # Get response content (call_next returns a streaming response)
+            body = getattr(response, "body", None)
+            if not isinstance(body, bytes):
+                body = b"".join([chunk async for chunk in response.body_iterator])
+            
+            # The envelope carries per-request metadata, so validate on the payload (weak ETag)
+            validators = {}
+            if success:
+                validators["etag"] = compute_etag(body, weak=True)
+                last_modified = find_last_modified(body)
+                if last_modified:
+                    validators["last-modified"] = last_modified
+                if is_not_modified(request, validators["etag"], last_modified):
+                    if self.track_stats:
+                        self._update_stats(success=True, status_code=304, duration=time.time() - start_time)
+                    return not_modified_response({**dict(response.headers), **validators})
             content = body.decode()
             
             try:
@@ -166,10 +189,13 @@ class ResponseFormattingMiddleware:
                     duration=time.time() - start_time
                 )
                 
+            headers = dict(response.headers)
+            headers.pop("content-length", None)
+            headers.update(validators)
             return JSONResponse(
                 status_code=status_code,
                 content=formatted_response.dict(),
-                headers=dict(response.headers),
+                headers=headers,
                 media_type="application/json"
             )
             
@@ -238,3 +264,28 @@ class ResponseFormattingMiddleware:
             "status_codes": {},
             "error_types": {}
         }
+
+class ASGIResponseFormattingMiddleware(ResponseFormattingMiddleware):
+    """ResponseFormattingMiddleware as a pure ASGI layer: only JSON responses,
+    which get re-enveloped, are buffered; everything else streams through"""
+
+    def __init__(self, app: ASGIApp, **options):
+        super().__init__(**options)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Callable, send: Callable):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        def is_json(status: int, headers) -> bool:
+            return (
+                (header_value(headers, b"content-type") or "").startswith("application/json") and
+                header_value(headers, b"content-encoding") is None
+            )
+
+        async def call_next(request: Request) -> Response:
+            return await call_app(self.app, scope, receive, send, is_json)
+
+        response = await self._handle(Request(scope, receive), call_next)
+        await response(scope, receive, send)
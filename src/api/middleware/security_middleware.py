@@ -1,11 +1,12 @@
 from fastapi import Request, Response, HTTPException
-from typing import Callable, Dict, List, Optional, Set
+from typing import Callable, Dict, List, Optional, Set, Tuple
 import secrets
 import hashlib
 import time
 import re
 import logging
 from datetime import datetime, timedelta
+from .asgi import ASGIApp, ForwardedResponse, Scope, Message, call_app, header_value, send_json
 
 logger = logging.getLogger(__name__)
 
@@ -90,6 +91,23 @@ class SecurityMiddleware:
         
         return cleaned
 
+    def _clean_body(self, body: bytes, content_type: Optional[str]) -> bytes:
+        """Clean an encoded HTML/XML body, keeping the charset it declares.
+
+        Undecodable bytes are replaced rather than failing the response.
+        """
+        charset = "utf-8"
+        for param in (content_type or "").split(";")[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "charset" and value.strip():
+                charset = value.strip().strip('"')
+        try:
+            content = body.decode(charset, errors="replace")
+        except LookupError:
+            charset = "utf-8"
+            content = body.decode(charset, errors="replace")
+        return self._clean_html(content).encode(charset, errors="replace")
+
     async def _check_rate_limit(self, request: Request) -> bool:
         """Check if request is within rate limits"""
         client_ip = request.client.host
@@ -117,15 +135,20 @@ class SecurityMiddleware:
             
         return False
 
+    def _security_headers(self) -> Dict[str, str]:
+        return {
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": "DENY",
+            "X-XSS-Protection": "1; mode=block",
+            "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+            "Content-Security-Policy": self._get_csp_policy(),
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+            "Permissions-Policy": self._get_permissions_policy()
+        }
+
     def _add_security_headers(self, response: Response):
         """Add security headers to response"""
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = self._get_csp_policy()
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = self._get_permissions_policy()
+        response.headers.update(self._security_headers())
 
     def _get_csp_policy(self) -> str:
         """Get Content Security Policy"""
@@ -171,8 +194,7 @@ class SecurityMiddleware:
 
         # XSS protection for HTML/XML content
         if self.xss_enable and response.headers.get("content-type") in self.xss_content_types:
-            content = response.body.decode()
-            cleaned_content = self._clean_html(content)
+            cleaned_content = self._clean_body(response.body, response.headers.get("content-type"))
             response = Response(
                 content=cleaned_content,
                 status_code=response.status_code,
@@ -182,20 +204,23 @@ class SecurityMiddleware:
 
         # Set new CSRF token
         if request.method in self.csrf_safe_methods:
-            token = self._generate_csrf_token()
-            self.csrf_tokens[token] = {
-                "expires": datetime.utcnow() + timedelta(hours=24)
-            }
-            response.set_cookie(
-                self.csrf_cookie_name,
-                token,
-                httponly=True,
-                secure=True,
-                samesite="strict"
-            )
+            self._set_csrf_cookie(response)
 
         return response
 
+    def _set_csrf_cookie(self, response: Response):
+        token = self._generate_csrf_token()
+        self.csrf_tokens[token] = {
+            "expires": datetime.utcnow() + timedelta(hours=24)
+        }
+        response.set_cookie(
+            self.csrf_cookie_name,
+            token,
+            httponly=True,
+            secure=True,
+            samesite="strict"
+        )
+
     def cleanup_expired_tokens(self):
         """Clean up expired CSRF tokens and rate limit data"""
         current_time = datetime.utcnow()
@@ -215,3 +240,54 @@ class SecurityMiddleware:
         ]
         for ip in expired_ips:
             del self.rate_limits[ip]
+
+class ASGISecurityMiddleware(SecurityMiddleware):
+    """SecurityMiddleware as a pure ASGI layer.
+
+    Headers and the CSRF cookie are added to the start message; only
+    HTML/XML responses are buffered, for XSS cleaning.
+    """
+
+    def __init__(self, app: ASGIApp, **options):
+        super().__init__(**options)
+        self.app = app
+
+    def _extra_headers(self, method: str) -> List[Tuple[bytes, bytes]]:
+        extra = Response()
+        if self.secure_headers:
+            extra.headers.update(self._security_headers())
+        if method in self.csrf_safe_methods:
+            self._set_csrf_cookie(extra)
+        return [(name, value) for name, value in extra.raw_headers if name != b"content-length"]
+
+    def _needs_cleaning(self, status: int, headers: List[Tuple[bytes, bytes]]) -> bool:
+        content_type = (header_value(headers, b"content-type") or "").split(";")[0].strip()
+        return self.xss_enable and content_type in self.xss_content_types
+
+    async def __call__(self, scope: Scope, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope, receive)
+        if not await self._check_rate_limit(request):
+            await send_json(scope, receive, send, 429, {"detail": "Rate limit exceeded"})
+            return
+        if not self._validate_csrf_token(request):
+            await send_json(scope, receive, send, 403, {"detail": "Invalid CSRF token"})
+            return
+
+        extra_headers = self._extra_headers(scope["method"])
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message = dict(message, headers=list(message.get("headers", [])) + extra_headers)
+            await send(message)
+
+        response = await call_app(self.app, scope, receive, send_wrapper, self._needs_cleaning)
+        if isinstance(response, ForwardedResponse):
+            return
+        cleaned = self._clean_body(response.body, response.headers.get("content-type"))
+        headers = [(name, value) for name, value in response.raw_headers if name != b"content-length"]
+        cleaned_response = Response(content=cleaned, status_code=response.status_code)
+        cleaned_response.raw_headers = headers + [(b"content-length", str(len(cleaned_response.body)).encode())]
+        await cleaned_response(scope, receive, send_wrapper)
@@ -5,6 +5,7 @@ import logging
 import time
 from datetime import datetime
 from functools import partial
+from .asgi import ASGIApp, Scope, Message, scope_state, send_json
 
 logger = logging.getLogger(__name__)
 
@@ -161,6 +162,75 @@ class TimeoutMiddleware:
             "request_times": []
         }
 
+def _retrieve_abandoned(task: asyncio.Future):
+    """Consume the outcome of an app task cancelled at the deadline.
+
+    The task may still be running when the grace period ends, or fail while
+    handling its cancellation; either way nothing awaits it any more, and an
+    unretrieved exception would be reported when it is garbage collected.
+    """
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("Request failed after being cancelled", exc_info=task.exception())
+
+class ASGITimeoutMiddleware(TimeoutMiddleware):
+    """TimeoutMiddleware as a pure ASGI layer.
+
+    The app runs as a task that is cancelled at the deadline. A 504 is sent
+    only if the app had not started its response; a response that was
+    already streaming is cut off instead, since its status is on the wire.
+    """
+
+    def __init__(self, app: ASGIApp, **options):
+        super().__init__(**options)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Callable, send: Callable):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        timeout_seconds = self._get_timeout(scope["path"])
+        start_time = time.time()
+        # Read by RequestTimeout through request.state
+        state = scope_state(scope)
+        state["timeout"] = timeout_seconds
+        state["timeout_start"] = start_time
+        response_started = False
+        timed_out = False
+
+        async def send_wrapper(message: Message):
+            nonlocal response_started
+            if timed_out:
+                return  # Past the deadline the app no longer owns the response
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        task = asyncio.ensure_future(self.app(scope, receive, send_wrapper))
+        try:
+            done, _ = await asyncio.wait({task}, timeout=timeout_seconds)
+            if task in done:
+                task.result()
+                return
+            timed_out = True
+            logger.warning(
+                f"Request timeout: {scope['method']} {scope['path']} "
+                f"after {timeout_seconds} seconds"
+            )
+            task.cancel()
+            task.add_done_callback(_retrieve_abandoned)
+            # Give it a grace period to cleanup
+            await asyncio.wait({task}, timeout=self.grace_period)
+            if not response_started:
+                await send_json(scope, receive, send, 504, self.error_response)
+        except asyncio.CancelledError:
+            task.cancel()
+            task.add_done_callback(_retrieve_abandoned)
+            raise
+        finally:
+            if self.track_stats:
+                self._update_stats(time.time() - start_time, timed_out)
+
 class RequestTimeout:
     """Context manager to check remaining timeout in route handlers"""
     
@@ -0,0 +1,170 @@
+from typing import Dict, Iterable, List, Tuple
+from dataclasses import dataclass
+from collections import Counter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# PyMuPDF span flag for bold text
+_BOLD_FLAG = 2 ** 4
+
+
+@dataclass
+class TextBlock:
+    """A text block extracted from a PDF page"""
+    page: int  # 1-based page number
+    text: str
+    font_size: float
+    bold: bool
+
+
+@dataclass
+class Chunk:
+    """A chunk of text with its page range and section heading path"""
+    text: str
+    page_start: int
+    page_end: int
+    heading_path: Tuple[str, ...]
+
+    @property
+    def metadata(self) -> Dict:
+        return {
+            "page_start": self.page_start,
+            "page_end": self.page_end,
+            "heading_path": " > ".join(self.heading_path),
+            "section": self.heading_path[-1] if self.heading_path else ""
+        }
+
+
+def extract_blocks(doc, max_pages=float('inf')) -> List[TextBlock]:
+    """Extract text blocks with dominant font size and weight from a PyMuPDF document"""
+    blocks = []
+    total_pages = min(len(doc), max_pages)
+    for page_num in range(total_pages):
+        page_dict = doc[page_num].get_text("dict")
+        for block in page_dict.get("blocks", []):
+            if block.get("type") != 0:  # Skip image blocks
+                continue
+            lines = []
+            sizes = Counter()
+            bold_chars = 0
+            total_chars = 0
+            for line in block.get("lines", []):
+                line_text = "".join(span.get("text", "") for span in line.get("spans", []))
+                if line_text.strip():
+                    lines.append(line_text)
+                for span in line.get("spans", []):
+                    length = len(span.get("text", "").strip())
+                    if not length:
+                        continue
+                    sizes[round(span.get("size", 0), 1)] += length
+                    total_chars += length
+                    if span.get("flags", 0) & _BOLD_FLAG:
+                        bold_chars += length
+            text = "\n".join(lines).strip()
+            if not text:
+                continue
+            blocks.append(TextBlock(
+                page=page_num + 1,
+                text=text,
+                font_size=sizes.most_common(1)[0][0],
+                bold=bold_chars * 2 > total_chars
+            ))
+    return blocks
+
+
+class StructureAwareChunker:
+    """Split PDF text blocks on section boundaries, keeping pages and heading paths"""
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        heading_size_ratio: float = 1.15,
+        max_heading_length: int = 120
+    ):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.heading_size_ratio = heading_size_ratio
+        self.max_heading_length = max_heading_length
+
+    def _body_font_size(self, blocks: List[TextBlock]) -> float:
+        """Most common font size weighted by text length"""
+        sizes = Counter()
+        for block in blocks:
+            sizes[block.font_size] += len(block.text)
+        return sizes.most_common(1)[0][0] if sizes else 0.0
+
+    def _is_heading(self, block: TextBlock, body_size: float) -> bool:
+        text = block.text
+        if len(text) > self.max_heading_length or "\n" in text or text.endswith((".", ",", ";")):
+            return False
+        if body_size and block.font_size >= body_size * self.heading_size_ratio:
+            return True
+        return block.bold and block.font_size >= body_size
+
+    def _heading_levels(self, blocks: List[TextBlock], body_size: float) -> Dict[float, int]:
+        """Map heading font sizes to levels (largest size is level 1)"""
+        sizes = sorted(
+            {block.font_size for block in blocks if self._is_heading(block, body_size)},
+            reverse=True
+        )
+        return {size: level for level, size in enumerate(sizes, start=1)}
+
+    def _split_long(self, text: str) -> Iterable[str]:
+        """Window an oversized block into chunk_size pieces with overlap"""
+        step = max(1, self.chunk_size - self.chunk_overlap)
+        for start in range(0, len(text), step):
+            yield text[start:start + self.chunk_size]
+            if start + self.chunk_size >= len(text):
+                break
+
+    def chunk(self, blocks: List[TextBlock]) -> List[Chunk]:
+        """Chunk blocks in a single pass, flushing at headings and size limits"""
+        body_size = self._body_font_size(blocks)
+        levels = self._heading_levels(blocks, body_size)
+
+        chunks: List[Chunk] = []
+        heading_stack: List[Tuple[int, str]] = []
+        parts: List[str] = []
+        length = 0
+        page_start = page_end = None
+        only_overlap = False  # True while parts hold nothing but the carried tail
+
+        def heading_path() -> Tuple[str, ...]:
+            return tuple(text for _, text in heading_stack)
+
+        def flush(carry_overlap: bool):
+            nonlocal parts, length, page_start, only_overlap
+            if parts and not only_overlap:
+                text = "\n\n".join(parts)
+                chunks.append(Chunk(text, page_start, page_end, heading_path()))
+                if carry_overlap and self.chunk_overlap:
+                    tail = text[-self.chunk_overlap:]
+                    parts, length, page_start, only_overlap = [tail], len(tail), page_end, True
+                    return
+            parts, length, page_start, only_overlap = [], 0, None, False
+
+        for block in blocks:
+            if self._is_heading(block, body_size):
+                flush(carry_overlap=False)
+                level = levels.get(block.font_size, len(levels) + 1)
+                while heading_stack and heading_stack[-1][0] >= level:
+                    heading_stack.pop()
+                heading_stack.append((level, block.text.strip()))
+                continue
+
+            pieces = [block.text] if len(block.text) <= self.chunk_size else self._split_long(block.text)
+            for piece in pieces:
+                if length and length + len(piece) + 2 > self.chunk_size:
+                    flush(carry_overlap=True)
+                if page_start is None:
+                    page_start = block.page
+                page_end = block.page
+                parts.append(piece)
+                length += len(piece) + 2
+                only_overlap = False
+
+        flush(carry_overlap=False)
+        logger.info(f"Created {len(chunks)} structure-aware chunks")
+        return chunks
@@ -2,10 +2,12 @@ from .app_config import AppConfig
 from .database import DatabaseConfig
 from .environment import EnvironmentConfig
 from .settings import Settings
+from .pipeline import Config
 
 __all__ = [
     'AppConfig',
     'DatabaseConfig',
     'EnvironmentConfig',
-    'Settings'
+    'Settings',
+    'Config'
 ]
\ No newline at end of file
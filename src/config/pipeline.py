@@ -1,3 +1,8 @@
+"""Pipeline settings (models, backends, chunking, retrieval, reports).
+
+Lives inside the config package: a src/config.py module next to the
+package is never imported, so settings there are silently unreachable.
+"""
 from dotenv import load_dotenv
 import os
 from datetime import timedelta
@@ -51,10 +56,33 @@ class Config(BaseConfig):
     EMBEDDING_MODEL = "text-embedding-3-large"
     EMBEDDING_DIMENSIONS = 1536
     
+    # Cost accounting (USD per million tokens)
+    CLAUDE_INPUT_COST_PER_MTOK = 3.0
+    CLAUDE_OUTPUT_COST_PER_MTOK = 15.0
+    
+    # Backend selection: "fake" swaps in the deterministic offline stand-ins
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "anthropic")
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+    FAKE_LLM_LATENCY = {
+        "distribution": os.getenv("FAKE_LLM_LATENCY_DISTRIBUTION", "lognormal"),
+        "mean": float(os.getenv("FAKE_LLM_LATENCY_MEAN", "0.5")),  # seconds per call
+        "spread": float(os.getenv("FAKE_LLM_LATENCY_SPREAD", "0.3"))
+    }
+    FAKE_EMBEDDING_LATENCY = {
+        "distribution": "fixed",
+        "mean": float(os.getenv("FAKE_EMBEDDING_LATENCY_MEAN", "0.05"))  # seconds per batch
+    }
+    FAKE_LLM_OUTPUT_WORDS = 400
+    
     # Processing settings
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
     
+    # Retrieval settings
+    RETRIEVAL_K = 4  # Chunks retrieved per query
+    RETRIEVAL_TOKEN_BUDGET = 6000  # Total prompt tokens for retrieved chunks
+    RETRIEVAL_MMR_LAMBDA = 0.7  # 1.0 = relevance only, 0.0 = diversity only
+    
     # Page settings
     try:
         _max_pages_env = os.getenv("MAX_PAGES")
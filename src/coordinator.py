@@ -3,10 +3,13 @@ import asyncio
 from .agents.reader_agent import ReaderAgent
 from .agents.analyzer_agent import AnalyzerAgent
 from .agents.report_agent import ReportAgent
-from .agents.review_agent import ReviewAgent
+from .agents.review_agent import ReviewAgent, ReviewVerdictError
 from .document_processor import DocumentProcessor
+from .utils.tracing import trace_span
+from .utils.accounting import UsageLedger, usage_revision
+from .utils.executor import run_blocking
+from .config import Config
 import logging
-import json
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +23,16 @@ class SwarmCoordinator:
             'report': ReportAgent(),
             'review': ReviewAgent()
         }
+        self.usage = UsageLedger(
+            input_cost_per_mtok=Config.CLAUDE_INPUT_COST_PER_MTOK,
+            output_cost_per_mtok=Config.CLAUDE_OUTPUT_COST_PER_MTOK
+        )
         self.retry_config = {
             'max_retries': 3,
             'delay': 1,
-            'backoff': 2
+            'backoff': 2,
+            # Raised as-is: another identical call would not fix them
+            'non_retryable': (ReviewVerdictError,)
         }
         logger.info("SwarmCoordinator initialization complete")
     
@@ -34,13 +43,14 @@ class SwarmCoordinator:
             'query': 'Provide a comprehensive technical analysis of the system architecture and implementation details.'
         }
     
-    def _prepare_final_output(self, reader_output, analyzer_output, final_report, review_output=None) -> Dict:
+    def _prepare_final_output(self, reader_output, analyzer_output, final_report, review_output=None, document=None) -> Dict:
         """Prepare the final output dictionary"""
         return {
             'reader_output': reader_output,
             'analyzer_output': analyzer_output,
             'final_report': final_report,
-            'review_output': review_output
+            'review_output': review_output,
+            'usage': self.usage.summary(document)
         }
     
     async def _handle_review_process(self, context: Dict, initial_report: Dict) -> Dict:
@@ -54,28 +64,30 @@ class SwarmCoordinator:
             logger.info("Starting Review Agent analysis...")
             
             try:
-                review_output = await self.execute_with_retry(
-                    'review',
-                    self.agents['review'].process,
-                    context
-                )
-                
-                review_content = review_output['claude']['content']
-                review_data = json.loads(review_content)
-                
-                if review_data.get('needs_revision', False):
-                    context['review_feedback'] = review_data
-                    logger.info(f"Revision needed (attempt {revision_attempt + 1}/{max_revision_attempts})")
-                    revision_attempt += 1
-                    
-                    current_report = await self.execute_with_retry(
-                        'report',
-                        self.agents['report'].process,
+                with trace_span("review_loop.iteration", attempt=revision_attempt + 1) as span, \
+                        usage_revision(revision_attempt + 1):
+                    review_output = await self.execute_with_retry(
+                        'review',
+                        self.agents['review'].process,
                         context
                     )
-                else:
-                    logger.info("No revisions needed. Report approved by Review Agent")
-                    return current_report
+                    
+                    review_data = review_output['claude']['verdict']
+                    span.set("needs_revision", bool(review_data.get('needs_revision', False)))
+                    
+                    if review_data.get('needs_revision', False):
+                        context['review_feedback'] = review_data
+                        logger.info(f"Revision needed (attempt {revision_attempt + 1}/{max_revision_attempts})")
+                        revision_attempt += 1
+                        
+                        current_report = await self.execute_with_retry(
+                            'report',
+                            self.agents['report'].process,
+                            context
+                        )
+                    else:
+                        logger.info("No revisions needed. Report approved by Review Agent")
+                        return current_report
                     
             except Exception as e:
                 logger.error(f"Error in review process: {str(e)}")
@@ -91,7 +103,10 @@ class SwarmCoordinator:
         
         while retries < self.retry_config['max_retries']:
             try:
-                return await method(*args, **kwargs)
+                with trace_span(f"agent.{agent_name}", attempt=retries + 1):
+                    return await method(*args, **kwargs)
+            except self.retry_config['non_retryable']:
+                raise
             except Exception as e:
                 retries += 1
                 if retries == self.retry_config['max_retries']:
@@ -102,9 +117,14 @@ class SwarmCoordinator:
     
     async def process_document(self, pdf_path: str) -> Dict[str, Dict]:
         """Process document through the agent pipeline"""
+        with self.usage.activate(document=pdf_path):
+            return await self._process_document(pdf_path)
+    
+    async def _process_document(self, pdf_path: str) -> Dict[str, Dict]:
         try:
             # Process document and create vector store
-            vector_store = self.document_processor.process_document(pdf_path)
+            # Parsing, embedding and FAISS building block, so keep them off the event loop
+            vector_store = await run_blocking(self.document_processor.process_document, pdf_path)
             context = self._initialize_context(vector_store)
             
             # Execute initial pipeline with retry logic
@@ -137,7 +157,8 @@ class SwarmCoordinator:
             return self._prepare_final_output(
                 reader_output,
                 analyzer_output,
-                final_report
+                final_report,
+                document=pdf_path
             )
             
         except Exception as e:
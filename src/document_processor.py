@@ -1,9 +1,13 @@
-from typing import List
+from typing import Dict, List, Tuple
 import fitz  # PyMuPDF
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_openai.embeddings import OpenAIEmbeddings
 from .config import Config
+from .fake_backends import create_fake_embeddings
+from .chunking import StructureAwareChunker, extract_blocks
+from .utils.tracing import trace_span
+from .utils.executor import get_executor
 import logging
 import os
 import hashlib
@@ -11,32 +15,76 @@ from tqdm import tqdm
 
 logger = logging.getLogger(__name__)
 
+# Bump when chunk text or metadata layout changes so stale vector stores are not reused
+CHUNKER_VERSION = "structured-v1"
+
+def chunk_pdf(pdf_path: str) -> Tuple[List[str], List[Dict]]:
+    """Split PDF on section boundaries, returning chunk texts and their metadata.
+
+    Module-level so it can run in a worker process.
+    """
+    try:
+        with fitz.open(pdf_path) as doc:
+            blocks = extract_blocks(doc, Config.get_max_pages())
+        logger.info(f"Extracted {len(blocks)} text blocks from PDF")
+        
+        chunker = StructureAwareChunker(
+            chunk_size=Config.CHUNK_SIZE,
+            chunk_overlap=Config.CHUNK_OVERLAP
+        )
+        chunks = chunker.chunk(blocks)
+        
+        texts = []
+        metadatas = []
+        for index, chunk in enumerate(chunks):
+            metadata = chunk.metadata
+            metadata["chunk_id"] = index
+            metadata["source"] = os.path.basename(pdf_path)
+            texts.append(chunk.text)
+            metadatas.append(metadata)
+        return texts, metadatas
+        
+    except Exception as e:
+        logger.error(f"Error chunking document: {str(e)}")
+        raise
+
 class DocumentProcessor:
     def __init__(self):
-        self.embedding_model = OpenAIEmbeddings(
-            model="text-embedding-3-large",
-            dimensions=1536
-        )
+        if Config.EMBEDDING_BACKEND == "fake":
+            self.embedding_model = create_fake_embeddings()
+        else:
+            self.embedding_model = OpenAIEmbeddings(
+                model="text-embedding-3-large",
+                dimensions=1536
+            )
         self.cache_dir = "cache"
         os.makedirs(self.cache_dir, exist_ok=True)
         
     def get_cache_path(self, pdf_path: str) -> str:
         """Generate cache file path based on PDF hash"""
         pdf_hash = hashlib.md5(open(pdf_path, 'rb').read()).hexdigest()
-        return os.path.join(self.cache_dir, f"{pdf_hash}.faiss")
+        # Fake embeddings live in a different vector space; never mix them with real ones
+        backend = "_fake" if Config.EMBEDDING_BACKEND == "fake" else ""
+        return os.path.join(self.cache_dir, f"{pdf_hash}_{CHUNKER_VERSION}{backend}.faiss")
         
     def process_document(self, pdf_path: str):
         """Process document with caching"""
+        with trace_span("ingest.process_document") as span:
+            return self._process_document(pdf_path, span)
+
+    def _process_document(self, pdf_path: str, span):
         cache_path = self.get_cache_path(pdf_path)
         
         if os.path.exists(cache_path):
             logger.info("Loading cached vector store...")
             try:
-                return FAISS.load_local(
+                vector_store = FAISS.load_local(
                     folder_path=cache_path, 
                     embeddings=self.embedding_model,
                     allow_dangerous_deserialization=True  # Only for local, trusted files
                 )
+                span.add("cache_hits")
+                return vector_store
             except Exception as e:
                 logger.warning(f"Cache load failed, reprocessing document: {str(e)}")
                 # If cache load fails, remove corrupt cache and reprocess
@@ -46,24 +94,29 @@ class DocumentProcessor:
                     pass
             
         try:
-            text = self.extract_text_from_pdf(pdf_path)
-            chunks = self.split_text(text)
+            with trace_span("ingest.chunk") as chunk_span:
+                # PDF parsing is CPU-bound; uses the process pool when one is configured
+                chunks, metadatas = get_executor().run_cpu_sync(chunk_pdf, pdf_path)
+                chunk_span.set("chunks", len(chunks))
+            span.set("chunks", len(chunks))
             
             # Batch process embeddings
             logger.info("Creating embeddings in batches...")
             batch_size = 100
             vector_store = None
             
-            with tqdm(total=len(chunks)) as pbar:
+            with trace_span("ingest.embed", chunks=len(chunks)), tqdm(total=len(chunks)) as pbar:
                 for i in range(0, len(chunks), batch_size):
                     batch = chunks[i:i + batch_size]
+                    batch_metadatas = metadatas[i:i + batch_size]
                     if vector_store is None:
                         vector_store = FAISS.from_texts(
                             texts=batch,
-                            embedding=self.embedding_model
+                            embedding=self.embedding_model,
+                            metadatas=batch_metadatas
                         )
                     else:
-                        vector_store.add_texts(batch)
+                        vector_store.add_texts(batch, metadatas=batch_metadatas)
                     pbar.update(len(batch))
             
             # Cache the vector store
@@ -99,6 +152,10 @@ class DocumentProcessor:
             logger.error(f"Error extracting text from PDF: {str(e)}")
             raise
 
+    def chunk_document(self, pdf_path: str) -> Tuple[List[str], List[Dict]]:
+        """Split PDF on section boundaries, returning chunk texts and their metadata"""
+        return chunk_pdf(pdf_path)
+
     def split_text(self, text: str) -> List[str]:
         """Split text into chunks"""
         try:
@@ -0,0 +1,210 @@
+"""Deterministic offline stand-ins for ChatAnthropic and OpenAIEmbeddings.
+
+Selected with LLM_BACKEND=fake / EMBEDDING_BACKEND=fake so the agent
+pipeline can be benchmarked without network calls or API spend.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .config import Config
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:  # Only needed for isinstance checks inside FAISS
+    Embeddings = object
+
+
+class LatencyModel:
+    """Seeded latency sampler: fixed, uniform or lognormal (mean seconds)"""
+
+    def __init__(self, distribution: str = "fixed", mean: float = 0.0, spread: float = 0.0, seed: int = 0):
+        if distribution not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.distribution = distribution
+        self.mean = mean
+        self.spread = spread
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "LatencyModel":
+        return cls(
+            distribution=config.get("distribution", "fixed"),
+            mean=config.get("mean", 0.0),
+            spread=config.get("spread", 0.0),
+            seed=config.get("seed", 0)
+        )
+
+    def sample(self) -> float:
+        if self.mean <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            return max(0.0, self._rng.uniform(self.mean - self.spread, self.mean + self.spread))
+        if self.distribution == "lognormal":
+            # Parameterized so the distribution's mean equals self.mean
+            mu = math.log(self.mean) - self.spread ** 2 / 2
+            return self._rng.lognormvariate(mu, self.spread)
+        return self.mean
+
+
+@dataclass
+class _FakeMessage:
+    content: str
+    usage_metadata: Dict[str, int]
+
+
+@dataclass
+class _FakeMessageChunk:
+    content: str
+    usage_metadata: Optional[Dict[str, int]] = None
+
+
+@dataclass
+class _FakeGeneration:
+    text: str
+    message: _FakeMessage
+
+
+@dataclass
+class _FakeLLMResult:
+    """Mirrors the parts of LangChain's LLMResult the agents read"""
+    generations: List[List[_FakeGeneration]]
+    llm_output: Dict[str, Any] = field(default_factory=dict)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class FakeChatModel:
+    """Async chat model returning deterministic canned responses after a simulated delay"""
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        output_words: int = 200,
+        sections: Optional[List[str]] = None,
+        review_verdict: Optional[Dict[str, Any]] = None
+    ):
+        self.latency = latency or LatencyModel()
+        self.output_words = output_words
+        self.sections = sections or ["Summary"]
+        self.review_verdict = review_verdict or {
+            "needs_revision": False,
+            "critical_issues": [],
+            "recommendations": [],
+            "additional_notes": "Offline review stand-in"
+        }
+        self.calls = 0
+
+    def _respond(self, messages: List[Dict[str, str]]) -> str:
+        # The ReviewAgent's system prompt asks for the JSON verdict format
+        if '"needs_revision"' in messages[0]["content"]:
+            return json.dumps(self.review_verdict)
+        seed = _digest("\n".join(message["content"] for message in messages))
+        words_per_section = max(1, self.output_words // len(self.sections))
+        body = []
+        for index, section in enumerate(self.sections):
+            filler = " ".join(f"{seed[(index + i) % len(seed):][:6]}" for i in range(words_per_section))
+            body.append(f"## {section}\n{filler}")
+        return "\n\n".join(body)
+
+    async def agenerate(self, message_batches: List[List[Dict[str, str]]], **kwargs) -> _FakeLLMResult:
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample())
+        generations = []
+        for messages in message_batches:
+            text = self._respond(messages)
+            prompt_tokens = sum(len(message["content"].split()) for message in messages)
+            generations.append([_FakeGeneration(
+                text=text,
+                message=_FakeMessage(
+                    content=text,
+                    usage_metadata={
+                        "input_tokens": prompt_tokens,
+                        "output_tokens": len(text.split()),
+                        "total_tokens": prompt_tokens + len(text.split())
+                    }
+                )
+            )])
+        return _FakeLLMResult(generations=generations)
+
+    async def astream(self, messages: List[Dict[str, str]], chunk_chars: int = 32, **kwargs):
+        """Yield the response in small pieces, spreading the latency across them"""
+        self.calls += 1
+        text = self._respond(messages)
+        pieces = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or [""]
+        delay = self.latency.sample() / len(pieces)
+        for piece in pieces[:-1]:
+            await asyncio.sleep(delay)
+            yield _FakeMessageChunk(content=piece)
+        await asyncio.sleep(delay)
+        prompt_tokens = sum(len(message["content"].split()) for message in messages)
+        yield _FakeMessageChunk(
+            content=pieces[-1],
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": len(text.split()),
+                "total_tokens": prompt_tokens + len(text.split())
+            }
+        )
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic unit-norm embeddings derived from a hash of the text"""
+
+    def __init__(self, dimensions: int = 1536, latency: Optional[LatencyModel] = None):
+        self.dimensions = dimensions
+        self.latency = latency or LatencyModel()
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        values = []
+        counter = 0
+        while len(values) < self.dimensions:
+            block = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+            values.extend(v / 2 ** 31 for v in struct.unpack("<8i", block))
+            counter += 1
+        values = values[:self.dimensions]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+def create_fake_chat_model(agent_name: str) -> FakeChatModel:
+    """Fake chat model configured from Config, seeded per agent for reproducible runs"""
+    latency_config = dict(Config.FAKE_LLM_LATENCY, seed=zlib.crc32(agent_name.encode("utf-8")))
+    return FakeChatModel(
+        latency=LatencyModel.from_config(latency_config),
+        output_words=Config.FAKE_LLM_OUTPUT_WORDS,
+        sections=Config.get_report_sections()
+    )
+
+
+def create_fake_embeddings() -> HashEmbeddings:
+    return HashEmbeddings(
+        dimensions=Config.EMBEDDING_DIMENSIONS,
+        latency=LatencyModel.from_config(Config.FAKE_EMBEDDING_LATENCY)
+    )
@@ -1,21 +1,23 @@
 import asyncio
 import os
 from .coordinator import SwarmCoordinator
-import json
+from .utils.tracing import Tracer, trace_span
+from .utils.executor import LoopLagMonitor
+from .utils.artifacts import ArtifactStore
 import logging
 import time
 from datetime import datetime
-from typing import Dict
 from src.config import EnvironmentConfig, DatabaseManager, LoggerConfig
 from fastapi import FastAPI
 from api.middleware.error_handler import error_handler
-from api.middleware.request_validator import RequestValidationMiddleware
-from api.middleware.rate_limiter import RateLimiter
+from api.middleware.asgi import MiddlewareStack
+from api.middleware.request_validator import ASGIRequestValidationMiddleware
+from api.middleware.rate_limiter import ASGIRateLimiter
 from api.middleware.auth_middleware import AuthMiddleware
-from api.middleware.logging_middleware import LoggingMiddleware
+from api.middleware.logging_middleware import ASGILoggingMiddleware
 from api.middleware.cors_middleware import CustomCORSMiddleware, CORSConfig
-from api.middleware.cache_middleware import CacheMiddleware
-from api.middleware.compression_middleware import CompressionMiddleware
+from api.middleware.cache_middleware import ASGICacheMiddleware
+from api.middleware.compression_middleware import StreamingCompressionMiddleware
 
 # Initialize configurations
 config = EnvironmentConfig()
@@ -30,105 +32,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def save_reports(results: dict, base_dir: str) -> Dict[str, tuple]:
-    """Save reports from both models"""
-    reports_dir = os.path.join(base_dir, "reports")
-    os.makedirs(reports_dir, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    paths = {}
-    
-    for model in ['claude']:
-        if model in results and isinstance(results[model], dict) and 'content' in results[model]:
-            # Save JSON report
-            json_path = os.path.join(reports_dir, f"implementation_report_{model}_{timestamp}.json")
-            with open(json_path, "w", encoding='utf-8') as f:
-                json.dump(results[model], f, indent=2, ensure_ascii=False)
-            
-            # Save TXT report
-            txt_path = os.path.join(reports_dir, f"implementation_report_{model}_{timestamp}.txt")
-            with open(txt_path, "w", encoding='utf-8') as f:
-                f.write("=" * 80 + "\n")
-                f.write(f"TECHNICAL IMPLEMENTATION REPORT ({model.upper()})\n")
-                f.write("=" * 80 + "\n\n")
-                
-                content = results[model]['content']
-                f.write(content)
-                
-                f.write("\n\n" + "=" * 80 + "\n")
-                f.write("METADATA AND SOURCES\n")
-                f.write("=" * 80 + "\n\n")
-                
-                if 'sources' in results[model]:
-                    f.write("## Sources and Dependencies\n\n")
-                    f.write(json.dumps(results[model]['sources'], indent=2, ensure_ascii=False))
-            
-            paths[model] = (json_path, txt_path)
-            logger.info(f"{model.upper()} reports saved to {json_path} and {txt_path}")
-        else:
-            logger.warning(f"No valid results available for {model.upper()}. Skipping report generation.")
-    
-    return paths
-
-def save_logs(results: dict, base_dir: str) -> str:
-    """Save logs of all agent responses and communications"""
+def save_trace(tracer: Tracer, base_dir: str) -> str:
+    """Save the per-run span trace and log its summary table"""
     logs_dir = os.path.join(base_dir, "logs")
     os.makedirs(logs_dir, exist_ok=True)
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_path = os.path.join(logs_dir, f"run_log_{timestamp}.txt")
-    
-    with open(log_path, "w", encoding='utf-8') as f:
-        f.write("RUN LOG\n")
-        f.write("=" * 80 + "\n\n")
-        
-        for model in ['claude']:
-            f.write(f"Model: {model.upper()}\n")
-            f.write("-" * 80 + "\n")
-            
-            # Safely get responses from each agent
-            try:
-                if 'reader_output' in results and model in results['reader_output']:
-                    f.write("Reader Agent Response:\n")
-                    f.write(results['reader_output'][model]['content'] + "\n\n")
-                
-                if 'analyzer_output' in results and model in results['analyzer_output']:
-                    f.write("Analyzer Agent Response:\n")
-                    f.write(results['analyzer_output'][model]['content'] + "\n\n")
-                
-                if 'final_report' in results and model in results['final_report']:
-                    f.write("Report Agent Response:\n")
-                    f.write(results['final_report'][model]['content'] + "\n\n")
-            except Exception as e:
-                logger.error(f"Error writing log for {model}: {str(e)}")
-                f.write(f"Error capturing response: {str(e)}\n\n")
-            
-            f.write("=" * 80 + "\n\n")
-    
-    logger.info(f"Run log saved to {log_path}")
-    return log_path
+    trace_path = os.path.join(logs_dir, f"trace_{tracer.run_id}.jsonl")
+    tracer.write(trace_path)
+    logger.info(f"Pipeline trace saved to {trace_path}\n{tracer.format_summary()}")
+    return trace_path
 
 async def main():
     start_time = time.time()
     logger.info("Starting RAG Agent Swarm application...")
     
     coordinator = SwarmCoordinator()
+    tracer = Tracer(run_id=datetime.now().strftime("%Y%m%d_%H%M%S"))
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     pdf_path = os.path.join(base_dir, "Axis Program Management_Unformatted detailed.pdf")
     
     try:
-        logger.info("Beginning document processing...")
-        results = await coordinator.process_document(pdf_path)
+        with tracer.activate(), trace_span("run") as run_span:
+            logger.info("Beginning document processing...")
+            async with LoopLagMonitor() as loop_monitor:
+                results = await coordinator.process_document(pdf_path)
+            loop_stats = loop_monitor.stats()
+            run_span.set("loop_max_lag_ms", loop_stats["max_lag_ms"])
+            logger.info(
+                f"Event loop lag: mean {loop_stats['mean_lag_ms']} ms, "
+                f"max {loop_stats['max_lag_ms']} ms, {loop_stats['stalls']} stalls"
+            )
         
-        # Save reports from both models
-        report_paths = save_reports(results.get('final_report', {}), base_dir)
-        
-        # Save logs
-        log_path = save_logs(results, base_dir)
+        # Save reports and agent logs as one compact artifact; text views are rendered on demand
+        artifacts = ArtifactStore(os.path.join(base_dir, "artifacts"))
+        await artifacts.add(tracer.run_id, results, document=pdf_path)
+        artifact_path = await artifacts.close()
         
         elapsed_time = time.time() - start_time
         logger.info(f"Analysis complete in {elapsed_time:.2f} seconds.")
         
+        usage_totals = results.get('usage', {}).get('totals', {})
+        logger.info(
+            f"LLM usage: {usage_totals.get('calls', 0)} calls, "
+            f"{usage_totals.get('prompt_tokens', 0)} prompt / {usage_totals.get('completion_tokens', 0)} "
+            f"completion tokens, est. cost ${usage_totals.get('cost', 0.0):.4f}"
+        )
+        
         # Print executive summaries
         for model in ['claude']:
             try:
@@ -138,10 +87,8 @@ async def main():
                         print(f"\n{model.upper()} Executive Summary:")
                         sections = content.split('\n\n')
                         print(sections[0] if sections else content[:2000])
-                        if model in report_paths:
-                            print(f"\nFull {model.upper()} reports available at:")
-                            print(f"JSON: {report_paths[model][0]}")
-                            print(f"Text: {report_paths[model][1]}")
+                        print(f"\nFull {model.upper()} report available with:")
+                        print(f"python -m src.utils.artifacts {artifact_path} --view report")
                     else:
                         logger.warning(f"No content available for {model.upper()}")
                 else:
@@ -151,12 +98,16 @@ async def main():
             
             print("\n" + "="*80)
         
-        print(f"\nRun log available at: {log_path}")
+        print(f"\nRun log available with: python -m src.utils.artifacts {artifact_path} --view log")
+        
+        trace_path = save_trace(tracer, base_dir)
+        print(f"Pipeline trace available at: {trace_path}")
         
     except Exception as e:
         logger.error(f"Error during processing: {str(e)}", exc_info=True)
 
-if __name__ == "__main__":
+def create_app():
+    """Build the API with its pure ASGI middleware stack wrapped around it"""
     app = FastAPI()
 
     # Configure CORS based on environment
@@ -168,51 +119,70 @@ if __name__ == "__main__":
     cors_middleware = CustomCORSMiddleware(**cors_config)
     cors_middleware.setup_cors(app)
 
-    # Register the error handler middleware
-    app.middleware("http")(error_handler)
-
-    # Register the request validation middleware
-    app.add_middleware(RequestValidationMiddleware)
+    # Unhandled exceptions become JSON error responses
+    app.add_exception_handler(Exception, error_handler)
 
-    # Register the rate limiter middleware with custom settings
-    app.add_middleware(
-        RateLimiter,
-        requests_per_minute=60,  # Adjust these values based on your needs
-        burst_limit=100,
-        expire_time=60
-    )
+    # Pure ASGI middleware stack, outermost first. Auth runs before the cache
+    # so per-user cache keys see request.state.user.
+    middleware = MiddlewareStack()
 
-    # Register the auth middleware
-    app.add_middleware(
-        AuthMiddleware,
-        secret_key="your-secret-key-here",  # Should be loaded from environment variables
-        exclude_paths={"/docs", "/redoc", "/openapi.json", "/health", "/api/v1/auth/login"}
+    # Compression (streams bodies through an incremental encoder)
+    middleware.add(
+        StreamingCompressionMiddleware,
+        minimum_size=500,  # Only compress responses larger than 500 bytes
+        compression_level=6,  # GZIP compression level
+        brotli_quality=4,  # Brotli compression quality
+        exclude_paths={"/health", "/metrics"}
     )
 
-    # Register the logging middleware
-    app.add_middleware(
-        LoggingMiddleware,
+    # Logging
+    middleware.add(
+        ASGILoggingMiddleware,
         app_name="SwarmRAG",
         log_request_body=True,
         log_response_body=True
     )
 
-    # Register the cache middleware
-    app.add_middleware(
-        CacheMiddleware,
+    # Request validation
+    middleware.add(ASGIRequestValidationMiddleware)
+
+    # Rate limiter with custom settings
+    middleware.add(
+        ASGIRateLimiter,
+        requests_per_minute=60,  # Adjust these values based on your needs
+        burst_limit=100,
+        expire_time=60
+    )
+
+    # Auth (still a call_next middleware)
+    middleware.add_call_next(
+        AuthMiddleware(
+            secret_key="your-secret-key-here",  # Should be loaded from environment variables
+            exclude_paths={"/docs", "/redoc", "/openapi.json", "/health", "/api/v1/auth/login"}
+        )
+    )
+
+    # Cache
+    middleware.add(
+        ASGICacheMiddleware,
         ttl=300,  # 5 minutes cache TTL
         max_size=1000,  # Maximum cache entries
+        max_bytes=64 * 1024 * 1024,  # Memory budget; large, cold responses are evicted first
         cache_by_auth=True,  # Cache separately for different users
-        cache_by_query=True  # Cache separately for different query parameters
+        cache_by_query=True,  # Cache separately for different query parameters
+        stale_while_revalidate=30,  # Serve expired entries for 30s while refreshing
+        stale_if_error=600,  # Fall back to expired entries for 10 minutes if the backend fails
+        l2_url=os.getenv("CACHE_L2_URL"),  # e.g. sqlite:///cache/http_cache.sqlite3 to share across workers
+        route_policies={
+            r"^/project/[^/]+/service-area$": {"ttl": 600, "stale_while_revalidate": 300},
+            r"^/products": {"ttl": 900, "stale_while_revalidate": 300}
+        }
     )
 
-    # Register the compression middleware
-    app.add_middleware(
-        CompressionMiddleware,
-        minimum_size=500,  # Only compress responses larger than 500 bytes
-        compression_level=6,  # GZIP compression level
-        brotli_quality=4,  # Brotli compression quality
-        exclude_paths={"/health", "/metrics"}
-    )
+    return middleware.build(app)
 
+# The ASGI app servers load, e.g. `uvicorn src.main:app`
+app = create_app()
+
+if __name__ == "__main__":
     asyncio.run(main())
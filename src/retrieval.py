@@ -0,0 +1,203 @@
+from typing import Dict, List, Tuple
+from dataclasses import dataclass, field
+import hashlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate token count - same approximation as BaseAgent"""
+    return int(len(text.split()) * 1.3)
+
+
+@dataclass
+class RetrievedChunk:
+    """A retrieved chunk with the query that ranked it highest"""
+    content: str
+    metadata: Dict
+    query: str
+    relevance: float
+    tokens: int
+    shingles: frozenset = field(repr=False)
+
+
+@dataclass
+class RetrievalResult:
+    """Deduplicated, diversified retrieval output"""
+    chunks_by_query: Dict[str, List[RetrievedChunk]]
+    stats: Dict[str, float]
+
+    @property
+    def chunks(self) -> List[RetrievedChunk]:
+        return [chunk for chunks in self.chunks_by_query.values() for chunk in chunks]
+
+    @property
+    def sources(self) -> List[Dict]:
+        return [chunk.metadata for chunk in self.chunks]
+
+
+class RetrievalPostProcessor:
+    """Deduplicate retrieved chunks across queries and apply MMR under a token budget"""
+
+    def __init__(
+        self,
+        token_budget: int = 6000,
+        mmr_lambda: float = 0.7,
+        k: int = 4,
+        shingle_size: int = 3
+    ):
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.k = k
+        self.shingle_size = shingle_size
+
+    def _chunk_id(self, content: str, metadata: Dict) -> str:
+        """Stable chunk identity: explicit id if present, else content hash"""
+        for key in ("chunk_id", "id"):
+            if metadata.get(key) is not None:
+                return str(metadata[key])
+        return hashlib.md5(content.encode("utf-8")).hexdigest()
+
+    def _near_duplicate_hash(self, content: str) -> str:
+        """Hash of case/whitespace/punctuation-normalized text"""
+        normalized = " ".join(_WORD_RE.findall(content.lower()))
+        return hashlib.md5(normalized.encode("utf-8")).hexdigest()
+
+    def _shingles(self, content: str) -> frozenset:
+        words = _WORD_RE.findall(content.lower())
+        if len(words) < self.shingle_size:
+            return frozenset([" ".join(words)])
+        return frozenset(
+            " ".join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        )
+
+    @staticmethod
+    def _similarity(a: frozenset, b: frozenset) -> float:
+        """Jaccard similarity of shingle sets"""
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+    def _search(self, vector_store, query: str) -> List[Tuple[object, float]]:
+        """Run the search, returning (document, relevance) pairs in rank order"""
+        if hasattr(vector_store, "similarity_search_with_score"):
+            results = vector_store.similarity_search_with_score(query, k=self.k)
+            # FAISS returns L2 distances: smaller is closer
+            return [(doc, 1.0 / (1.0 + float(score))) for doc, score in results]
+        docs = vector_store.similarity_search(query, k=self.k)
+        return [(doc, 1.0 / (1 + rank)) for rank, doc in enumerate(docs)]
+
+    def collect(self, vector_store, queries: List[str]) -> Tuple[List[RetrievedChunk], Dict[str, int]]:
+        """Retrieve for every query and drop exact and near duplicates"""
+        by_key: Dict[str, RetrievedChunk] = {}
+        seen_ids: Dict[str, str] = {}
+        raw = {"retrieved_chunks": 0, "retrieved_tokens": 0}
+
+        for query in queries:
+            for doc, relevance in self._search(vector_store, query):
+                content = doc.page_content
+                metadata = dict(doc.metadata or {})
+                tokens = estimate_tokens(content)
+                raw["retrieved_chunks"] += 1
+                raw["retrieved_tokens"] += tokens
+
+                chunk_id = self._chunk_id(content, metadata)
+                key = seen_ids.get(chunk_id) or self._near_duplicate_hash(content)
+                seen_ids[chunk_id] = key
+
+                existing = by_key.get(key)
+                if existing is None:
+                    by_key[key] = RetrievedChunk(
+                        content=content,
+                        metadata=metadata,
+                        query=query,
+                        relevance=relevance,
+                        tokens=tokens,
+                        shingles=self._shingles(content)
+                    )
+                elif relevance > existing.relevance:
+                    # Attribute the chunk to the query that ranked it best
+                    existing.query = query
+                    existing.relevance = relevance
+
+        return list(by_key.values()), raw
+
+    def select(self, candidates: List[RetrievedChunk]) -> List[RetrievedChunk]:
+        """Greedy maximal-marginal-relevance selection within the token budget"""
+        selected: List[RetrievedChunk] = []
+        remaining = list(candidates)
+        used_tokens = 0
+
+        while remaining:
+            best_index, best_score = None, None
+            for index, chunk in enumerate(remaining):
+                if used_tokens + chunk.tokens > self.token_budget:
+                    continue
+                redundancy = max(
+                    (self._similarity(chunk.shingles, other.shingles) for other in selected),
+                    default=0.0
+                )
+                score = self.mmr_lambda * chunk.relevance - (1 - self.mmr_lambda) * redundancy
+                if best_score is None or score > best_score:
+                    best_index, best_score = index, score
+            if best_index is None:
+                break
+            chunk = remaining.pop(best_index)
+            selected.append(chunk)
+            used_tokens += chunk.tokens
+
+        return selected
+
+    def process(self, vector_store, queries: List[str]) -> RetrievalResult:
+        """Retrieve, deduplicate and diversify chunks for a set of queries"""
+        candidates, raw = self.collect(vector_store, queries)
+        selected = self.select(candidates)
+
+        chunks_by_query: Dict[str, List[RetrievedChunk]] = {query: [] for query in queries}
+        for chunk in selected:
+            chunks_by_query[chunk.query].append(chunk)
+
+        kept_tokens = sum(chunk.tokens for chunk in selected)
+        raw_tokens = raw["retrieved_tokens"]
+        stats = {
+            "retrieved_chunks": raw["retrieved_chunks"],
+            "unique_chunks": len(candidates),
+            "selected_chunks": len(selected),
+            "retrieved_tokens": raw_tokens,
+            "selected_tokens": kept_tokens,
+            "tokens_saved": raw_tokens - kept_tokens,
+            "saved_ratio": round(1 - kept_tokens / raw_tokens, 3) if raw_tokens else 0.0
+        }
+        logger.info(
+            f"Retrieval: {stats['retrieved_chunks']} chunks -> {stats['selected_chunks']} "
+            f"after dedup/MMR, saved ~{stats['tokens_saved']} tokens ({stats['saved_ratio']:.0%})"
+        )
+        return RetrievalResult(chunks_by_query=chunks_by_query, stats=stats)
+
+    @staticmethod
+    def _citation(metadata: Dict) -> str:
+        """Citation line from structure-aware chunk metadata, if present"""
+        if metadata.get("page_start") is None:
+            return ""
+        pages = f"p. {metadata['page_start']}"
+        if metadata.get("page_end") not in (None, metadata["page_start"]):
+            pages = f"pp. {metadata['page_start']}-{metadata['page_end']}"
+        heading = metadata.get("heading_path")
+        return f"[{pages} | {heading}]\n" if heading else f"[{pages}]\n"
+
+    def format_prompt_context(self, result: RetrievalResult) -> str:
+        """Render selected chunks grouped under their query headers"""
+        sections = []
+        for query, chunks in result.chunks_by_query.items():
+            if not chunks:
+                continue
+            relevant_text = "\n\n".join(
+                self._citation(chunk.metadata) + chunk.content for chunk in chunks
+            )
+            sections.append(f"Query: {query}\n\nFindings:\n{relevant_text}")
+        return "\n\n".join(sections)
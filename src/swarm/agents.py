@@ -1,9 +1,13 @@
 import logging
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterable, Iterator, Callable, Awaitable, TextIO, Tuple
 import fitz  # PyMuPDF
-import re
 from dataclasses import dataclass
+from .extraction import ParagraphRuleExtractor
+from .rule_store import RuleStore
+from .dedup import RuleDeduplicator
+from .incremental import IncrementalPageCache, IncrementalResult
+from .report_writer import StreamingReportWriter, AsyncStreamingReportWriter, iter_rule_groups
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,77 +24,87 @@ class DocumentProcessor:
     
     def __init__(self, doc_path: Path):
         self.doc_path = doc_path
+        self.extractor = ParagraphRuleExtractor()
     
     def process(self) -> Dict[str, Any]:
         """Extract and process document content"""
         try:
             doc = fitz.open(self.doc_path)
-            content = []
-            structured_content = {
-                "service_areas": [],
-                "products": [],
-                "workflows": [],
-                "business_rules": []
-            }
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                content.append(text)
-                
-                # Extract service area information
-                service_area_matches = re.finditer(
-                    r"(?i)(?:service\s+area|project\s+area).*?(?=\n\n|\Z)",
-                    text
-                )
-                for match in service_area_matches:
-                    structured_content["service_areas"].append({
-                        "text": match.group(),
-                        "page": page_num + 1
-                    })
-                
-                # Extract product information
-                product_matches = re.finditer(
-                    r"(?i)(?:product|CSP).*?(?=\n\n|\Z)",
-                    text
-                )
-                for match in product_matches:
-                    structured_content["products"].append({
-                        "text": match.group(),
-                        "page": page_num + 1
-                    })
-                
-                # Extract workflow information
-                workflow_matches = re.finditer(
-                    r"(?i)(?:workflow|process|procedure).*?(?=\n\n|\Z)",
-                    text
-                )
-                for match in workflow_matches:
-                    structured_content["workflows"].append({
-                        "text": match.group(),
-                        "page": page_num + 1
-                    })
-                
-                # Extract business rules
-                rule_matches = re.finditer(
-                    r"(?i)(?:must|shall|required|rule|policy).*?(?=\n\n|\Z)",
-                    text
-                )
-                for match in rule_matches:
-                    structured_content["business_rules"].append({
-                        "text": match.group(),
-                        "page": page_num + 1
-                    })
-            
+            result = self.process_pages(doc, 0, len(doc))
+            result["metadata"] = doc.metadata
+            return result
+        except Exception as e:
+            logger.error(f"Error processing document: {str(e)}")
+            raise
+    
+    def process_incremental(self, cache: IncrementalPageCache) -> Tuple[Dict[str, Any], IncrementalResult]:
+        """Extract and classify content, re-processing only pages whose content changed"""
+        try:
+            result = cache.process(self._classify_page)
             return {
-                "content": "\n".join(content),
-                "structured_content": structured_content,
-                "page_count": len(doc),
-                "metadata": doc.metadata
-            }
+                "content": "\n".join(result.texts),
+                "structured_content": self.structured_from_page_results(result.page_results),
+                "page_count": len(result.texts),
+                "metadata": result.metadata
+            }, result
         except Exception as e:
             logger.error(f"Error processing document: {str(e)}")
             raise
+    
+    def _classify_page(self, text: str) -> List[List[Any]]:
+        """Page-number-free classification result, cacheable per page content"""
+        return [[item.category, item.text, item.offset] for item in self.extractor.extract(text, 0)]
+    
+    @staticmethod
+    def structured_from_page_results(page_results: List[List[List[Any]]]) -> Dict[str, List]:
+        """Rebuild structured_content from per-page classification results"""
+        structured_content = {
+            "service_areas": [],
+            "products": [],
+            "workflows": [],
+            "business_rules": []
+        }
+        for page_num, items in enumerate(page_results, start=1):
+            for category, text, offset in items:
+                structured_content[category].append({
+                    "text": text,
+                    "page": page_num,
+                    "offset": offset
+                })
+        return structured_content
+    
+    def process_pages(self, doc, start: int, end: int) -> Dict[str, Any]:
+        """Extract and classify content for pages [start, end) of an open document"""
+        content = []
+        structured_content = {
+            "service_areas": [],
+            "products": [],
+            "workflows": [],
+            "business_rules": []
+        }
+        
+        for page_num in range(start, min(end, len(doc))):
+            page = doc[page_num]
+            text = page.get_text()
+            content.append(text)
+            
+            # Classify paragraphs into all categories in a single scan
+            self.extractor.extract_structured(text, page_num + 1, structured_content)
+        
+        return {
+            "content": "\n".join(content),
+            "structured_content": structured_content,
+            "page_count": len(doc),
+            "metadata": {}
+        }
+
+# (rule type, structured_content key, category) in the order rules are emitted
+RULE_SOURCES = [
+    ("service_area", "service_areas", "Service Area Management"),
+    ("product", "products", "Product Management"),
+    ("workflow", "workflows", "Workflow Management"),
+    ("business_rule", "business_rules", "Business Rules")
+]
 
 class BusinessAnalyzer:
     """Analyze document for business rules"""
@@ -102,46 +116,41 @@ class BusinessAnalyzer:
     def analyze(self) -> List[Dict[str, Any]]:
         """Extract business rules and workflows"""
         try:
-            rules = []
-            
-            # Process service area rules
-            for item in self.structured_content["service_areas"]:
-                rules.append({
-                    "type": "service_area",
-                    "rule": item["text"],
-                    "page": item["page"],
-                    "category": "Service Area Management"
-                })
-            
-            # Process product rules
-            for item in self.structured_content["products"]:
-                rules.append({
-                    "type": "product",
-                    "rule": item["text"],
-                    "page": item["page"],
-                    "category": "Product Management"
-                })
-            
-            # Process workflow rules
-            for item in self.structured_content["workflows"]:
-                rules.append({
-                    "type": "workflow",
-                    "rule": item["text"],
-                    "page": item["page"],
-                    "category": "Workflow Management"
-                })
-            
-            # Process explicit business rules
-            for item in self.structured_content["business_rules"]:
-                rules.append({
-                    "type": "business_rule",
+            return list(self.iter_rules())
+        except Exception as e:
+            logger.error(f"Error analyzing content: {str(e)}")
+            raise
+    
+    def iter_rules(self) -> Iterator[Dict[str, Any]]:
+        """Yield business rules grouped by category, without building a list"""
+        for rule_type, source, category in RULE_SOURCES:
+            for item in self.structured_content[source]:
+                yield {
+                    "type": rule_type,
                     "rule": item["text"],
                     "page": item["page"],
-                    "category": "Business Rules"
-                })
-            
-            return rules
-            
+                    "category": category
+                }
+    
+    def deduplicate(self, rules: Iterable[Dict[str, Any]], threshold: float = 0.8):
+        """Cluster near-duplicate rules; returns (representative rules, stats).
+
+        A RuleStore comes back as a RuleStore, so dedup keeps the compact form.
+        """
+        try:
+            return RuleDeduplicator(threshold=threshold).deduplicate(rules)
+        except Exception as e:
+            logger.error(f"Error deduplicating rules: {str(e)}")
+            raise
+    
+    def analyze_store(self) -> RuleStore:
+        """Extract business rules into a compact columnar RuleStore"""
+        try:
+            store = RuleStore()
+            for rule_type, source, category in RULE_SOURCES:
+                for item in self.structured_content[source]:
+                    store.add(rule_type, category, item["text"], item["page"], item.get("offset", 0))
+            return store
         except Exception as e:
             logger.error(f"Error analyzing content: {str(e)}")
             raise
@@ -149,7 +158,7 @@ class BusinessAnalyzer:
 class ImplementationPlanner:
     """Plan implementation based on analysis"""
     
-    def __init__(self, business_rules: List[Dict[str, Any]]):
+    def __init__(self, business_rules: Iterable[Dict[str, Any]]):
         self.rules = business_rules
     
     def create_plan(self) -> Dict[str, Any]:
@@ -289,7 +298,7 @@ class ReportGenerator:
     """Generate analysis report"""
     
     def __init__(self, doc_content: Dict[str, Any], 
-                 business_rules: List[Dict[str, Any]], 
+                 business_rules: Iterable[Dict[str, Any]], 
                  implementation_plan: Dict[str, Any]):
         self.content = doc_content
         self.rules = business_rules
@@ -298,69 +307,113 @@ class ReportGenerator:
     def generate_report(self) -> str:
         """Generate comprehensive markdown report"""
         try:
-            report = []
-            
-            # Add header
-            report.append("# SwarmRAG Analysis Report\n")
-            
-            # Add document summary
-            report.append("## Document Summary")
-            report.append(f"- Pages: {self.content['page_count']}")
-            report.append(f"- Metadata: {self.content['metadata']}\n")
-            
-            # Add business rules
-            report.append("## Business Rules")
-            rules_by_category = {}
-            for rule in self.rules:
-                category = rule["category"]
-                if category not in rules_by_category:
-                    rules_by_category[category] = []
-                rules_by_category[category].append(rule)
-            
-            for category, rules in rules_by_category.items():
-                report.append(f"\n### {category}")
-                for rule in rules:
-                    report.append(f"- {rule['rule']} (Page {rule['page']})")
-            
-            # Add implementation plan
-            report.append("\n## Implementation Plan")
-            
-            # Database section
-            report.append("\n### Database")
-            report.append("#### Stored Procedures")
-            for proc in self.plan['database']['stored_procedures']:
-                report.append(f"- **{proc['name']}**")
-                report.append(f"  - Purpose: {proc['purpose']}")
-                report.append(f"  - Parameters: {', '.join(proc['parameters'])}")
-            
-            report.append("\n#### Tables")
-            for table in self.plan['database']['tables']:
-                report.append(f"- {table}")
-            
-            # API section
-            report.append("\n### API")
-            for endpoint in self.plan['api']['endpoints']:
-                report.append(f"- **{endpoint['method']} {endpoint['path']}**")
-                report.append(f"  - Purpose: {endpoint['purpose']}")
-            
-            # Services section
-            report.append("\n### Services")
-            for module in self.plan['services']['modules']:
-                report.append(f"#### {module['name']}")
-                report.append("Methods:")
-                for method in module['methods']:
-                    report.append(f"- {method}")
-            
-            # Validation section
-            report.append("\n### Validation")
-            for rule in self.plan['validation']['rules']:
-                report.append(f"#### {rule['field']}")
-                report.append("Validations:")
-                for validation in rule['validations']:
-                    report.append(f"- {validation}")
-            
-            return "\n".join(report)
-            
+            return "\n".join(self.iter_report())
         except Exception as e:
             logger.error(f"Error generating report: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    def write_report(self, sink: TextIO, include_summary: bool = True) -> int:
+        """Stream the report to a text sink section by section; returns lines written.
+
+        Pass include_summary=False when summary_lines() was already written
+        ahead of rule analysis.
+        """
+        try:
+            writer = StreamingReportWriter(sink)
+            for section in self.iter_sections(include_summary):
+                writer.write_section(section)
+            return writer.lines_written
+        except Exception as e:
+            logger.error(f"Error writing report: {str(e)}")
+            raise
+    
+    async def awrite_report(self, sink: Callable[[str], Awaitable[Any]]) -> int:
+        """Stream the report to an async sink section by section; returns lines written"""
+        try:
+            writer = AsyncStreamingReportWriter(sink)
+            for section in self.iter_sections():
+                await writer.write_section(section)
+            return writer.lines_written
+        except Exception as e:
+            logger.error(f"Error writing report: {str(e)}")
+            raise
+    
+    def iter_report(self) -> Iterator[str]:
+        """Yield report lines without materializing the whole report"""
+        for section in self.iter_sections():
+            yield from section
+    
+    def iter_sections(self, include_summary: bool = True) -> Iterator[Iterator[str]]:
+        """Yield each report section as a lazy line iterator"""
+        if include_summary:
+            yield self.summary_lines(self.content)
+        yield self._rule_lines()
+        yield self._plan_lines()
+    
+    @staticmethod
+    def summary_lines(doc_content: Dict[str, Any]) -> Iterator[str]:
+        """Header and document summary; only needs the processed document, not the rules"""
+        # Add header
+        yield "# SwarmRAG Analysis Report\n"
+        
+        # Add document summary
+        yield "## Document Summary"
+        yield f"- Pages: {doc_content['page_count']}"
+        yield f"- Metadata: {doc_content['metadata']}\n"
+    
+    def _rule_lines(self) -> Iterator[str]:
+        # Add business rules, grouped in a single pass over the rules
+        yield "## Business Rules"
+        if isinstance(self.rules, RuleStore):
+            groups = (
+                (category, map(self.rules.record, indexes))
+                for category, indexes in self.rules.group_by_category().items()
+            )
+        else:
+            groups = iter_rule_groups(self.rules)
+        for category, rules in groups:
+            yield f"\n### {category}"
+            for rule in rules:
+                pages = rule.get("pages")
+                if pages and len(pages) > 1:
+                    yield f"- {rule['rule']} (Pages {', '.join(map(str, pages))})"
+                else:
+                    yield f"- {rule['rule']} (Page {rule['page']})"
+    
+    def _plan_lines(self) -> Iterator[str]:
+        # Add implementation plan
+        yield "\n## Implementation Plan"
+        
+        # Database section
+        yield "\n### Database"
+        yield "#### Stored Procedures"
+        for proc in self.plan['database']['stored_procedures']:
+            yield f"- **{proc['name']}**"
+            yield f"  - Purpose: {proc['purpose']}"
+            yield f"  - Parameters: {', '.join(proc['parameters'])}"
+        
+        yield "\n#### Tables"
+        for table in self.plan['database']['tables']:
+            yield f"- {table}"
+        
+        # API section
+        yield "\n### API"
+        for endpoint in self.plan['api']['endpoints']:
+            yield f"- **{endpoint['method']} {endpoint['path']}**"
+            yield f"  - Purpose: {endpoint['purpose']}"
+        
+        # Services section
+        yield "\n### Services"
+        for module in self.plan['services']['modules']:
+            yield f"#### {module['name']}"
+            yield "Methods:"
+            for method in module['methods']:
+                yield f"- {method}"
+        
+        # Validation section
+        yield "\n### Validation"
+        for rule in self.plan['validation']['rules']:
+            yield f"#### {rule['field']}"
+            yield "Validations:"
+            for validation in rule['validations']:
+                yield f"- {validation}"
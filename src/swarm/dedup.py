@@ -0,0 +1,184 @@
+import logging
+import random
+import re
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .rule_store import RuleStore
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHasher:
+    """MinHash signatures over word shingles using universal hashing"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def shingles(self, text: str) -> Set[int]:
+        words = _WORD_RE.findall(text.lower())
+        size = self.shingle_size
+        if len(words) <= size:
+            grams = [" ".join(words)]
+        else:
+            grams = (" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+        # crc32 keeps signatures stable across processes (unlike hash())
+        return {zlib.crc32(gram.encode("utf-8")) for gram in grams}
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        shingles = self.shingles(text)
+        return tuple(
+            min(((a * shingle + b) % _MERSENNE_PRIME) & _MAX_HASH for shingle in shingles)
+            for a, b in self._perms
+        )
+
+    @staticmethod
+    def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        matches = sum(1 for x, y in zip(first, second) if x == y)
+        return matches / len(first)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first: int, second: int):
+        root_first, root_second = self.find(first), self.find(second)
+        if root_first != root_second:
+            # Keep the earliest rule as the root so representatives are stable
+            if root_second < root_first:
+                root_first, root_second = root_second, root_first
+            self.parent[root_second] = root_first
+
+
+class RuleDeduplicator:
+    """Cluster near-duplicate rules with MinHash + LSH banding.
+
+    Candidate pairs share at least one LSH band within the same category
+    and are confirmed by estimated Jaccard similarity; clusters are the
+    transitive closure of confirmed pairs. Each rule is only compared with
+    one representative per cluster in a bucket (skipping its own cluster),
+    so work stays roughly linear in the number of rules even when many
+    duplicates share a bucket. Rules from different categories never merge.
+    Each cluster keeps its first rule as the representative along with
+    every source page.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, shingle_size: int = 3):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+
+    def cluster(self, texts: List[str], partitions: Optional[List[Any]] = None) -> List[List[int]]:
+        """Return clusters of indexes into texts, ordered by first member.
+
+        Texts only cluster with texts that have the same partition key.
+        """
+        signatures = [self.hasher.signature(text) for text in texts]
+        if partitions is None:
+            partitions = [None] * len(texts)
+        union_find = _UnionFind(len(texts))
+
+        for band in range(self.bands):
+            # Bucket -> {cluster root: representative member}
+            buckets: Dict[Tuple[Any, Tuple[int, ...]], Dict[int, int]] = defaultdict(dict)
+            start = band * self.rows
+            for index, signature in enumerate(signatures):
+                key = (partitions[index], signature[start:start + self.rows])
+                representatives = buckets[key]
+                for member in representatives.values():
+                    if union_find.find(member) == union_find.find(index):
+                        continue
+                    if MinHasher.similarity(signatures[member], signature) >= self.threshold:
+                        union_find.union(member, index)
+                # Unions may have merged clusters: keep the first representative of each
+                merged: Dict[int, int] = {}
+                for member in list(representatives.values()) + [index]:
+                    merged.setdefault(union_find.find(member), member)
+                buckets[key] = merged
+
+        clusters: Dict[int, List[int]] = defaultdict(list)
+        for index in range(len(texts)):
+            clusters[union_find.find(index)].append(index)
+        return [clusters[root] for root in sorted(clusters)]
+
+    def deduplicate(self, rules: Iterable[Dict[str, Any]]) -> Tuple[Any, Dict[str, Any]]:
+        """Collapse near-duplicate rules, returning (representatives, stats).
+
+        A RuleStore is deduplicated column-wise into a new RuleStore; other
+        iterables of rule dicts give a list of representative dicts.
+        """
+        if isinstance(rules, RuleStore):
+            texts = [rules.text(index) for index in range(len(rules))]
+            categories = [rules.category(index) for index in range(len(rules))]
+            representatives = RuleStore()
+            for members in self.cluster(texts, categories):
+                first = rules.record(members[0])
+                pages, duplicates = self._merge_sources(rules.record(member) for member in members)
+                representatives.add(
+                    first.type, first.category, first.rule, first.page, first.offset,
+                    pages=pages, duplicates=duplicates
+                )
+            output_chars = sum(len(representatives.text(index)) for index in range(len(representatives)))
+        else:
+            rules = list(rules)
+            texts = [rule["rule"] for rule in rules]
+            categories = [rule["category"] for rule in rules]
+            representatives = []
+            for members in self.cluster(texts, categories):
+                first = rules[members[0]]
+                pages, duplicates = self._merge_sources(rules[member] for member in members)
+                representatives.append({
+                    "type": first["type"],
+                    "rule": first["rule"],
+                    "page": first["page"],
+                    "category": first["category"],
+                    "pages": pages,
+                    "duplicates": duplicates
+                })
+            output_chars = sum(len(rule["rule"]) for rule in representatives)
+
+        input_chars = sum(len(text) for text in texts)
+        stats = {
+            "input_rules": len(texts),
+            "output_rules": len(representatives),
+            "compression_ratio": round(len(representatives) / len(texts), 3) if texts else 1.0,
+            "input_chars": input_chars,
+            "output_chars": output_chars
+        }
+        logger.info(
+            f"Deduplicated {stats['input_rules']} rules into {stats['output_rules']} "
+            f"clusters (ratio {stats['compression_ratio']})"
+        )
+        return representatives, stats
+
+    @staticmethod
+    def _merge_sources(members: Iterable[Any]) -> Tuple[List[int], int]:
+        """Source pages and duplicate count for a cluster, folding in earlier merges"""
+        pages: Set[int] = set()
+        duplicates = -1
+        for member in members:
+            pages.update(member.get("pages") or [member["page"]])
+            duplicates += 1 + member.get("duplicates", 0)
+        return sorted(pages), duplicates
@@ -0,0 +1,75 @@
+import re
+from typing import Dict, Iterator, List, NamedTuple, Pattern
+
+# Keyword triggers for each structured content category, in classification order
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "service_areas": [r"service\s+area", r"project\s+area"],
+    "products": [r"product", r"CSP"],
+    "workflows": [r"workflow", r"process", r"procedure"],
+    "business_rules": [r"must", r"shall", r"required", r"rule", r"policy"],
+}
+
+# Paragraphs are separated by a blank line
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+
+class ExtractedItem(NamedTuple):
+    """A paragraph fragment classified into a category"""
+    category: str
+    text: str
+    page: int
+    offset: int  # Character offset of the fragment within the page text
+
+
+def compile_category_pattern(categories: Dict[str, List[str]]) -> Pattern:
+    """Combine every category's keywords into one alternation with named groups"""
+    groups = [
+        f"(?P<{name}>{'|'.join(keywords)})"
+        for name, keywords in categories.items()
+    ]
+    return re.compile("|".join(groups), re.IGNORECASE)
+
+
+def iter_paragraphs(text: str) -> Iterator[tuple]:
+    """Yield (offset, paragraph) pairs in a single scan over the text"""
+    start = 0
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        yield start, text[start:match.start()]
+        start = match.end()
+    yield start, text[start:]
+
+
+class ParagraphRuleExtractor:
+    """Classify paragraphs into structured content categories in one pass.
+
+    For each paragraph, every category whose keyword appears contributes one
+    item: the text from its first keyword to the end of the paragraph.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]] = None):
+        self.categories = categories or CATEGORY_KEYWORDS
+        self.pattern = compile_category_pattern(self.categories)
+
+    def extract(self, text: str, page: int) -> Iterator[ExtractedItem]:
+        """Extract classified items from one page of text"""
+        category_count = len(self.categories)
+        for offset, paragraph in iter_paragraphs(text):
+            found = {}
+            for match in self.pattern.finditer(paragraph):
+                category = match.lastgroup
+                if category not in found:
+                    found[category] = match.start()
+                    if len(found) == category_count:
+                        break
+            for category, start in found.items():
+                fragment = paragraph[start:].rstrip()
+                yield ExtractedItem(category, fragment, page, offset + start)
+
+    def extract_structured(self, text: str, page: int, structured_content: Dict[str, List]):
+        """Append items from one page to a structured_content dict of lists"""
+        for item in self.extract(text, page):
+            structured_content[item.category].append({
+                "text": item.text,
+                "page": item.page,
+                "offset": item.offset
+            })
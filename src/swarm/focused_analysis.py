@@ -1,9 +1,11 @@
 import logging
 from pathlib import Path
 from typing import Dict, Any, List
-import fitz  # PyMuPDF
 import re
 from datetime import datetime
+from src.swarm.page_text import PageTextProvider
+from src.swarm.report_writer import StreamingReportWriter
+from src.swarm.incremental import IncrementalPageCache, diff_rules, diff_report_lines
 
 logging.basicConfig(
     level=logging.INFO,
@@ -11,109 +13,110 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Patterns for each focused rule type, compiled once at import
+FOCUSED_PATTERNS = {
+    "service_area": [
+        re.compile(r"(?i)service\s+area.*?(?:requirement|rule|must|shall).*?(?:\.|$)"),
+        re.compile(r"(?i)mileage.*?(?:calculation|formula|method).*?(?:\.|$)"),
+        re.compile(r"(?i)(?:state|county).*?service.*?(?:requirement|rule).*?(?:\.|$)")
+    ],
+    "project_id": [
+        re.compile(r"(?i)project\s+id.*?(?:format|structure|rule).*?(?:\.|$)"),
+        re.compile(r"(?i)project.*?(?:validation|verify|check).*?(?:\.|$)"),
+        re.compile(r"(?i)state\s+code.*?(?:valid|allowed|required).*?(?:\.|$)")
+    ],
+    "workflow": [
+        re.compile(r"(?i)(?:workflow|process).*?(?:step|sequence|order).*?(?:\.|$)"),
+        re.compile(r"(?i)(?:before|after|then|must).*?(?:can|allowed|proceed).*?(?:\.|$)"),
+        re.compile(r"(?i)(?:validation|check).*?(?:required|needed).*?(?:\.|$)")
+    ]
+}
+
 class FocusedSwarmAnalysis:
     """Focused analysis of PDF document"""
     
-    def __init__(self, pdf_path: str = None):
+    def __init__(self, pdf_path: str = None, extraction_workers: int = 1, incremental: bool = False):
         if pdf_path is None:
             pdf_path = "C:/Users/xbows/OneDrive/Desktop/Dad/SwarmRAG/Axis Program Management_Unformatted detailed.pdf"
         self.pdf_path = Path(pdf_path)
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.output_dir = Path("reports") / self.timestamp
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Page text is extracted once and shared by all rule extractors
+        self.page_text = PageTextProvider(self.pdf_path, workers=extraction_workers)
+        self._rules_by_type = None
+        # Re-analyze only changed pages and record added/removed rules
+        self.incremental = incremental
+        self.rule_changes = None
         
-    def _extract_service_area_rules(self) -> List[Dict[str, Any]]:
-        """Extract service area specific rules"""
-        logger.info("Extracting service area rules...")
-        rules = []
+    def _extract_rules(self, rule_type: str) -> List[Dict[str, Any]]:
+        """Extract rules of one type, running the shared single-pass extraction if needed"""
+        if self._rules_by_type is None:
+            self._rules_by_type = self._extract_all_rules()
+        return self._rules_by_type.get(rule_type, [])
+
+    def _extract_all_rules(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Run all precompiled patterns over each page's text in one pass"""
         try:
-            doc = fitz.open(self.pdf_path)
-            for page_num in range(len(doc)):
-                text = doc[page_num].get_text()
-                
-                # Search for service area patterns
-                service_patterns = [
-                    r"(?i)service\s+area.*?(?:requirement|rule|must|shall).*?(?:\.|$)",
-                    r"(?i)mileage.*?(?:calculation|formula|method).*?(?:\.|$)",
-                    r"(?i)(?:state|county).*?service.*?(?:requirement|rule).*?(?:\.|$)"
-                ]
-                
-                for pattern in service_patterns:
-                    matches = re.finditer(pattern, text)
-                    for match in matches:
-                        rules.append({
-                            "type": "service_area",
-                            "text": match.group().strip(),
-                            "page": page_num + 1
-                        })
-                        logger.info(f"Found service area rule on page {page_num + 1}")
+            if self.incremental:
+                page_result = IncrementalPageCache(self.pdf_path, namespace="focused").process(self._match_page)
+                page_matches = page_result.page_results
+                if page_result.previous_results is not None:
+                    self.rule_changes = diff_rules(
+                        self._rules_from_matches(page_result.previous_results),
+                        self._rules_from_matches(page_matches),
+                        text_key="text"
+                    )
+            else:
+                page_matches = [self._match_page(text) for text in self.page_text.pages()]
             
-            return rules
+            rules = self._rules_from_matches(page_matches)
+            by_type = {rule_type: [] for rule_type in FOCUSED_PATTERNS}
+            for rule in rules:
+                by_type[rule["type"]].append(rule)
+            for rule_type, found in by_type.items():
+                logger.info(f"Found {len(found)} {rule_type} rules")
+            return by_type
         except Exception as e:
-            logger.error(f"Error extracting service area rules: {str(e)}")
-            return []
+            logger.error(f"Error extracting rules: {str(e)}")
+            return {rule_type: [] for rule_type in FOCUSED_PATTERNS}
+
+    @staticmethod
+    def _match_page(text: str) -> Dict[str, List[str]]:
+        """Matched rule texts per type for one page (no page numbers, so cacheable)"""
+        return {
+            rule_type: [
+                match.group().strip()
+                for pattern in patterns
+                for match in pattern.finditer(text)
+            ]
+            for rule_type, patterns in FOCUSED_PATTERNS.items()
+        }
+
+    @staticmethod
+    def _rules_from_matches(page_matches: List[Dict[str, List[str]]]) -> List[Dict[str, Any]]:
+        """Attach page numbers to per-page matches, in page order"""
+        return [
+            {"type": rule_type, "text": text, "page": page_num}
+            for page_num, matches in enumerate(page_matches, start=1)
+            for rule_type, texts in matches.items()
+            for text in texts
+        ]
+
+    def _extract_service_area_rules(self) -> List[Dict[str, Any]]:
+        """Extract service area specific rules"""
+        logger.info("Extracting service area rules...")
+        return self._extract_rules("service_area")
 
     def _extract_project_id_rules(self) -> List[Dict[str, Any]]:
         """Extract project ID specific rules"""
         logger.info("Extracting project ID rules...")
-        rules = []
-        try:
-            doc = fitz.open(self.pdf_path)
-            for page_num in range(len(doc)):
-                text = doc[page_num].get_text()
-                
-                # Search for project ID patterns
-                id_patterns = [
-                    r"(?i)project\s+id.*?(?:format|structure|rule).*?(?:\.|$)",
-                    r"(?i)project.*?(?:validation|verify|check).*?(?:\.|$)",
-                    r"(?i)state\s+code.*?(?:valid|allowed|required).*?(?:\.|$)"
-                ]
-                
-                for pattern in id_patterns:
-                    matches = re.finditer(pattern, text)
-                    for match in matches:
-                        rules.append({
-                            "type": "project_id",
-                            "text": match.group().strip(),
-                            "page": page_num + 1
-                        })
-                        logger.info(f"Found project ID rule on page {page_num + 1}")
-            
-            return rules
-        except Exception as e:
-            logger.error(f"Error extracting project ID rules: {str(e)}")
-            return []
+        return self._extract_rules("project_id")
 
     def _extract_workflow_rules(self) -> List[Dict[str, Any]]:
         """Extract workflow specific rules"""
         logger.info("Extracting workflow rules...")
-        rules = []
-        try:
-            doc = fitz.open(self.pdf_path)
-            for page_num in range(len(doc)):
-                text = doc[page_num].get_text()
-                
-                # Search for workflow patterns
-                workflow_patterns = [
-                    r"(?i)(?:workflow|process).*?(?:step|sequence|order).*?(?:\.|$)",
-                    r"(?i)(?:before|after|then|must).*?(?:can|allowed|proceed).*?(?:\.|$)",
-                    r"(?i)(?:validation|check).*?(?:required|needed).*?(?:\.|$)"
-                ]
-                
-                for pattern in workflow_patterns:
-                    matches = re.finditer(pattern, text)
-                    for match in matches:
-                        rules.append({
-                            "type": "workflow",
-                            "text": match.group().strip(),
-                            "page": page_num + 1
-                        })
-                        logger.info(f"Found workflow rule on page {page_num + 1}")
-            
-            return rules
-        except Exception as e:
-            logger.error(f"Error extracting workflow rules: {str(e)}")
-            return []
+        return self._extract_rules("workflow")
 
     def _generate_combined_report(self, 
                                 service_area_rules: List[Dict[str, Any]],
@@ -126,41 +129,41 @@ class FocusedSwarmAnalysis:
         
         try:
             with open(report_path, 'w') as f:
-                # Write report header
-                f.write("# Focused SwarmRAG Analysis Report\n\n")
-                f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+                writer = StreamingReportWriter(f)
                 
-                # Write service area rules
-                f.write("## Service Area Rules\n")
-                for rule in service_area_rules:
-                    f.write(f"- Page {rule['page']}: {rule['text']}\n")
-                
-                # Write project ID rules
-                f.write("\n## Project ID Rules\n")
-                for rule in project_id_rules:
-                    f.write(f"- Page {rule['page']}: {rule['text']}\n")
+                # Write report header
+                writer.write_section([
+                    "# Focused SwarmRAG Analysis Report\n",
+                    f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                ])
                 
-                # Write workflow rules
-                f.write("\n## Workflow Rules\n")
-                for rule in workflow_rules:
-                    f.write(f"- Page {rule['page']}: {rule['text']}\n")
+                # Write rule sections, each flushed as soon as it is complete
+                for title, rules in (
+                    ("## Service Area Rules", service_area_rules),
+                    ("\n## Project ID Rules", project_id_rules),
+                    ("\n## Workflow Rules", workflow_rules)
+                ):
+                    writer.write_line(title)
+                    writer.write_section(
+                        f"- Page {rule['page']}: {rule['text']}" for rule in rules
+                    )
                 
                 # Write implementation recommendations
-                f.write("\n## Implementation Recommendations\n")
-                f.write("### Service Area Implementation\n")
-                f.write("- Implement validation for mileage calculations\n")
-                f.write("- Add state-specific rule checking\n")
-                f.write("- Include county validation\n")
-                
-                f.write("\n### Project ID Implementation\n")
-                f.write("- Implement format validation\n")
-                f.write("- Add state code verification\n")
-                f.write("- Include existence checking\n")
-                
-                f.write("\n### Workflow Implementation\n")
-                f.write("- Implement step sequencing\n")
-                f.write("- Add dependency checking\n")
-                f.write("- Include validation gates\n")
+                writer.write_section([
+                    "\n## Implementation Recommendations",
+                    "### Service Area Implementation",
+                    "- Implement validation for mileage calculations",
+                    "- Add state-specific rule checking",
+                    "- Include county validation",
+                    "\n### Project ID Implementation",
+                    "- Implement format validation",
+                    "- Add state code verification",
+                    "- Include existence checking",
+                    "\n### Workflow Implementation",
+                    "- Implement step sequencing",
+                    "- Add dependency checking",
+                    "- Include validation gates"
+                ])
             
             logger.info(f"Report generated: {report_path}")
             
@@ -185,6 +188,18 @@ class FocusedSwarmAnalysis:
                 workflow_rules
             )
             
+            # Write added/removed rules when re-running incrementally
+            if self.rule_changes is not None:
+                changes_path = self.output_dir / f"rule_changes_{self.timestamp}.md"
+                with open(changes_path, 'w') as f:
+                    StreamingReportWriter(f).write_section(
+                        diff_report_lines(self.rule_changes, text_key="text")
+                    )
+                logger.info(
+                    f"Rule changes: {len(self.rule_changes['added'])} added, "
+                    f"{len(self.rule_changes['removed'])} removed (see {changes_path})"
+                )
+            
             logger.info("Analysis complete!")
             
         except Exception as e:
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+# v2: page hashes also cover fonts, images and form XObjects
+MANIFEST_VERSION = 2
+
+_OBJECT_REF_RE = re.compile(r"(\d+) \d+ R")
+
+
+def _resource_xrefs(page) -> Set[int]:
+    """Xrefs of every object reachable from the fonts, images and form XObjects a page uses.
+
+    Following references picks up what those resources pull in themselves
+    (ToUnicode maps, embedded font files, soft masks, nested XObjects).
+    """
+    doc = page.parent
+    pending = [item[0] for item in page.get_fonts(full=True)]
+    pending += [item[0] for item in page.get_images(full=True)]
+    pending += [item[0] for item in page.get_xobjects()]
+    seen: Set[int] = set()
+    while pending:
+        xref = pending.pop()
+        if xref <= 0 or xref in seen:
+            continue
+        seen.add(xref)
+        pending.extend(int(ref) for ref in _OBJECT_REF_RE.findall(doc.xref_object(xref, compressed=True)))
+    return seen
+
+
+def _object_digest(doc, xref: int) -> bytes:
+    digest = hashlib.md5(doc.xref_object(xref, compressed=True).encode())
+    if doc.xref_is_stream(xref):
+        digest.update(doc.xref_stream_raw(xref))
+    return digest.digest()
+
+
+def page_hash(page, object_digests: Optional[Dict[int, bytes]] = None) -> str:
+    """Hash a page's content streams and every resource object they draw with.
+
+    Raw (undecoded) streams are hashed, which is much cheaper than text
+    extraction, and revising only a font or XObject still changes the hash.
+    Pass the same object_digests dict for every page of a document so shared
+    resources are hashed once.
+    """
+    if object_digests is None:
+        object_digests = {}
+    digest = hashlib.md5(page.read_contents())
+    digest.update(str(page.rect).encode())
+    for xref in sorted(_resource_xrefs(page)):
+        if xref not in object_digests:
+            object_digests[xref] = _object_digest(page.parent, xref)
+        digest.update(object_digests[xref])
+    return digest.hexdigest()
+
+
+@dataclass
+class IncrementalResult:
+    """Page texts and per-page results after an incremental run"""
+    texts: List[str]
+    page_results: List[Any]
+    previous_results: Optional[List[Any]]
+    changed_pages: List[int] = field(default_factory=list)  # 1-based
+    removed_pages: List[int] = field(default_factory=list)  # 1-based, in the previous run
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def reused_pages(self) -> int:
+        return len(self.texts) - len(self.changed_pages)
+
+
+class IncrementalPageCache:
+    """Per-page hash manifest so re-runs only re-extract and re-analyze changed pages.
+
+    The manifest is keyed by document path and a namespace (one per analysis
+    type), and stores each page's content hash, text and analysis result.
+    On the first run every page counts as changed.
+    """
+
+    def __init__(self, doc_path: Path, namespace: str, cache_dir: Path = Path("cache") / "manifests"):
+        self.doc_path = Path(doc_path)
+        self.namespace = namespace
+        self.cache_dir = Path(cache_dir)
+
+    @property
+    def manifest_path(self) -> Path:
+        path_key = hashlib.md5(str(self.doc_path.resolve()).encode()).hexdigest()[:8]
+        return self.cache_dir / f"{self.doc_path.stem}-{path_key}-{self.namespace}.json"
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        if not self.manifest_path.exists():
+            return None
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != MANIFEST_VERSION:
+                return None
+            return manifest
+        except Exception as e:
+            logger.warning(f"Manifest load failed, reprocessing all pages: {str(e)}")
+            return None
+
+    def _save_manifest(self, pages: List[Dict[str, Any]]):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.manifest_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "pages": pages}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception as e:
+            logger.warning(f"Could not write page manifest: {str(e)}")
+
+    def process(self, analyze_page: Callable[[str], Any]) -> IncrementalResult:
+        """Analyze new or changed pages with analyze_page(text) and reuse the rest.
+
+        Pages are matched on content hash rather than position, so inserting
+        or removing a page does not invalidate the pages after it. Results
+        must therefore not embed page numbers; callers attach them.
+        """
+        manifest = self._load_manifest()
+        previous_pages = manifest["pages"] if manifest else []
+        previous_by_hash = {page["hash"]: page for page in previous_pages}
+
+        pages = []
+        changed = []
+        object_digests: Dict[int, bytes] = {}
+        with fitz.open(self.doc_path) as doc:
+            metadata = doc.metadata
+            for page_num in range(len(doc)):
+                page = doc[page_num]
+                content_hash = page_hash(page, object_digests)
+                previous = previous_by_hash.get(content_hash)
+                if previous is not None:
+                    pages.append(previous)
+                    continue
+                text = page.get_text()
+                pages.append({
+                    "hash": content_hash,
+                    "text": text,
+                    "result": analyze_page(text)
+                })
+                changed.append(page_num + 1)
+
+        current_hashes = {page["hash"] for page in pages}
+        removed = [
+            page_num for page_num, page in enumerate(previous_pages, start=1)
+            if page["hash"] not in current_hashes
+        ]
+        if changed or removed or len(pages) != len(previous_pages):
+            self._save_manifest(pages)
+        logger.info(
+            f"Incremental run: {len(changed)} changed, {len(pages) - len(changed)} reused, "
+            f"{len(removed)} removed pages"
+        )
+
+        return IncrementalResult(
+            texts=[page["text"] for page in pages],
+            page_results=[page["result"] for page in pages],
+            previous_results=[page["result"] for page in previous_pages] if manifest else None,
+            changed_pages=changed,
+            removed_pages=removed,
+            metadata=metadata
+        )
+
+
+def diff_rules(
+    previous: Iterable[Dict[str, Any]],
+    current: Iterable[Dict[str, Any]],
+    text_key: str = "rule"
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Rules added and removed between two runs, matched on (type, text)"""
+    previous = list(previous)
+    current = list(current)
+    previous_keys = {(rule["type"], rule[text_key]) for rule in previous}
+    current_keys = {(rule["type"], rule[text_key]) for rule in current}
+    return {
+        "added": [rule for rule in current if (rule["type"], rule[text_key]) not in previous_keys],
+        "removed": [rule for rule in previous if (rule["type"], rule[text_key]) not in current_keys]
+    }
+
+
+def diff_report_lines(changes: Dict[str, List[Dict[str, Any]]], text_key: str = "rule") -> Iterable[str]:
+    """Markdown lines describing added and removed rules"""
+    yield "# Rule Changes\n"
+    for label, key in (("Added", "added"), ("Removed", "removed")):
+        yield f"## {label} Rules ({len(changes[key])})"
+        for rule in changes[key]:
+            yield f"- [{rule['type']}] Page {rule['page']}: {rule[text_key]}"
+        yield ""
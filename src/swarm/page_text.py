@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+
+def document_fingerprint(doc_path: Path, block_size: int = 1 << 20) -> str:
+    """Hash the document bytes without loading the whole file into memory"""
+    digest = hashlib.md5()
+    with open(doc_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_page_range(doc_path: str, start: int, end: int) -> List[str]:
+    """Extract text for pages [start, end); module-level so it can run in a worker process"""
+    doc = fitz.open(doc_path)
+    try:
+        return [doc[page_num].get_text() for page_num in range(start, min(end, len(doc)))]
+    finally:
+        doc.close()
+
+
+def page_ranges(page_count: int, shards: int) -> List[Tuple[int, int]]:
+    """Split page_count pages into at most `shards` contiguous ranges"""
+    shards = max(1, min(shards, page_count))
+    size, extra = divmod(page_count, shards)
+    ranges = []
+    start = 0
+    for shard in range(shards):
+        end = start + size + (1 if shard < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+class PageTextProvider:
+    """Extract a PDF's page text once and cache it on disk by document fingerprint"""
+
+    def __init__(
+        self,
+        doc_path: Path,
+        cache_dir: Path = Path("cache") / "page_text",
+        workers: int = 1
+    ):
+        self.doc_path = Path(doc_path)
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers
+        self._fingerprint: Optional[str] = None
+        self._pages: Optional[List[str]] = None
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = document_fingerprint(self.doc_path)
+        return self._fingerprint
+
+    @property
+    def cache_path(self) -> Path:
+        return self.cache_dir / f"{self.fingerprint}.json"
+
+    def _load_cache(self) -> Optional[List[str]]:
+        if not self.cache_path.exists():
+            return None
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)["pages"]
+        except Exception as e:
+            logger.warning(f"Page text cache load failed, re-extracting: {str(e)}")
+            return None
+
+    def _save_cache(self, pages: List[str]):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": self.fingerprint, "pages": pages}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Could not write page text cache: {str(e)}")
+
+    def _extract(self) -> List[str]:
+        with fitz.open(self.doc_path) as doc:
+            page_count = len(doc)
+        if self.workers <= 1 or page_count < 2:
+            return extract_page_range(str(self.doc_path), 0, page_count)
+
+        ranges = page_ranges(page_count, self.workers)
+        logger.info(f"Extracting {page_count} pages with {len(ranges)} workers...")
+        pages: List[str] = []
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = [
+                pool.submit(extract_page_range, str(self.doc_path), start, end)
+                for start, end in ranges
+            ]
+            # Collect in submission order to keep page ordering stable
+            for future in futures:
+                pages.extend(future.result())
+        return pages
+
+    def pages(self) -> List[str]:
+        """Return page text, extracting at most once per document version"""
+        if self._pages is None:
+            pages = self._load_cache()
+            if pages is None:
+                pages = self._extract()
+                self._save_cache(pages)
+            else:
+                logger.info(f"Loaded cached page text for {self.doc_path.name}")
+            self._pages = pages
+        return self._pages
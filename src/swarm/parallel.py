@@ -0,0 +1,95 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import fitz  # PyMuPDF
+
+from src.swarm.agents import DocumentProcessor, BusinessAnalyzer, RULE_SOURCES
+from src.swarm.page_text import page_ranges
+from src.swarm.rule_store import RuleStore
+
+logger = logging.getLogger(__name__)
+
+# Order in which BusinessAnalyzer emits rule types; merged output keeps it
+RULE_TYPE_ORDER = [rule_type for rule_type, _, _ in RULE_SOURCES]
+
+
+def analyze_shard(doc_path: str, start: int, end: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Extract and analyze pages [start, end); runs inside a worker process"""
+    doc = fitz.open(doc_path)
+    try:
+        doc_content = DocumentProcessor(Path(doc_path)).process_pages(doc, start, end)
+    finally:
+        doc.close()
+    rules = BusinessAnalyzer(doc_content).analyze()
+    return doc_content, rules
+
+
+def merge_shards(
+    shards: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+    metadata: Dict[str, Any]
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Merge shard results (given in page order) into single-pass equivalent output"""
+    structured_content = {
+        "service_areas": [],
+        "products": [],
+        "workflows": [],
+        "business_rules": []
+    }
+    content = []
+    page_count = 0
+    rules = []
+    for doc_content, shard_rules in shards:
+        content.append(doc_content["content"])
+        for category, items in doc_content["structured_content"].items():
+            structured_content[category].extend(items)
+        page_count = doc_content["page_count"]
+        rules.extend(shard_rules)
+
+    # Stable sort: rules stay in page order within each type
+    type_rank = {rule_type: rank for rank, rule_type in enumerate(RULE_TYPE_ORDER)}
+    rules.sort(key=lambda rule: type_rank.get(rule["type"], len(type_rank)))
+
+    doc_content = {
+        "content": "\n".join(content),
+        "structured_content": structured_content,
+        "page_count": page_count,
+        "metadata": metadata
+    }
+    return doc_content, rules
+
+
+class ParallelDocumentAnalyzer:
+    """Shard a document by page range and run extraction and rule analysis in a process pool"""
+
+    def __init__(self, doc_path: Path, workers: int = None):
+        self.doc_path = Path(doc_path)
+        self.workers = workers or os.cpu_count() or 1
+
+    def analyze(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Return (doc_content, business_rules) as the sequential pipeline would"""
+        with fitz.open(self.doc_path) as doc:
+            page_count = len(doc)
+            metadata = doc.metadata
+
+        ranges = page_ranges(page_count, self.workers)
+        logger.info(f"Analyzing {page_count} pages in {len(ranges)} shards...")
+
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = [
+                pool.submit(analyze_shard, str(self.doc_path), start, end)
+                for start, end in ranges
+            ]
+            # Results are collected in submission (page) order for deterministic merging
+            shards = [future.result() for future in futures]
+
+        return merge_shards(shards, metadata)
+
+    def analyze_store(self) -> Tuple[Dict[str, Any], RuleStore]:
+        """Like analyze(), with the merged rules packed into a RuleStore"""
+        doc_content, rules = self.analyze()
+        store = RuleStore()
+        store.extend(rules)
+        return doc_content, store
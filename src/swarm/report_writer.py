@@ -0,0 +1,85 @@
+import logging
+from array import array
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Sequence, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def iter_rule_groups(
+    rules: Iterable[Dict[str, Any]],
+    key: str = "category"
+) -> Iterator[Tuple[str, Iterator[Dict[str, Any]]]]:
+    """Group rules by category in first-seen order with a single indexing pass.
+
+    Input does not need to be category-contiguous. Grouping needs every rule
+    before the first group can be emitted, so only row indexes are added on
+    top of the rules themselves (no per-category lists of dicts).
+    """
+    if not isinstance(rules, Sequence):
+        rules = list(rules)
+    groups: Dict[str, array] = {}
+    for index, rule in enumerate(rules):
+        groups.setdefault(rule[key], array("I")).append(index)
+    for category, indexes in groups.items():
+        yield category, (rules[index] for index in indexes)
+
+
+class StreamingReportWriter:
+    """Write report lines straight to a text sink, flushing as sections complete"""
+
+    def __init__(self, sink: TextIO, flush_every: int = 500):
+        self.sink = sink
+        self.flush_every = flush_every
+        self.lines_written = 0
+        self._pending = 0
+
+    def write_line(self, line: str):
+        self.sink.write(line + "\n")
+        self.lines_written += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def write_lines(self, lines: Iterable[str]):
+        for line in lines:
+            self.write_line(line)
+
+    def write_section(self, lines: Iterable[str]):
+        """Write a section and flush so it is readable immediately"""
+        self.write_lines(lines)
+        self.flush()
+
+    def flush(self):
+        if hasattr(self.sink, "flush"):
+            self.sink.flush()
+        self._pending = 0
+
+
+class AsyncStreamingReportWriter:
+    """Batch report lines and hand them to an async sink, e.g. a websocket or aiofiles handle"""
+
+    def __init__(self, sink: Callable[[str], Awaitable[Any]], flush_every: int = 500):
+        self.sink = sink
+        self.flush_every = flush_every
+        self.lines_written = 0
+        self._buffer: List[str] = []
+
+    async def write_line(self, line: str):
+        self._buffer.append(line + "\n")
+        self.lines_written += 1
+        if len(self._buffer) >= self.flush_every:
+            await self.flush()
+
+    async def write_lines(self, lines: Iterable[str]):
+        for line in lines:
+            await self.write_line(line)
+
+    async def write_section(self, lines: Iterable[str]):
+        await self.write_lines(lines)
+        await self.flush()
+
+    async def flush(self):
+        if self._buffer:
+            batch = "".join(self._buffer)
+            self._buffer = []
+            await self.sink(batch)
@@ -0,0 +1,208 @@
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class RuleRecord:
+    """Lightweight view of one rule in a RuleStore"""
+
+    __slots__ = ("type", "category", "rule", "page", "offset", "pages", "duplicates")
+
+    def __init__(
+        self,
+        type: str,
+        category: str,
+        rule: str,
+        page: int,
+        offset: int,
+        pages: Optional[List[int]] = None,
+        duplicates: int = 0
+    ):
+        self.type = type
+        self.category = category
+        self.rule = rule
+        self.page = page
+        self.offset = offset
+        self.pages = pages
+        self.duplicates = duplicates
+
+    def __getitem__(self, key: str):
+        # Dict-style access so records drop into code written for rule dicts
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        rule = {
+            "type": self.type,
+            "rule": self.rule,
+            "page": self.page,
+            "category": self.category
+        }
+        if self.duplicates:
+            rule["pages"] = list(self.pages)
+            rule["duplicates"] = self.duplicates
+        return rule
+
+
+class RuleStore:
+    """Columnar store for extracted rules.
+
+    Type and category strings are interned once; page, offset and text
+    positions live in typed arrays; rule text is stored once in a shared
+    UTF-8 buffer. Rows that stand for a cluster of near-duplicates keep
+    their source pages in a sparse side table.
+    """
+
+    def __init__(self):
+        self._labels: List[tuple] = []  # (type, category) pairs
+        self._label_index: Dict[tuple, int] = {}
+        self._label_ids = array("H")
+        self._pages = array("I")
+        self._offsets = array("I")
+        self._text_starts = array("Q")
+        self._text_lengths = array("I")
+        self._buffer = bytearray()
+        self._merged: Dict[int, Tuple[array, int]] = {}  # row -> (source pages, duplicates)
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def __iter__(self) -> Iterator[RuleRecord]:
+        for index in range(len(self)):
+            yield self.record(index)
+
+    def _intern(self, rule_type: str, category: str) -> int:
+        key = (rule_type, category)
+        label_id = self._label_index.get(key)
+        if label_id is None:
+            label_id = len(self._labels)
+            self._labels.append(key)
+            self._label_index[key] = label_id
+        return label_id
+
+    def add(
+        self,
+        rule_type: str,
+        category: str,
+        text: str,
+        page: int,
+        offset: int = 0,
+        pages: Optional[Iterable[int]] = None,
+        duplicates: int = 0
+    ):
+        """Append one rule; pages/duplicates describe a deduplicated cluster"""
+        encoded = text.encode("utf-8")
+        if duplicates:
+            self._merged[len(self)] = (array("I", pages if pages is not None else [page]), duplicates)
+        self._label_ids.append(self._intern(rule_type, category))
+        self._pages.append(page)
+        self._offsets.append(offset)
+        self._text_starts.append(len(self._buffer))
+        self._text_lengths.append(len(encoded))
+        self._buffer.extend(encoded)
+
+    def extend(self, rules: Iterable[Dict[str, Any]]):
+        """Append rules in the BusinessAnalyzer dict format"""
+        for rule in rules:
+            self.add(
+                rule["type"], rule["category"], rule["rule"], rule["page"], rule.get("offset", 0),
+                pages=rule.get("pages"), duplicates=rule.get("duplicates", 0)
+            )
+
+    def text(self, index: int) -> str:
+        start = self._text_starts[index]
+        return self._buffer[start:start + self._text_lengths[index]].decode("utf-8")
+
+    def category(self, index: int) -> str:
+        return self._labels[self._label_ids[index]][1]
+
+    def record(self, index: int) -> RuleRecord:
+        rule_type, category = self._labels[self._label_ids[index]]
+        merged = self._merged.get(index)
+        if merged is None:
+            return RuleRecord(rule_type, category, self.text(index), self._pages[index], self._offsets[index])
+        pages, duplicates = merged
+        return RuleRecord(
+            rule_type, category, self.text(index), self._pages[index], self._offsets[index],
+            pages=pages.tolist(), duplicates=duplicates
+        )
+
+    def categories(self) -> List[str]:
+        """Categories in first-seen order"""
+        seen = []
+        for _, category in self._labels:
+            if category not in seen:
+                seen.append(category)
+        return seen
+
+    def group_by_category(self) -> Dict[str, array]:
+        """Row indexes per category, built in one pass over the label column"""
+        label_categories = [category for _, category in self._labels]
+        groups: Dict[str, array] = {category: array("I") for category in self.categories()}
+        for index, label_id in enumerate(self._label_ids):
+            groups[label_categories[label_id]].append(index)
+        return groups
+
+    def iter_grouped(self) -> Iterator[RuleRecord]:
+        """Yield records grouped by category, in first-seen category order"""
+        for indexes in self.group_by_category().values():
+            for index in indexes:
+                yield self.record(index)
+
+    def by_category(self, category: str) -> Iterator[RuleRecord]:
+        label_ids = {
+            label_id for label_id, (_, label_category) in enumerate(self._labels)
+            if label_category == category
+        }
+        for index, label_id in enumerate(self._label_ids):
+            if label_id in label_ids:
+                yield self.record(index)
+
+    def in_page_range(self, start: int, end: Optional[int] = None) -> Iterator[RuleRecord]:
+        """Records whose page is within [start, end] (inclusive, 1-based)"""
+        for index, page in enumerate(self._pages):
+            if page >= start and (end is None or page <= end):
+                yield self.record(index)
+
+    def memory_bytes(self) -> int:
+        """Approximate payload size of the columns and text buffer"""
+        columns = (self._label_ids, self._pages, self._offsets, self._text_starts, self._text_lengths)
+        merged = sum(pages.itemsize * len(pages) for pages, _ in self._merged.values())
+        return len(self._buffer) + merged + sum(column.itemsize * len(column) for column in columns)
+
+    def to_columns(self) -> Dict[str, Any]:
+        """Serialize to a JSON-friendly columnar dict"""
+        return {
+            "labels": [list(label) for label in self._labels],
+            "label_ids": self._label_ids.tolist(),
+            "pages": self._pages.tolist(),
+            "offsets": self._offsets.tolist(),
+            "text_lengths": self._text_lengths.tolist(),
+            "text": self._buffer.decode("utf-8"),
+            "merged": {
+                str(index): [pages.tolist(), duplicates]
+                for index, (pages, duplicates) in self._merged.items()
+            }
+        }
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Any]) -> "RuleStore":
+        store = cls()
+        for rule_type, category in columns["labels"]:
+            store._intern(rule_type, category)
+        store._label_ids.extend(columns["label_ids"])
+        store._pages.extend(columns["pages"])
+        store._offsets.extend(columns["offsets"])
+        store._text_lengths.extend(columns["text_lengths"])
+        store._buffer.extend(columns["text"].encode("utf-8"))
+        for index, (pages, duplicates) in columns.get("merged", {}).items():
+            store._merged[int(index)] = (array("I", pages), duplicates)
+        position = 0
+        for length in store._text_lengths:
+            store._text_starts.append(position)
+            position += length
+        return store
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [record.to_dict() for record in self]
@@ -1,6 +1,6 @@
 import logging
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 from src.swarm.agents import (
     DocumentProcessor,
@@ -8,6 +8,9 @@ from src.swarm.agents import (
     ImplementationPlanner,
     ReportGenerator
 )
+from src.swarm.parallel import ParallelDocumentAnalyzer
+from src.swarm.incremental import IncrementalPageCache, diff_rules, diff_report_lines
+from src.swarm.report_writer import StreamingReportWriter
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,8 +21,17 @@ logger = logging.getLogger(__name__)
 class SwarmAnalysis:
     """Main SwarmRAG analysis controller"""
     
-    def __init__(self, doc_path: str):
+    def __init__(
+        self,
+        doc_path: str,
+        workers: int = 1,
+        dedup_threshold: Optional[float] = None,
+        incremental: bool = False
+    ):
         self.doc_path = Path(doc_path)
+        self.workers = workers
+        self.dedup_threshold = dedup_threshold
+        self.incremental = incremental
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.output_dir = Path("reports") / self.timestamp
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -29,38 +41,75 @@ class SwarmAnalysis:
         logger.info("Starting full SwarmRAG analysis...")
         
         try:
-            # 1. Process Document
-            logger.info("Processing document...")
-            processor = DocumentProcessor(self.doc_path)
-            doc_content = processor.process()
-            
-            # 2. Analyze Business Rules
-            logger.info("Analyzing business rules...")
-            analyzer = BusinessAnalyzer(doc_content)
-            business_rules = analyzer.analyze()
-            
-            # 3. Create Implementation Plan
-            logger.info("Creating implementation plan...")
-            planner = ImplementationPlanner(business_rules)
-            implementation_plan = planner.create_plan()
-            
-            # 4. Generate Report
-            logger.info("Generating comprehensive report...")
-            generator = ReportGenerator(
-                doc_content=doc_content,
-                business_rules=business_rules,
-                implementation_plan=implementation_plan
-            )
-            report = generator.generate_report()
-            
-            # Save report
+            rule_changes = None
             report_path = self.output_dir / f"swarm_analysis_report_{self.timestamp}.md"
-            report_path.write_text(report)
+            with open(report_path, "w") as report_file:
+                # Sections are streamed as soon as their inputs exist. The rules
+                # section is grouped by category, so it still waits for the whole
+                # document; rules are held in a compact RuleStore until then.
+                writer = StreamingReportWriter(report_file)
+                if self.workers > 1 and not self.incremental:
+                    # 1-2. Process and analyze page-range shards in parallel
+                    logger.info(f"Processing document with {self.workers} workers...")
+                    doc_content, business_rules = ParallelDocumentAnalyzer(
+                        self.doc_path, workers=self.workers
+                    ).analyze_store()
+                    writer.write_section(ReportGenerator.summary_lines(doc_content))
+                else:
+                    # 1. Process Document
+                    processor = DocumentProcessor(self.doc_path)
+                    page_result = None
+                    if self.incremental:
+                        # Re-process only pages whose content changed since the last run
+                        if self.workers > 1:
+                            logger.warning(
+                                f"Ignoring workers={self.workers}: incremental processing runs in one process"
+                            )
+                        logger.info("Processing document incrementally...")
+                        doc_content, page_result = processor.process_incremental(
+                            IncrementalPageCache(self.doc_path, namespace="swarm")
+                        )
+                    else:
+                        logger.info("Processing document...")
+                        doc_content = processor.process()
+                    
+                    # The summary is readable while rules are still being analyzed
+                    writer.write_section(ReportGenerator.summary_lines(doc_content))
+                    
+                    # 2. Analyze Business Rules
+                    logger.info("Analyzing business rules...")
+                    business_rules = BusinessAnalyzer(doc_content).analyze_store()
+                    if page_result is not None and page_result.previous_results is not None:
+                        rule_changes = self._write_rule_changes(page_result.previous_results, business_rules)
+                
+                # Collapse near-duplicate rules produced by overlapping patterns
+                dedup_stats = None
+                if self.dedup_threshold is not None:
+                    logger.info("Deduplicating business rules...")
+                    business_rules, dedup_stats = BusinessAnalyzer(doc_content).deduplicate(
+                        business_rules, threshold=self.dedup_threshold
+                    )
+                
+                # 3. Create Implementation Plan
+                logger.info("Creating implementation plan...")
+                planner = ImplementationPlanner(business_rules)
+                implementation_plan = planner.create_plan()
+                
+                # 4. Generate Report
+                logger.info("Generating comprehensive report...")
+                generator = ReportGenerator(
+                    doc_content=doc_content,
+                    business_rules=business_rules,
+                    implementation_plan=implementation_plan
+                )
+                generator.write_report(report_file, include_summary=False)
             
             logger.info(f"Analysis complete! Report saved to: {report_path}")
             return {
                 "status": "success",
                 "report_path": str(report_path),
+                "dedup_stats": dedup_stats,
+                "rule_changes": rule_changes,
                 "timestamp": self.timestamp
             }
             
@@ -72,6 +121,26 @@ class SwarmAnalysis:
                 "timestamp": self.timestamp
             }
 
+    def _write_rule_changes(self, previous_results, business_rules) -> Dict[str, Any]:
+        """Diff rules against the previous run and write a change report"""
+        previous_content = {
+            "structured_content": DocumentProcessor.structured_from_page_results(previous_results)
+        }
+        changes = diff_rules(BusinessAnalyzer(previous_content).iter_rules(), business_rules)
+        
+        changes_path = self.output_dir / f"rule_changes_{self.timestamp}.md"
+        with open(changes_path, "w") as changes_file:
+            StreamingReportWriter(changes_file).write_section(diff_report_lines(changes))
+        logger.info(
+            f"Rule changes: {len(changes['added'])} added, {len(changes['removed'])} removed "
+            f"(see {changes_path})"
+        )
+        return {
+            "added": len(changes["added"]),
+            "removed": len(changes["removed"]),
+            "report_path": str(changes_path)
+        }
+
 if __name__ == "__main__":
     import argparse
     
@@ -79,10 +148,23 @@ if __name__ == "__main__":
     parser.add_argument("--doc-path", type=str, 
                        default="C:/Users/xbows/OneDrive/Desktop/Dad/SwarmRAG/Axis Program Management_Unformatted detailed.pdf",
                        help="Path to the document to analyze")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Worker processes for page-range parallel analysis")
+    parser.add_argument("--dedup-threshold", type=float, default=0,
+                       help="Collapse near-duplicate rules at this similarity, e.g. 0.8 (default: off)")
+    parser.add_argument("--incremental", action="store_true",
+                       help="Only re-analyze pages that changed since the last run")
     
     args = parser.parse_args()
+    if args.incremental and args.workers > 1:
+        parser.error("--incremental cannot be combined with --workers > 1")
     
-    analyzer = SwarmAnalysis(args.doc_path)
+    analyzer = SwarmAnalysis(
+        args.doc_path,
+        workers=args.workers,
+        dedup_threshold=args.dedup_threshold if args.dedup_threshold > 0 else None,
+        incremental=args.incremental
+    )
     result = analyzer.run_full_analysis()
     
     if result["status"] == "success":
@@ -0,0 +1,187 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+
+# Prometheus metrics shared by every ledger in the process
+LLM_TOKENS = Counter(
+    'swarmrag_llm_tokens_total',
+    'LLM tokens consumed',
+    ['agent', 'kind']
+)
+LLM_CALLS = Counter(
+    'swarmrag_llm_calls_total',
+    'LLM calls made',
+    ['agent']
+)
+LLM_LATENCY = Histogram(
+    'swarmrag_llm_call_duration_seconds',
+    'LLM call latency in seconds',
+    ['agent'],
+    buckets=[0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0]
+)
+
+
+@dataclass
+class UsageRecord:
+    """Token usage and latency for one LLM call"""
+    agent: str
+    document: Optional[str]
+    revision: int
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float
+    estimated: bool  # True when the provider returned no usage metadata
+
+
+@dataclass
+class _UsageScope:
+    ledger: "UsageLedger"
+    document: Optional[str] = None
+    revision: int = 0
+
+
+_current_scope: ContextVar[Optional[_UsageScope]] = ContextVar("usage_scope", default=None)
+
+
+def extract_usage(result) -> Optional[Tuple[int, int]]:
+    """Read (prompt, completion) tokens from a LangChain LLMResult, if reported"""
+    try:
+        message = getattr(result.generations[0][0], "message", None)
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            return int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0))
+    except (AttributeError, IndexError, TypeError):
+        pass
+    llm_output = getattr(result, "llm_output", None) or {}
+    usage = llm_output.get("usage") or llm_output.get("token_usage")
+    if usage:
+        if not isinstance(usage, dict):
+            usage = vars(usage)
+        prompt = usage.get("input_tokens", usage.get("prompt_tokens"))
+        completion = usage.get("output_tokens", usage.get("completion_tokens"))
+        if prompt is not None and completion is not None:
+            return int(prompt), int(completion)
+    return None
+
+
+class UsageLedger:
+    """Records LLM usage per agent, document and revision attempt"""
+
+    def __init__(self, input_cost_per_mtok: float = 0.0, output_cost_per_mtok: float = 0.0):
+        self.input_cost_per_mtok = input_cost_per_mtok
+        self.output_cost_per_mtok = output_cost_per_mtok
+        self.records: List[UsageRecord] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self, document: Optional[str] = None) -> Iterator["UsageLedger"]:
+        """Route usage recorded in the enclosed code to this ledger"""
+        token = _current_scope.set(_UsageScope(self, document))
+        try:
+            yield self
+        finally:
+            _current_scope.reset(token)
+
+    def record(
+        self,
+        agent: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+        estimated: bool = False,
+        document: Optional[str] = None,
+        revision: int = 0
+    ):
+        record = UsageRecord(agent, document, revision, prompt_tokens, completion_tokens, latency, estimated)
+        with self._lock:
+            self.records.append(record)
+        LLM_TOKENS.labels(agent=agent, kind="prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(agent=agent, kind="completion").inc(completion_tokens)
+        LLM_CALLS.labels(agent=agent).inc()
+        LLM_LATENCY.labels(agent=agent).observe(latency)
+
+    def _cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return round(
+            prompt_tokens / 1_000_000 * self.input_cost_per_mtok
+            + completion_tokens / 1_000_000 * self.output_cost_per_mtok,
+            6
+        )
+
+    def _aggregate(self, records: List[UsageRecord], key) -> Dict[Any, Dict[str, Any]]:
+        groups: Dict[Any, Dict[str, Any]] = OrderedDict()
+        for record in records:
+            group = groups.setdefault(key(record), {
+                "calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "latency": 0.0,
+                "estimated_calls": 0
+            })
+            group["calls"] += 1
+            group["prompt_tokens"] += record.prompt_tokens
+            group["completion_tokens"] += record.completion_tokens
+            group["latency"] = round(group["latency"] + record.latency, 3)
+            group["estimated_calls"] += 1 if record.estimated else 0
+        for group in groups.values():
+            group["cost"] = self._cost(group["prompt_tokens"], group["completion_tokens"])
+        return groups
+
+    def summary(self, document: Optional[str] = None) -> Dict[str, Any]:
+        """Usage totals and breakdowns, optionally restricted to one document"""
+        with self._lock:
+            records = [r for r in self.records if document is None or r.document == document]
+        totals = self._aggregate(records, key=lambda record: "total").get("total", {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "latency": 0.0, "estimated_calls": 0, "cost": 0.0
+        })
+        return {
+            "totals": totals,
+            "by_agent": self._aggregate(records, key=lambda record: record.agent),
+            "by_revision": {
+                str(revision): usage
+                for revision, usage in self._aggregate(records, key=lambda record: record.revision).items()
+            },
+            "by_document": {
+                str(doc): usage
+                for doc, usage in self._aggregate(records, key=lambda record: record.document).items()
+            }
+        }
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [asdict(record) for record in self.records]
+
+
+@contextmanager
+def usage_revision(revision: int):
+    """Attribute usage in the enclosed code to a review revision attempt"""
+    scope = _current_scope.get()
+    if scope is None:
+        yield
+        return
+    token = _current_scope.set(_UsageScope(scope.ledger, scope.document, revision))
+    try:
+        yield
+    finally:
+        _current_scope.reset(token)
+
+
+def record_usage(agent: str, prompt_tokens: int, completion_tokens: int, latency: float, estimated: bool = False):
+    """Record one LLM call on the active ledger; a no-op when none is active"""
+    scope = _current_scope.get()
+    if scope is None:
+        return
+    scope.ledger.record(
+        agent,
+        prompt_tokens,
+        completion_tokens,
+        latency,
+        estimated=estimated,
+        document=scope.document,
+        revision=scope.revision
+    )
@@ -0,0 +1,226 @@
+"""Compact run artifacts: one gzip-compressed NDJSON file per flush of runs.
+
+Every string of BLOB_MIN_CHARS or more is stored once per file as a blob
+record and referenced by hash, so agent outputs that reappear inside later
+agents' sources are not written again. Dict keys starting with "$" are
+escaped with a second "$", so a {"$blob": ...} reference never collides
+with result data. The report and run-log text views are rendered from an
+artifact on demand:
+
+    python -m src.utils.artifacts artifacts/runs_20250101_120000_1.ndjson.gz --view report
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# v2: "$" keys in result dicts are escaped
+ARTIFACT_VERSION = 2
+BLOB_MIN_CHARS = 256
+OUTPUT_STAGES = ["reader_output", "analyzer_output", "final_report", "review_output"]
+MODELS = ["claude"]
+
+
+def _escape_key(key: Any) -> Any:
+    return "$" + key if isinstance(key, str) and key.startswith("$") else key
+
+
+def _unescape_key(key: str) -> str:
+    return key[1:] if key.startswith("$$") else key
+
+
+def _pack(value: Any, blobs: Dict[str, str]) -> Any:
+    """Replace long strings with blob references, collecting the blobs"""
+    if isinstance(value, str) and len(value) >= BLOB_MIN_CHARS:
+        blob_id = hashlib.sha1(value.encode("utf-8")).hexdigest()
+        blobs.setdefault(blob_id, value)
+        return {"$blob": blob_id}
+    if isinstance(value, dict):
+        return {_escape_key(key): _pack(item, blobs) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_pack(item, blobs) for item in value]
+    return value
+
+
+def _unpack(value: Any, blobs: Dict[str, str], escaped: bool = True) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1 and "$blob" in value:
+            return blobs[value["$blob"]]
+        return {
+            (_unescape_key(key) if escaped else key): _unpack(item, blobs, escaped)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_unpack(item, blobs, escaped) for item in value]
+    return value
+
+
+def encode_runs(runs: List[Tuple[str, Optional[str], Dict[str, Any]]]) -> Iterator[str]:
+    """NDJSON lines for a batch of (run_id, document, results)"""
+    written = set()
+    for run_id, document, results in runs:
+        yield json.dumps({
+            "kind": "run",
+            "version": ARTIFACT_VERSION,
+            "run_id": run_id,
+            "document": document,
+            "created_at": datetime.now().isoformat()
+        })
+        for key, value in results.items():
+            if value is None:
+                continue
+            blobs: Dict[str, str] = {}
+            packed = _pack(value, blobs)
+            for blob_id, text in blobs.items():
+                if blob_id not in written:
+                    written.add(blob_id)
+                    yield json.dumps({"kind": "blob", "id": blob_id, "text": text}, ensure_ascii=False)
+            yield json.dumps({"kind": "output", "run_id": run_id, "key": key, "data": packed}, ensure_ascii=False)
+
+
+def write_artifact(path: str, runs: List[Tuple[str, Optional[str], Dict[str, Any]]]) -> str:
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        for line in encode_runs(runs):
+            f.write(line + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_artifact(path: str) -> Dict[str, Dict[str, Any]]:
+    """Results per run_id, with blob references resolved"""
+    blobs: Dict[str, str] = {}
+    runs: Dict[str, Dict[str, Any]] = {}
+    versions: Dict[str, int] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            kind = record["kind"]
+            if kind == "blob":
+                blobs[record["id"]] = record["text"]
+            elif kind == "run":
+                runs[record["run_id"]] = {"run_id": record["run_id"], "document": record["document"]}
+                versions[record["run_id"]] = record.get("version", 1)
+            elif kind == "output":
+                escaped = versions[record["run_id"]] >= 2
+                runs[record["run_id"]][record["key"]] = _unpack(record["data"], blobs, escaped)
+    return runs
+
+
+def report_text(final_report: Dict[str, Any], model: str = "claude") -> str:
+    """Plain-text report view (the former implementation_report_*.txt layout)"""
+    report = final_report.get(model, {})
+    lines = [
+        "=" * 80,
+        f"TECHNICAL IMPLEMENTATION REPORT ({model.upper()})",
+        "=" * 80,
+        "",
+        report.get("content", ""),
+        "",
+        "=" * 80,
+        "METADATA AND SOURCES",
+        "=" * 80,
+        ""
+    ]
+    if "sources" in report:
+        lines.append("## Sources and Dependencies\n")
+        lines.append(json.dumps(report["sources"], indent=2, ensure_ascii=False))
+    return "\n".join(lines)
+
+
+def run_log_text(results: Dict[str, Any]) -> str:
+    """Plain-text log of every agent response (the former run_log_*.txt layout)"""
+    lines = ["RUN LOG", "=" * 80, ""]
+    labels = {
+        "reader_output": "Reader Agent Response:",
+        "analyzer_output": "Analyzer Agent Response:",
+        "final_report": "Report Agent Response:"
+    }
+    for model in MODELS:
+        lines.append(f"Model: {model.upper()}")
+        lines.append("-" * 80)
+        for key, label in labels.items():
+            output = results.get(key) or {}
+            if model in output:
+                lines.append(label)
+                lines.append(output[model].get("content", "") + "\n")
+        lines.append("=" * 80 + "\n")
+    return "\n".join(lines)
+
+
+class ArtifactStore:
+    """Buffers run results and writes them as compact artifacts off the event loop.
+
+    Every run added before a flush goes into the same file and shares its
+    blobs; main.py adds a single run and closes the store.
+    """
+
+    def __init__(self, artifacts_dir: str):
+        self.artifacts_dir = artifacts_dir
+        self.paths: Dict[str, str] = {}  # run_id -> artifact path
+        self._pending: List[Tuple[str, Optional[str], Dict[str, Any]]] = []
+        self._lock = asyncio.Lock()
+        self._files = 0
+
+    async def add(self, run_id: str, results: Dict[str, Any], document: Optional[str] = None):
+        """Queue one run's results until the next flush"""
+        async with self._lock:
+            self._pending.append((run_id, document, results))
+
+    async def flush(self) -> Optional[str]:
+        async with self._lock:
+            return await self._flush_locked()
+
+    async def _flush_locked(self) -> Optional[str]:
+        if not self._pending:
+            return None
+        runs, self._pending = self._pending, []
+        self._files += 1
+        os.makedirs(self.artifacts_dir, exist_ok=True)
+        path = os.path.join(
+            self.artifacts_dir,
+            f"runs_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self._files}.ndjson.gz"
+        )
+        try:
+            await run_blocking(write_artifact, path, runs)
+        except Exception as e:
+            # Keep the runs queued so a later flush or close can still save them
+            self._pending = runs + self._pending
+            logger.error(f"Error writing run artifact: {str(e)}")
+            raise
+        for run_id, _, _ in runs:
+            self.paths[run_id] = path
+        logger.info(f"Saved {len(runs)} run(s) to {path} ({os.path.getsize(path)} bytes)")
+        return path
+
+    async def close(self) -> Optional[str]:
+        return await self.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render text views of a run artifact")
+    parser.add_argument("path")
+    parser.add_argument("--run", help="Run id (defaults to every run in the file)")
+    parser.add_argument("--view", choices=["report", "log"], default="report")
+    args = parser.parse_args()
+
+    for run_id, results in load_artifact(args.path).items():
+        if args.run and run_id != args.run:
+            continue
+        if args.view == "report":
+            print(report_text(results.get("final_report") or {}))
+        else:
+            print(run_log_text(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG = Histogram(
+    'swarmrag_event_loop_lag_seconds',
+    'Delay between when a loop callback was due and when it ran',
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+
+
+class BlockingExecutor:
+    """Runs blocking work off the event loop.
+
+    run_blocking uses a thread pool for blocking I/O and native code that
+    releases the GIL (PyMuPDF, FAISS, HTTP embedding calls); the caller's
+    context variables are copied in so tracing spans and usage accounting
+    still attach to the right run. run_cpu uses a process pool for pure
+    Python CPU work; its function and arguments must be picklable and it
+    falls back to the thread pool when process_workers is 0.
+    """
+
+    def __init__(self, thread_workers: int = 8, process_workers: int = 0):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def threads(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    max_workers=self.thread_workers,
+                    thread_name_prefix="swarm-blocking"
+                )
+            return self._threads
+
+    @property
+    def processes(self) -> Optional[ProcessPoolExecutor]:
+        if self.process_workers <= 0:
+            return None
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._processes
+
+    async def run_blocking(self, func: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self.threads, call)
+
+    async def run_cpu(self, func: Callable, *args) -> Any:
+        processes = self.processes
+        if processes is None:
+            return await self.run_blocking(func, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(processes, func, *args)
+
+    def run_cpu_sync(self, func: Callable, *args) -> Any:
+        """run_cpu for code already running in a worker thread"""
+        processes = self.processes
+        if processes is None:
+            return func(*args)
+        return processes.submit(func, *args).result()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._threads is not None:
+                self._threads.shutdown(wait=wait)
+                self._threads = None
+            if self._processes is not None:
+                self._processes.shutdown(wait=wait)
+                self._processes = None
+
+
+_default_executor: Optional[BlockingExecutor] = None
+_default_lock = threading.Lock()
+
+
+def _env_workers(name: str, default: int, minimum: int) -> int:
+    """Worker count from the environment, falling back to default when unset or invalid"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return max(minimum, int(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}; using {default}")
+        return default
+
+
+def get_executor() -> BlockingExecutor:
+    """Process-wide executor shared by pipelines and the API.
+
+    Sized by EXECUTOR_THREAD_WORKERS (default 8) and EXECUTOR_PROCESS_WORKERS
+    (default 0, threads only), read straight from the environment so this
+    module does not pull in the config package and its database drivers.
+    """
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = BlockingExecutor(
+                thread_workers=_env_workers("EXECUTOR_THREAD_WORKERS", 8, minimum=1),
+                process_workers=_env_workers("EXECUTOR_PROCESS_WORKERS", 0, minimum=0)
+            )
+        return _default_executor
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    return await get_executor().run_blocking(func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable, *args) -> Any:
+    return await get_executor().run_cpu(func, *args)
+
+
+class LoopLagMonitor:
+    """Measures event loop responsiveness by timing a periodic sleep.
+
+    Any delay beyond the requested interval is time the loop spent running
+    something else without yielding. Lag above threshold is logged.
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.recent_lag = 0.0  # Exponentially weighted, for callers adapting to current load
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.perf_counter() - expected))
+
+    def record(self, lag: float):
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        self.recent_lag = lag if self.samples == 1 else 0.8 * self.recent_lag + 0.2 * lag
+        EVENT_LOOP_LAG.observe(lag)
+        if lag > self.threshold:
+            self.stalls += 1
+            logger.warning(f"Event loop stalled for {lag * 1000:.0f} ms")
+
+    def start(self):
+        """Sample on the running loop.
+
+        A long-lived monitor (e.g. the shared compressor's) outlives event
+        loops, so a task that has ended or belongs to another loop is
+        replaced rather than left to freeze recent_lag.
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._abandon()
+        self._task = loop.create_task(self._run())
+
+    def _abandon(self):
+        """Drop a task that cannot be awaited here, cancelling it on its own loop"""
+        task, self._task = self._task, None
+        if task is not None and not task.done() and not task.get_loop().is_closed():
+            task.get_loop().call_soon_threadsafe(task.cancel)
+
+    async def stop(self):
+        if self._task is not None and self._task.get_loop() is not asyncio.get_running_loop():
+            self._abandon()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "mean_lag_ms": round(self.total_lag / self.samples * 1000, 2) if self.samples else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stalls": self.stalls
+        }
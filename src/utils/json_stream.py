@@ -0,0 +1,177 @@
+import json
+import re
+from typing import Any, Dict, Optional, Tuple
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PYTHON_LITERAL_RE = re.compile(r"\b(True|False|None)\b")
+_BOOLEAN_VALUE_RE = re.compile(r"\s*([\"']?)(true|false)\1(?!\w)", re.IGNORECASE)
+
+
+class SchemaError(ValueError):
+    """Raised when a parsed object does not match the expected schema"""
+
+
+def loads_tolerant(text: str) -> Any:
+    """json.loads, retrying with trailing commas and Python literals repaired"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        repaired = _TRAILING_COMMA_RE.sub(r"\1", text)
+        repaired = _PYTHON_LITERAL_RE.sub(lambda m: _PYTHON_LITERALS[m.group(1)], repaired)
+        return json.loads(repaired)
+
+
+class JSONObjectStream:
+    """Finds and parses the first JSON object in incrementally fed model output.
+
+    Text before the object (prose, code fences) is skipped. Braces are
+    tracked outside of strings, so the object is parsed the moment it closes
+    instead of after the whole response. A candidate that fails to parse is
+    dropped and scanning resumes after its opening brace. Top-level keys are
+    tracked the same way, so scan_boolean never reads a field out of a
+    nested object or a string value.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.result: Optional[Dict[str, Any]] = None
+        self._start: Optional[int] = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._arrays = 0
+        self._reset_fields()
+
+    def _reset_fields(self):
+        self._string_start: Optional[int] = None
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._value_start = 0
+        self._booleans: Dict[str, bool] = {}
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    @property
+    def partial(self) -> str:
+        """Text of the object seen so far ('' before it starts)"""
+        return self.buffer[self._start:] if self._start is not None else ""
+
+    def feed(self, text: str) -> Optional[Dict[str, Any]]:
+        """Add output text; returns the object once it is complete"""
+        if self.done:
+            return self.result
+        self.buffer += text
+        while self._pos < len(self.buffer) and not self.done:
+            char = self.buffer[self._pos]
+            self._pos += 1
+            if self._start is None:
+                if char == "{":
+                    self._start, self._depth = self._pos - 1, 1
+                continue
+            top_level = self._depth == 1 and self._arrays == 0
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if top_level:
+                        self._last_string = self.buffer[self._string_start:self._pos]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos - 1
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end_field()
+                    self._close()
+            elif self._depth == 1 and char == "[":
+                self._arrays += 1
+            elif self._depth == 1 and char == "]":
+                self._arrays = max(0, self._arrays - 1)
+            elif top_level and char == ":":
+                self._key = self._decode_key(self._last_string)
+                self._value_start = self._pos
+            elif top_level and char == ",":
+                self._end_field()
+        return self.result
+
+    @staticmethod
+    def _decode_key(raw: Optional[str]) -> Optional[str]:
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return raw.strip('"')
+
+    def _current_boolean(self, end: Optional[int] = None) -> Optional[bool]:
+        match = _BOOLEAN_VALUE_RE.match(self.buffer, self._value_start, len(self.buffer) if end is None else end)
+        return match.group(2).lower() == "true" if match else None
+
+    def _end_field(self):
+        """Record the top-level value that just ended if it is a boolean"""
+        if self._key is not None:
+            value = self._current_boolean(self._pos - 1)
+            if value is not None:
+                self._booleans[self._key] = value
+        self._key = self._last_string = None
+
+    def _close(self):
+        candidate = self.buffer[self._start:self._pos]
+        try:
+            value = loads_tolerant(candidate)
+        except json.JSONDecodeError:
+            value = None
+        if isinstance(value, dict):
+            self.result = value
+            return
+        # Not valid JSON (e.g. braces in prose); rescan from just after this brace
+        self._pos = self._start + 1
+        self._start = None
+        self._in_string = self._escaped = False
+        self._arrays = 0
+        self._reset_fields()
+
+    def scan_boolean(self, key: str) -> Optional[bool]:
+        """Value of a top-level boolean field if it has already been streamed"""
+        if self.done:
+            value = self.result.get(key)
+            return value if isinstance(value, bool) else None
+        if key in self._booleans:
+            return self._booleans[key]
+        if self._key == key and self._depth == 1 and self._arrays == 0 and not self._in_string:
+            return self._current_boolean()
+        return None
+
+
+def validate_schema(data: Dict[str, Any], schema: Dict[str, Tuple[type, bool, Any]]) -> Dict[str, Any]:
+    """Check data against {field: (type, required, default)}, filling defaults.
+
+    Unknown fields are kept; a scalar where a list is expected is wrapped.
+    """
+    validated = dict(data)
+    for field, (expected, required, default) in schema.items():
+        if field not in data or data[field] is None:
+            if required:
+                raise SchemaError(f"Missing required field '{field}'")
+            validated[field] = default() if callable(default) else default
+            continue
+        value = data[field]
+        if expected is bool and isinstance(value, str) and value.lower() in ("true", "false"):
+            value = value.lower() == "true"
+        elif expected is list and not isinstance(value, list):
+            value = [value]
+        elif expected is str and not isinstance(value, str):
+            value = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+        if not isinstance(value, expected):
+            raise SchemaError(f"Field '{field}' should be {expected.__name__}, got {type(value).__name__}")
+        validated[field] = value
+    return validated
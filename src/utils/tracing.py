@@ -0,0 +1,150 @@
+import json
+import itertools
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+_current_tracer: ContextVar[Optional["Tracer"]] = ContextVar("current_tracer", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# Numeric attributes summed per span name in the summary table
+SUMMARY_COUNTERS = ["tokens_in", "tokens_out", "llm_calls", "chunks", "cache_hits"]
+
+
+class Span:
+    """A timed unit of pipeline work with numeric and descriptive attributes"""
+
+    def __init__(self, span_id: int, name: str, parent_id: Optional[int], attributes: Dict[str, Any]):
+        self.span_id = span_id
+        self.name = name
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self._perf_start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: float = 1):
+        """Increment a numeric attribute"""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._perf_start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Stand-in when no tracer is active, so instrumentation costs nothing"""
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def add(self, key: str, amount: float = 1):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Collects spans for one pipeline run"""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+
+    @contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        """Make this tracer current for the enclosed code (and tasks it spawns)"""
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        parent = _current_span.get()
+        span = Span(next(self._ids), name, parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.finish()
+            _current_span.reset(token)
+            self.spans.append(span)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Aggregate spans by name, in first-started order"""
+        rows: Dict[str, Dict[str, Any]] = OrderedDict()
+        for span in sorted(self.spans, key=lambda s: s.span_id):
+            row = rows.setdefault(span.name, {"name": span.name, "count": 0, "total_s": 0.0, "errors": 0})
+            row["count"] += 1
+            row["total_s"] += span.duration or 0.0
+            row["errors"] += 1 if span.error else 0
+            for counter in SUMMARY_COUNTERS:
+                value = span.attributes.get(counter)
+                if isinstance(value, (int, float)):
+                    row[counter] = row.get(counter, 0) + value
+        for row in rows.values():
+            row["mean_s"] = row["total_s"] / row["count"]
+        return list(rows.values())
+
+    def format_summary(self) -> str:
+        """Render the summary as a fixed-width text table"""
+        columns = ["name", "count", "total_s", "mean_s"] + SUMMARY_COUNTERS + ["errors"]
+        rows = self.summary()
+        table = [columns]
+        for row in rows:
+            cells = []
+            for column in columns:
+                value = row.get(column, "")
+                if isinstance(value, float):
+                    value = f"{value:.3f}" if column.endswith("_s") else f"{value:.0f}"
+                cells.append(str(value))
+            table.append(cells)
+        widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+        lines = ["  ".join(cell.ljust(width) for cell, width in zip(line, widths)) for line in table]
+        lines.insert(1, "  ".join("-" * width for width in widths))
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        """Write spans as JSON lines, followed by a summary record"""
+        with open(path, "w", encoding="utf-8") as f:
+            for span in sorted(self.spans, key=lambda s: s.span_id):
+                f.write(json.dumps({"run_id": self.run_id, **span.to_dict()}) + "\n")
+            f.write(json.dumps({"run_id": self.run_id, "summary": self.summary()}) + "\n")
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _current_tracer.get()
+
+
+@contextmanager
+def trace_span(name: str, **attributes):
+    """Record a span on the active tracer; a no-op when tracing is off"""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield _NOOP_SPAN
+        return
+    with tracer.span(name, **attributes) as span:
+        yield span
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+from src.utils.accounting import UsageLedger, extract_usage, record_usage, usage_revision
+
+
+def test_usage_ledger_breakdowns():
+    """Test per-agent, per-revision and per-document aggregation"""
+    ledger = UsageLedger(input_cost_per_mtok=3.0, output_cost_per_mtok=15.0)
+
+    with ledger.activate(document="doc.pdf"):
+        record_usage("Reader Agent", 1000, 200, 1.5)
+        with usage_revision(1):
+            record_usage("Review Agent", 3000, 100, 2.0, estimated=True)
+    record_usage("Reader Agent", 10, 10, 0.1)  # No active ledger: ignored
+
+    summary = ledger.summary("doc.pdf")
+    assert summary["totals"]["calls"] == 2
+    assert summary["totals"]["prompt_tokens"] == 4000
+    assert summary["by_agent"]["Review Agent"]["estimated_calls"] == 1
+    assert set(summary["by_revision"]) == {"0", "1"}
+    assert summary["totals"]["cost"] == round(4000 * 3.0 / 1e6 + 300 * 15.0 / 1e6, 6)
+    assert ledger.summary("other.pdf")["totals"]["calls"] == 0
+
+
+def test_extract_usage_from_message_metadata():
+    """Test reading provider-reported usage from an LLM result"""
+    message = SimpleNamespace(usage_metadata={"input_tokens": 12, "output_tokens": 34})
+    result = SimpleNamespace(generations=[[SimpleNamespace(message=message)]], llm_output=None)
+    assert extract_usage(result) == (12, 34)
+
+    legacy = SimpleNamespace(generations=[[SimpleNamespace()]], llm_output={"usage": {"input_tokens": 5, "output_tokens": 6}})
+    assert extract_usage(legacy) == (5, 6)
@@ -22,4 +22,35 @@ async def test_base_agent():
         agent = TestAgent(mock_config)
         result = await agent.process("test input")
         assert result is not None
-        assert result["result"] == "test input"
\ No newline at end of file
+        assert result["result"] == "test input"
+
+def test_review_verdict_stream_short_circuits_on_approval():
+    """Streaming stops once needs_revision is false; revisions wait for the full object"""
+    from src.agents.review_agent import ReviewVerdictStream
+
+    approval = ReviewVerdictStream()
+    assert approval.feed('```json\n{"needs_revision": false,') is True
+    assert approval.verdict()["critical_issues"] == []
+
+    revision = ReviewVerdictStream()
+    assert revision.feed('{"needs_revision": true, "critical_issues": ["a"') is False
+    assert revision.feed('], "recommendations": ["b"]}') is True
+    assert revision.verdict()["recommendations"] == ["b"]
+
+@pytest.mark.asyncio
+async def test_review_verdict_errors_are_not_retried():
+    """A response without a valid verdict fails the review at once instead of repeating the call"""
+    from src.agents.review_agent import ReviewVerdictError
+    from src.coordinator import SwarmCoordinator
+
+    coordinator = SwarmCoordinator.__new__(SwarmCoordinator)
+    coordinator.retry_config = {'max_retries': 3, 'delay': 0, 'backoff': 1, 'non_retryable': (ReviewVerdictError,)}
+    calls = []
+
+    async def review(context):
+        calls.append(context)
+        raise ReviewVerdictError("No JSON verdict found in review response")
+
+    with pytest.raises(ReviewVerdictError):
+        await coordinator.execute_with_retry('review', review, {})
+    assert len(calls) == 1
@@ -0,0 +1,104 @@
+import asyncio
+import gzip
+
+import pytest
+
+from src.utils import artifacts
+from src.utils.artifacts import ArtifactStore, load_artifact, report_text, run_log_text
+
+
+def make_results(tag):
+    reader = f"reader analysis {tag} " * 40
+    report = f"## Executive Summary\nreport {tag} " * 20
+    return {
+        "reader_output": {"type": "reader_analysis", "claude": {"content": reader, "sources": []}},
+        "final_report": {
+            "type": "implementation_report",
+            "claude": {"content": report, "sources": {"reader": reader}}
+        },
+        "review_output": None,
+        "usage": {"totals": {"calls": 3}}
+    }
+
+
+def test_artifact_round_trip_stores_repeated_text_once(tmp_path):
+    """Text repeated in sources is written once and restored on load"""
+    store = ArtifactStore(str(tmp_path))
+    results = make_results("a")
+
+    async def run():
+        await store.add("run-1", results, document="doc.pdf")
+        return await store.close()
+
+    path = asyncio.run(run())
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        raw = f.read()
+    assert raw.count("reader analysis a") == 40
+
+    loaded = load_artifact(path)["run-1"]
+    assert loaded["document"] == "doc.pdf"
+    assert loaded["final_report"] == results["final_report"]
+    assert "TECHNICAL IMPLEMENTATION REPORT (CLAUDE)" in report_text(loaded["final_report"])
+    assert "Reader Agent Response:" in run_log_text(loaded)
+
+
+def test_runs_added_before_a_flush_share_one_file(tmp_path):
+    """Runs are buffered until flushed; each flush writes one file"""
+    store = ArtifactStore(str(tmp_path))
+
+    async def run():
+        await store.add("run-1", make_results("a"))
+        await store.add("run-2", make_results("b"))
+        first = await store.flush()
+        await store.add("run-3", make_results("c"))
+        return first, await store.close()
+
+    first, second = asyncio.run(run())
+    assert set(load_artifact(first)) == {"run-1", "run-2"}
+    assert set(load_artifact(second)) == {"run-3"}
+    assert store.paths["run-2"] == first
+
+
+def test_result_dicts_that_look_like_blob_references_round_trip(tmp_path):
+    """User data with "$" keys is escaped rather than mistaken for a blob"""
+    results = {
+        "analyzer_output": {
+            "claude": {"$blob": "not-a-hash", "text": "x" * 300},
+            "meta": {"$$already": 1, "$ref": {"$blob": "also user data"}}
+        }
+    }
+    store = ArtifactStore(str(tmp_path))
+
+    async def run():
+        await store.add("run-1", results)
+        return await store.close()
+
+    loaded = load_artifact(asyncio.run(run()))["run-1"]
+    assert loaded["analyzer_output"] == results["analyzer_output"]
+
+
+def test_failed_write_keeps_runs_queued_for_the_next_flush(tmp_path, monkeypatch):
+    """A run whose artifact write fails is saved by a later close instead of being dropped"""
+    store = ArtifactStore(str(tmp_path))
+    real_run_blocking = artifacts.run_blocking
+    attempts = []
+
+    async def flaky_run_blocking(func, *args):
+        attempts.append(func)
+        if len(attempts) == 1:
+            raise OSError("disk full")
+        return await real_run_blocking(func, *args)
+
+    monkeypatch.setattr(artifacts, "run_blocking", flaky_run_blocking)
+
+    async def run():
+        await store.add("run-1", make_results("a"))
+        with pytest.raises(OSError):
+            await store.flush()
+        await store.add("run-2", make_results("b"))
+        return await store.close()
+
+    path = asyncio.run(run())
+    assert list(load_artifact(path)) == ["run-1", "run-2"]
+    assert store.paths == {"run-1": path, "run-2": path}
@@ -0,0 +1,405 @@
+import asyncio
+import gc
+import json
+import logging
+import uuid
+
+import pytest
+from starlette.testclient import TestClient
+
+from src.api.middleware.asgi import ForwardedResponse, MiddlewareStack, call_app, scope_state
+from src.api.middleware.cache_middleware import ASGICacheMiddleware
+from src.api.middleware.logging_middleware import ASGILoggingMiddleware
+from src.api.middleware.metrics_middleware import ASGIMetricsMiddleware
+from src.api.middleware.rate_limiter import ASGIRateLimiter
+from src.api.middleware.request_validator import ASGIRequestValidationMiddleware
+from src.api.middleware.response_middleware import ASGIResponseFormattingMiddleware
+from src.api.middleware.security_middleware import ASGISecurityMiddleware
+from src.api.middleware.timeout_middleware import ASGITimeoutMiddleware
+
+JSON_CHUNKS = (b'{"name": "widget", ', b'"count": 3}')
+
+
+def chunked_app(chunks=JSON_CHUNKS, content_type="application/json", status=200, delay=0.0):
+    """Raw ASGI app that sends its body in several messages, optionally pausing before each"""
+    async def app(scope, receive, send):
+        await asyncio.sleep(delay)
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (b"content-type", content_type.encode())
+        ]})
+        for index, chunk in enumerate(chunks):
+            await asyncio.sleep(delay)
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+
+    return app
+
+
+def echo_app(content_type="application/json"):
+    """Raw ASGI app that reads the request body and sends it back"""
+    async def app(scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type.encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def with_lifespan(app):
+    """Raw ASGI app that also answers the lifespan messages TestClient sends"""
+    async def wrapped(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                await send({"type": f"{message['type']}.complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+        await app(scope, receive, send)
+
+    return wrapped
+
+
+class Recorder:
+    """Outermost layer that records the body messages leaving the stack"""
+
+    def __init__(self, app):
+        self.app = app
+        self.bodies = []
+
+    async def __call__(self, scope, receive, send):
+        self.bodies = []
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.body":
+                self.bodies.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+@pytest.fixture
+def serve():
+    """serve(layer, app, **options) -> (client, layer instance, recorder) for a one-layer stack"""
+    clients = []
+
+    def serve(layer, app, **options):
+        stack = MiddlewareStack().add(Recorder).add(layer, **options)
+        client = TestClient(stack.build(with_lifespan(app)))
+        client.__enter__()
+        clients.append(client)
+        return client, stack.get(layer.__name__), stack.get("Recorder")
+
+    yield serve
+    for client in clients:
+        client.__exit__(None, None, None)
+
+
+def forwarded(recorder, chunks=JSON_CHUNKS):
+    """Whether the app's messages reached the client one by one rather than as a rebuilt body"""
+    return recorder.bodies == list(chunks)
+
+
+@pytest.mark.asyncio
+async def test_call_app_buffers_or_forwards_on_the_start_message():
+    """Test that call_app streams to send unless buffer_if asks for the body"""
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    response = await call_app(chunked_app(), {"type": "http"}, None, send, lambda status, headers: False)
+    assert isinstance(response, ForwardedResponse)
+    assert [message.get("body") for message in sent[1:]] == list(JSON_CHUNKS)
+
+    sent.clear()
+    response = await call_app(chunked_app(), {"type": "http"}, None, send, lambda status, headers: True)
+    assert sent == []
+    assert response.body == b"".join(JSON_CHUNKS)
+    assert (await call_app(chunked_app(), {"type": "http"}, None)).status_code == 200
+
+
+def test_cache_buffers_cacheable_reads_and_forwards_the_rest(serve):
+    """Test that only GET 200/5xx non-stream responses are buffered by the cache"""
+    client, _, recorder = serve(ASGICacheMiddleware, chunked_app())
+    response = client.get("/products")
+    assert (response.headers["x-cache"], response.json()) == ("MISS", {"name": "widget", "count": 3})
+    assert not forwarded(recorder)
+    assert client.get("/products").headers["x-cache"] == "HIT"
+
+    for app, method in [
+        (chunked_app(content_type="text/event-stream"), "GET"),
+        (chunked_app(status=404), "GET"),
+        (chunked_app(), "POST")
+    ]:
+        client, _, recorder = serve(ASGICacheMiddleware, app)
+        response = client.request(method, "/products")
+        assert "x-cache" not in response.headers
+        assert forwarded(recorder)
+
+
+def test_security_forwards_json_with_headers_and_cookie(serve):
+    """Test that non-HTML responses stream through with security headers and a CSRF cookie"""
+    client, security, recorder = serve(ASGISecurityMiddleware, chunked_app(), secret_key="secret")
+    response = client.get("/api/v1/projects")
+
+    assert forwarded(recorder)
+    assert response.headers["x-frame-options"] == "DENY"
+    assert "csrf_token=" in response.headers["set-cookie"]
+    assert len(security.csrf_tokens) == 1
+
+
+def test_security_cleans_html_and_resends_it_with_headers(serve):
+    """Test that HTML is buffered, cleaned and re-sent with a matching length and the security headers"""
+    html = (b"<p>hi</p><script>alert(1)</script>", b'<a onclick="steal()" href="javascript:x">link</a>')
+    client, _, recorder = serve(ASGISecurityMiddleware, chunked_app(html, "text/html"), secret_key="secret")
+    response = client.get("/page")
+
+    assert not forwarded(recorder, html)
+    assert response.text == '<p>hi</p><a  href="x">link</a>'
+    assert int(response.headers["content-length"]) == len(response.content)
+    assert response.headers["content-type"] == "text/html"
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert "csrf_token=" in response.headers["set-cookie"]
+
+
+def test_security_cleans_html_in_its_declared_charset(serve):
+    """Test that non-UTF-8 HTML is cleaned in its own charset and undecodable bytes do not fail the response"""
+    latin1 = ("<p>caf\xe9</p><script>x</script>".encode("latin-1"),)
+    client, _, _ = serve(ASGISecurityMiddleware, chunked_app(latin1, "text/html; charset=iso-8859-1"), secret_key="s")
+    response = client.get("/page")
+    assert response.content == "<p>caf\xe9</p>".encode("latin-1")
+
+    client, _, _ = serve(ASGISecurityMiddleware, chunked_app((b"<p>\xff</p>",), "text/html"), secret_key="s")
+    response = client.get("/page")
+    assert response.status_code == 200
+    assert response.text == "<p>\ufffd</p>"
+
+
+def test_security_rejects_before_calling_the_app(serve):
+    """Test that CSRF failures and exhausted rate limits are answered without running the app"""
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await chunked_app()(scope, receive, send)
+
+    client, _, _ = serve(ASGISecurityMiddleware, app, secret_key="secret", rate_limit_tokens=2)
+    assert client.post("/api/v1/projects", json={}).status_code == 403
+    assert client.get("/api/v1/projects").status_code == 200
+    assert client.get("/api/v1/projects").json() == {"detail": "Rate limit exceeded"}
+    assert calls == ["/api/v1/projects"]
+
+
+def test_response_formatting_envelopes_json_and_forwards_the_rest(serve):
+    """Test that JSON is buffered into the envelope while other types stream through"""
+    client, formatter, recorder = serve(ASGIResponseFormattingMiddleware, chunked_app())
+    response = client.get("/api/v1/projects")
+    body = response.json()
+
+    assert not forwarded(recorder)
+    assert (body["success"], body["data"]) == (True, {"name": "widget", "count": 3})
+    assert body["metadata"]["version"] == "1.0.0"
+    assert response.headers["etag"].startswith('W/"')
+    assert client.get("/api/v1/projects", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+    text = (b"plain ", b"text")
+    client, _, recorder = serve(ASGIResponseFormattingMiddleware, chunked_app(text, "text/plain"))
+    assert client.get("/notes").text == "plain text"
+    assert forwarded(recorder, text)
+
+
+def test_response_formatting_wraps_errors(serve):
+    """Test that error JSON becomes the envelope's error field"""
+    client, formatter, _ = serve(ASGIResponseFormattingMiddleware, chunked_app((b'{"detail": "missing"}',), status=404))
+    body = client.get("/api/v1/projects/1").json()
+    assert (body["success"], body["data"]) == (False, None)
+    assert body["error"] == {"detail": "missing", "status_code": 404}
+    assert formatter.stats["error_responses"] == 1
+
+
+def test_timeout_sends_504_only_before_the_response_started(serve):
+    """Test that a stalled app gets a 504 but a response already on the wire is cut off instead"""
+    client, timeout, _ = serve(ASGITimeoutMiddleware, chunked_app(delay=1.0), timeout=0.05, grace_period=0.05)
+    response = client.get("/slow")
+    assert response.status_code == 504
+    assert response.json()["error"] == "Request timeout"
+
+    async def started_then_stalled(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"partial", "more_body": True})
+        await asyncio.sleep(1.0)
+        await send({"type": "http.response.body", "body": b" never sent"})
+
+    client, timeout, recorder = serve(ASGITimeoutMiddleware, started_then_stalled, timeout=0.05, grace_period=0.05)
+    assert client.get("/stream").status_code == 200
+    assert recorder.bodies == [b"partial"]  # No 504 and nothing after the deadline
+    assert timeout.stats["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_timeout_retrieves_failures_of_apps_outliving_the_grace_period():
+    """Test that an app failing after the grace period is not reported as an unretrieved task exception"""
+    finished = asyncio.Event()
+
+    async def slow_to_cancel(scope, receive, send):
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.1)  # Cleanup outlasts the grace period
+            finished.set()
+            raise RuntimeError("cleanup failed")
+
+    async def send(message):
+        pass
+
+    loop = asyncio.get_running_loop()
+    reported = []
+    loop.set_exception_handler(lambda loop, context: reported.append(context))
+    try:
+        middleware = ASGITimeoutMiddleware(slow_to_cancel, timeout=0.05, grace_period=0.01)
+        await middleware({"type": "http", "method": "GET", "path": "/slow", "headers": []}, None, send)
+        await finished.wait()
+        await asyncio.sleep(0)
+        gc.collect()
+    finally:
+        loop.set_exception_handler(None)
+
+    assert reported == []
+    assert middleware.stats["timeouts"] == 1
+
+
+def test_timeout_forwards_fast_responses_and_exposes_the_deadline(serve):
+    """Test that requests within their deadline stream through with the timeout in request state"""
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen.update(scope_state(scope))
+        await chunked_app()(scope, receive, send)
+
+    client, timeout, recorder = serve(ASGITimeoutMiddleware, app, timeout={"/api": 5, "default": 1})
+    assert client.get("/api/v1/projects").status_code == 200
+    assert forwarded(recorder)
+    assert seen["timeout"] == 5
+    assert timeout.stats["timeouts"] == 0
+
+
+def test_rate_limiter_injects_headers_into_the_forwarded_response(serve):
+    """Test that limit headers ride on the start message and the body is not buffered"""
+    client, limiter, recorder = serve(ASGIRateLimiter, chunked_app(), requests_per_minute=2)
+    first = client.get("/api/v1/projects")
+    second = client.get("/api/v1/projects")
+
+    assert forwarded(recorder)
+    assert (first.headers["x-ratelimit-limit"], first.headers["x-ratelimit-remaining"]) == ("2", "1")
+    assert second.headers["x-ratelimit-remaining"] == "0"
+    assert int(first.headers["x-ratelimit-reset"]) > 0
+
+    limited = client.get("/api/v1/projects")
+    assert limited.status_code == 429
+    assert limited.json()["retry_after"] == limiter.expire_time
+    assert "x-ratelimit-limit" not in limited.headers
+    assert client.get("/api/v1/projects", headers={"X-Forwarded-For": "10.0.0.9"}).status_code == 200
+
+
+def test_logging_records_bodies_as_they_pass(serve, caplog):
+    """Test that request and JSON response bodies are logged from the streamed messages, masked"""
+    client, _, recorder = serve(ASGILoggingMiddleware, echo_app())
+    with caplog.at_level(logging.INFO, logger="src.api.middleware.logging_middleware"):
+        response = client.post("/login", json={"user": "ann", "password": "hunter2"})
+
+    assert response.json() == {"user": "ann", "password": "hunter2"}
+    assert len(recorder.bodies) == 1
+    entry = json.loads(caplog.records[-1].getMessage())
+    assert json.loads(entry["request_body"]) == {"user": "ann", "password": "********"}
+    assert json.loads(entry["response_body"]) == {"user": "ann", "password": "********"}
+    assert entry["response_status"] == 200
+    uuid.UUID(entry["request_id"])
+
+
+def test_logging_skips_non_json_bodies_and_truncates(serve, caplog):
+    """Test that other content types are not logged and large bodies are capped"""
+    client, _, recorder = serve(ASGILoggingMiddleware, echo_app("text/plain"), max_body_length=10)
+    with caplog.at_level(logging.INFO, logger="src.api.middleware.logging_middleware"):
+        response = client.post("/upload", content=b"z" * 50, headers={"content-type": "text/plain"})
+
+    assert response.content == recorder.bodies[0] == b"z" * 50
+    entry = json.loads(caplog.records[-1].getMessage())
+    assert entry["request_body"] == "z" * 10 + "... (truncated)"
+    assert entry["response_body"] == ""
+
+
+def test_metrics_count_status_and_size_without_buffering(serve):
+    """Test that status and bytes are read from the forwarded messages"""
+    client, metrics, recorder = serve(ASGIMetricsMiddleware, chunked_app(status=201), app_name=f"test_{uuid.uuid4().hex}")
+    client.post("/api/v1/projects")
+
+    assert forwarded(recorder)
+    last = metrics.recent_requests[-1]
+    assert (last["status"], last["size"]) == ("201", sum(len(chunk) for chunk in JSON_CHUNKS))
+    assert metrics.status_codes == {"201": 1}
+    assert client.get("/metrics").status_code == 200
+    assert metrics.endpoint_usage == {"/api/v1/projects": 1}
+
+
+def test_metrics_record_app_errors(serve):
+    """Test that exceptions are counted and re-raised"""
+    async def broken(scope, receive, send):
+        raise RuntimeError("boom")
+
+    client, metrics, _ = serve(ASGIMetricsMiddleware, broken, app_name=f"test_{uuid.uuid4().hex}")
+    with pytest.raises(RuntimeError):
+        client.get("/api/v1/projects")
+    assert metrics.errors == {"RuntimeError": 1}
+
+
+def test_request_validator_tags_forwarded_responses_with_the_request_id(serve):
+    """Test that the request id reaches the app and the response headers without buffering"""
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen.update(scope_state(scope))
+        await chunked_app()(scope, receive, send)
+
+    client, _, recorder = serve(ASGIRequestValidationMiddleware, app)
+    response = client.get("/api/v1/projects")
+
+    assert forwarded(recorder)
+    assert response.headers["x-request-id"] == seen["request_id"]
+
+
+def test_request_validator_rejects_bad_type_and_size(serve):
+    """Test 415 and 413 answers for writes the app never sees"""
+    client, _, _ = serve(ASGIRequestValidationMiddleware, chunked_app(), max_content_length=10)
+    assert client.post("/api/v1/projects", content=b"x", headers={"content-type": "text/plain"}).status_code == 415
+    too_large = client.post("/api/v1/projects", json={"name": "a long project name"})
+    assert too_large.status_code == 413
+    assert too_large.json()["error"] == "Payload Too Large"
+
+
+def test_full_stack_composes_every_layer():
+    """Test one request through the layers in their production order"""
+    stack = (
+        MiddlewareStack()
+        .add(ASGIMetricsMiddleware, app_name=f"test_{uuid.uuid4().hex}")
+        .add(ASGILoggingMiddleware)
+        .add(ASGIRequestValidationMiddleware)
+        .add(ASGIRateLimiter)
+        .add(ASGISecurityMiddleware, secret_key="secret")
+        .add(ASGITimeoutMiddleware, timeout=5)
+        .add(ASGIResponseFormattingMiddleware)
+        .add(ASGICacheMiddleware)
+    )
+    with TestClient(stack.build(with_lifespan(chunked_app()))) as client:
+        first = client.get("/api/v1/projects")
+        second = client.get("/api/v1/projects")
+
+    assert first.json()["data"] == {"name": "widget", "count": 3}
+    assert first.json()["metadata"]["request_id"] == first.headers["x-request-id"]
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("MISS", "HIT")
+    assert first.headers["x-frame-options"] == "DENY"
+    assert second.headers["x-ratelimit-remaining"] == "58"
+    assert stack.get("ASGIMetricsMiddleware").status_codes == {"200": 2}
@@ -0,0 +1,151 @@
+import time
+
+from src.api.middleware.byte_cache import ENTRY_OVERHEAD_BYTES, ByteBudgetCache, entry_size
+
+
+def make_entry(size=1000, ttl=60, **extra):
+    """Entry whose entry_size is exactly size bytes"""
+    entry = {"content": b"x" * (size - ENTRY_OVERHEAD_BYTES), "expire_time": time.time() + ttl}
+    entry.update(extra)
+    return entry
+
+
+def test_entry_size_counts_body_variants_headers_and_tags():
+    """Test that every stored byte is charged to the entry"""
+    entry = make_entry(variants={"br": b"b" * 10, "gzip": b"g" * 20}, headers={"etag": "abc"})
+    assert entry_size(entry) == 1000 + 30 + len("etag") + len("abc")
+    assert entry_size(dict(entry, tags=["products"])) > entry_size(entry)
+
+
+def test_cheap_entries_are_evicted_before_expensive_or_hot_ones():
+    """Test GDSF order: priority grows with hits and backend cost"""
+    cache = ByteBudgetCache(max_bytes=3000, max_entry_bytes=3000)
+    cache.set("cheap", make_entry(), cost=0.1)
+    cache.set("costly", make_entry(), cost=1.0)
+    cache.set("hot", make_entry(), cost=1.0)
+    for _ in range(3):
+        cache.get("hot")
+
+    assert cache.set("new", make_entry(), cost=1.0)
+    assert set(cache.keys()) == {"costly", "hot", "new"}
+
+    assert cache.set("newer", make_entry(), cost=1.0)
+    assert set(cache.keys()) == {"hot", "new", "newer"}
+    assert cache.stats["evictions"] == 2
+
+
+def test_clock_rises_to_each_evicted_priority():
+    """Test that evictions age the cache so idle entries eventually lose to new ones"""
+    cache = ByteBudgetCache(max_bytes=2000, max_entry_bytes=2000)
+    cache.set("a", make_entry(), cost=1.0)
+    cache.set("b", make_entry(), cost=2.0)
+    evicted_priority = cache._meta["a"][0]
+
+    cache.set("c", make_entry(), cost=1.0)
+
+    assert "a" not in cache
+    assert cache._clock == evicted_priority
+    assert cache._meta["c"][0] == evicted_priority + 1.0 / 1000
+
+
+def test_new_entry_is_rejected_rather_than_displace_higher_priority_ones():
+    """Test that admission never evicts an entry that outranks the newcomer"""
+    cache = ByteBudgetCache(max_bytes=2000, max_entry_bytes=2000)
+    cache.set("a", make_entry(), cost=10.0)
+    cache.set("b", make_entry(), cost=10.0)
+
+    assert not cache.set("c", make_entry(), cost=0.01)
+    assert not cache.set("huge", make_entry(size=2001), cost=100.0)
+    assert set(cache.keys()) == {"a", "b"}
+    assert cache.stats["rejected"] == 2
+    assert cache.stats["evictions"] == 0
+
+
+def test_rejected_replacement_keeps_the_current_entry():
+    """Test that a refresh that cannot be admitted does not drop the entry it was meant to replace"""
+    cache = ByteBudgetCache(max_bytes=3000, max_entry_bytes=2000)
+    current = make_entry()
+    cache.set("a", current, cost=10.0)
+    cache.set("b", make_entry(), cost=10.0)
+    cache.set("c", make_entry(), cost=10.0)
+
+    assert not cache.set("a", make_entry(size=1500), cost=0.001)
+    assert not cache.set("a", make_entry(size=2001), cost=10.0)
+
+    assert cache.get("a") is current
+    assert cache.bytes_used == 3000
+    assert cache.stats["rejected"] == 2
+
+
+def test_replacement_reuses_its_own_bytes_and_keeps_its_hits():
+    """Test that replacing an entry in a full cache evicts nothing and carries its hit count"""
+    cache = ByteBudgetCache(max_bytes=2000, max_entry_bytes=2000)
+    cache.set("a", make_entry(), cost=1.0)
+    cache.set("b", make_entry(), cost=1.0)
+    cache.get("a")
+
+    refreshed = make_entry()
+    assert cache.set("a", refreshed, cost=1.0)
+
+    assert cache.get("a") is refreshed
+    assert "b" in cache
+    assert cache.stats["evictions"] == 0
+    assert cache._meta["a"][1] == 3
+
+
+def test_bytes_used_tracks_every_mutation():
+    """Test byte accounting across insert, replace, pop, expiry and clear"""
+    cache = ByteBudgetCache(max_bytes=10000, max_entry_bytes=5000)
+    cache.set("a", make_entry(1000))
+    cache.set("b", make_entry(2000))
+    cache.set("expired", make_entry(1500, ttl=-1))
+    assert cache.bytes_used == 4500 == sum(cache.size_of(key) for key in cache)
+
+    cache.set("a", make_entry(1200))
+    assert cache.bytes_used == 4700
+
+    cache.pop("b")
+    assert cache.bytes_used == 2700
+
+    assert cache.expire() == 1
+    assert cache.bytes_used == 1200 == cache.size_of("a")
+
+    cache.clear()
+    assert cache.bytes_used == 0
+    assert len(cache) == 0
+
+
+def test_resize_reaccounts_bytes_and_evicts_when_over_budget():
+    """Test that growing an entry in place is charged and pushes out the lowest-priority entry"""
+    cache = ByteBudgetCache(max_bytes=2500, max_entry_bytes=2500)
+    cache.set("cold", make_entry(), cost=0.1)
+    cache.set("warm", make_entry(), cost=1.0)
+
+    cache._entries["warm"]["variants"] = {"br": b"b" * 200}
+    cache.resize("warm")
+    assert cache.size_of("warm") == 1200
+    assert cache.bytes_used == 2200
+
+    cache._entries["warm"]["variants"]["gzip"] = b"g" * 400
+    cache.resize("warm")
+    assert "cold" not in cache
+    assert cache.bytes_used == 1600 == cache.size_of("warm")
+
+    cache.resize("missing")
+    assert cache.bytes_used == 1600
+
+
+def test_outdated_heap_items_are_skipped_and_rebuilt():
+    """Test lazy heap deletion: repeated hits leave stale items that neither win eviction nor grow the heap"""
+    cache = ByteBudgetCache(max_bytes=2000, max_entry_bytes=2000)
+    cache.set("hot", make_entry(), cost=1.0)
+    cache.set("cold", make_entry(), cost=1.0)
+
+    for _ in range(500):
+        cache.get("hot")
+    assert len(cache._heap) <= 4 * len(cache._meta) + 64
+
+    cache.pop("cold")
+    cache.set("other", make_entry(), cost=1.0)
+    assert cache.set("new", make_entry(), cost=1.0)
+    assert set(cache.keys()) == {"hot", "new"}
@@ -0,0 +1,387 @@
+import asyncio
+import gzip
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import brotli
+import pytest
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.api.middleware import cache_backends
+from src.api.middleware.asgi import MiddlewareStack
+from src.api.middleware.cache_backends import SQLiteCacheBackend
+from src.api.middleware.byte_cache import entry_size
+from src.api.middleware.cache_middleware import ASGICacheMiddleware, CacheMiddleware
+from src.api.middleware.compression_middleware import AdaptiveCompressor
+
+
+def make_request(path="/products", method="GET", headers=None, query=""):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+        "scheme": "http",
+        "root_path": "",
+    }
+    return Request(scope)
+
+
+class Backend:
+    """call_next stand-in that counts calls and can be slowed down or failed"""
+
+    def __init__(self, body=b'{"items": [1, 2, 3]}', delay=0.0, status_code=200):
+        self.body = body
+        self.delay = delay
+        self.status_code = status_code
+        self.calls = 0
+
+    async def __call__(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return Response(content=self.body, status_code=self.status_code, media_type="application/json")
+
+
+def age_entries(cache):
+    """Move every cached entry past its TTL; stale windows are left as they are"""
+    for _, entry in cache.cache.items():
+        entry["expire_time"] = time.time() - 1
+
+
+def versioned_app(path="/products"):
+    """Starlette app whose response version increases on every backend call"""
+    calls = {"count": 0}
+
+    async def endpoint(request):
+        calls["count"] += 1
+        return JSONResponse({"version": calls["count"]})
+
+    return Starlette(routes=[Route(path, endpoint, methods=["GET", "PUT"])]), calls
+
+
+def projects_app():
+    """Project API whose GET returns the current version and PUT bumps it"""
+    state = {"version": 1}
+
+    async def project(request):
+        if request.method == "PUT":
+            state["version"] += 1
+        return JSONResponse({"id": request.path_params["project_id"], "version": state["version"]})
+
+    return Starlette(routes=[Route("/api/v1/projects/{project_id}", project, methods=["GET", "PUT"])]), state
+
+
+class RacingBackend(SQLiteCacheBackend):
+    """SQLite L2 that runs before_entry_write (once) just before an entry is written"""
+
+    before_entry_write = None
+
+    def set(self, key, value, ex=None):
+        if key.startswith("entry:") and self.before_entry_write is not None:
+            hook, self.before_entry_write = self.before_entry_write, None
+            hook()
+        return super().set(key, value, ex)
+
+
+async def asgi_call(app, method, path, on_last_body=None):
+    """Drive an ASGI app directly; on_last_body runs when the final body chunk reaches the client"""
+    scope = make_request(path, method).scope
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and not message.get("more_body") and on_last_body:
+            await on_last_body()
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], headers, body
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+async def cache_factory():
+    caches = []
+
+    def make(middleware_class=CacheMiddleware, *args, **options):
+        cache = middleware_class(*args, **options)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        if cache._cleanup_task is not None:
+            cache._cleanup_task.cancel()
+        for task in list(cache._refresh_tasks):
+            task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_backend_call(cache_factory):
+    """Test that identical concurrent misses are answered by a single fetch"""
+    cache = cache_factory()
+    backend = Backend(delay=0.05)
+
+    responses = await asyncio.gather(*(cache(make_request(), backend) for _ in range(5)))
+
+    assert backend.calls == 1
+    assert sorted(response.headers["X-Cache"] for response in responses) == ["COALESCED"] * 4 + ["MISS"]
+    assert {response.body for response in responses} == {backend.body}
+    assert cache.coalesce_stats == {"coalesced": 4, "timeouts": 0, "fallbacks": 0}
+    assert cache.get_cache_stats()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiters_fetch_directly_when_the_leader_produces_no_entry(cache_factory):
+    """Test that an uncacheable leader response makes every waiter call the backend itself"""
+    cache = cache_factory()
+    backend = Backend(delay=0.05, status_code=404)
+
+    responses = await asyncio.gather(*(cache(make_request(), backend) for _ in range(3)))
+
+    assert backend.calls == 3
+    assert [response.status_code for response in responses] == [404] * 3
+    assert cache.coalesce_stats["fallbacks"] == 2
+
+
+@pytest.mark.asyncio
+async def test_waiters_fetch_directly_when_the_leader_fails(cache_factory):
+    """Test that a leader exception is not shared with the waiters"""
+    cache = cache_factory()
+    calls = 0
+
+    async def flaky(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        if calls == 1:
+            raise RuntimeError("backend down")
+        return Response(content=b"ok", media_type="text/plain")
+
+    leader = asyncio.create_task(cache(make_request(), flaky))
+    await asyncio.sleep(0.01)
+    waiter = await cache(make_request(), flaky)
+
+    with pytest.raises(RuntimeError):
+        await leader
+    assert waiter.body == b"ok"
+    assert calls == 2
+    assert cache.coalesce_stats["fallbacks"] == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_stops_waiting_after_coalesce_timeout(cache_factory):
+    """Test that a slow leader does not hold waiters past coalesce_timeout"""
+    cache = cache_factory(coalesce_timeout=0.01)
+    slow = Backend(delay=0.2)
+    fast = Backend(body=b"fast")
+
+    leader = asyncio.create_task(cache(make_request(), slow))
+    await asyncio.sleep(0.01)
+    waiter = await cache(make_request(), fast)
+
+    assert waiter.body == b"fast"
+    assert fast.calls == 1
+    assert cache.coalesce_stats["timeouts"] == 1
+    assert (await leader).headers["X-Cache"] == "MISS"
+
+
+def test_stale_entry_is_served_then_refreshed_in_the_background():
+    """Test that an expired entry is answered STALE and the refreshed body is a HIT"""
+    app, calls = versioned_app()
+    stack = MiddlewareStack().add(ASGICacheMiddleware, ttl=60, stale_while_revalidate=30)
+    with TestClient(stack.build(app)) as client:
+        cache = stack.get("ASGICacheMiddleware")
+        first = client.get("/products")
+        assert (first.headers["x-cache"], first.json()) == ("MISS", {"version": 1})
+
+        age_entries(cache)
+        stale = client.get("/products")
+        assert (stale.headers["x-cache"], stale.json()) == ("STALE", {"version": 1})
+
+        wait_for(lambda: calls["count"] == 2 and not cache._refresh_tasks)
+        refreshed = client.get("/products")
+        assert (refreshed.headers["x-cache"], refreshed.json()) == ("HIT", {"version": 2})
+        assert cache.stale_stats["stale_served"] == 1
+
+
+def test_call_next_variant_revalidates_stale_entries_inline():
+    """Test that under BaseHTTPMiddleware a stale entry is refetched, not refreshed after the request"""
+    app, calls = versioned_app()
+    cache = CacheMiddleware(ttl=60, stale_while_revalidate=30)
+    with TestClient(MiddlewareStack().add_call_next(cache).build(app)) as client:
+        assert client.get("/products").json() == {"version": 1}
+        age_entries(cache)
+
+        revalidated = client.get("/products")
+        assert (revalidated.headers["x-cache"], revalidated.json()) == ("MISS", {"version": 2})
+        assert client.get("/products").headers["x-cache"] == "HIT"
+        assert calls["count"] == 2
+        assert cache.stale_stats["stale_served"] == 0
+        assert not cache._refresh_tasks
+
+
+@pytest.mark.asyncio
+async def test_write_purges_shared_cache_before_the_response_completes(cache_factory, tmp_path):
+    """Test that a read issued as soon as a PUT completes misses on another worker and sees the write"""
+    app, _ = projects_app()
+    l2_url = f"sqlite:///{tmp_path / 'cache.sqlite3'}"
+    writer = cache_factory(ASGICacheMiddleware, app, l2_url=l2_url, l1_sync_interval=0)
+    reader = cache_factory(ASGICacheMiddleware, app, l2_url=l2_url, l1_sync_interval=0)
+    path = "/api/v1/projects/42"
+
+    status, headers, body = await asgi_call(reader, "GET", path)
+    assert (headers["x-cache"], body) == ("MISS", b'{"id":"42","version":1}')
+    assert (await asgi_call(reader, "GET", path))[1]["x-cache"] == "HIT"
+
+    reads = []
+
+    async def read_when_write_completes():
+        reads.append(await asgi_call(reader, "GET", path))
+
+    status, _, _ = await asgi_call(writer, "PUT", path, on_last_body=read_when_write_completes)
+
+    assert status == 200
+    _, headers, body = reads[0]
+    assert (headers["x-cache"], body) == ("MISS", b'{"id":"42","version":2}')
+    assert writer.invalidation_stats["purges"] == 0  # Nothing was cached in the writer's own L1
+    assert (await asgi_call(reader, "GET", path))[1]["x-cache"] == "HIT"
+
+
+@pytest.mark.asyncio
+async def test_entry_written_after_a_concurrent_purge_is_not_served(cache_factory, tmp_path):
+    """Test that a body fetched before another worker's purge but stored after it misses on later reads"""
+    app, state = projects_app()
+    path = tmp_path / "cache.sqlite3"
+    loop = asyncio.get_running_loop()
+    slow_worker = cache_factory(ASGICacheMiddleware, app, l2_backend=RacingBackend(str(path)), l1_sync_interval=0)
+    writer = cache_factory(ASGICacheMiddleware, app, l2_url=f"sqlite:///{path}", l1_sync_interval=0)
+
+    def write_during_store():
+        state["version"] += 1
+        asyncio.run_coroutine_threadsafe(writer.invalidate({"project:42", "projects"}), loop).result()
+
+    slow_worker.l2.before_entry_write = write_during_store
+    _, headers, body = await asgi_call(slow_worker, "GET", "/api/v1/projects/42")
+    assert (headers["x-cache"], body) == ("MISS", b'{"id":"42","version":1}')
+
+    fresh_worker = cache_factory(ASGICacheMiddleware, app, l2_url=f"sqlite:///{path}", l1_sync_interval=0)
+    _, headers, body = await asgi_call(fresh_worker, "GET", "/api/v1/projects/42")
+    assert (headers["x-cache"], body) == ("MISS", b'{"id":"42","version":2}')
+    assert fresh_worker.l2_stats["outdated"] == 1
+
+    _, headers, body = await asgi_call(slow_worker, "GET", "/api/v1/projects/42")
+    assert body == b'{"id":"42","version":2}'
+
+
+@pytest.mark.asyncio
+async def test_shared_tag_sets_expire_after_the_longest_retention(cache_factory, tmp_path, monkeypatch):
+    """Test that tag sets in L2 are dropped once no entry they index can still be alive"""
+    clock = [1000.0]
+    monkeypatch.setattr(cache_backends, "time", SimpleNamespace(time=lambda: clock[0]))
+    app, _ = projects_app()
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"))
+    cache = cache_factory(
+        ASGICacheMiddleware, app, l2_backend=backend, ttl=60, stale_while_revalidate=30,
+        route_policies={r"^/api/v1/projects/": {"ttl": 600}}
+    )
+    assert cache.l2_retention == 631
+
+    await asgi_call(cache, "GET", "/api/v1/projects/42")
+    assert len(backend.smembers("tag:project:42")) == 1
+
+    clock[0] += 630
+    assert len(backend.smembers("tag:project:42")) == 1
+    clock[0] += 2
+    assert backend.purge_expired() >= 2  # The entry and its tag set
+    assert backend.smembers("tag:project:42") == set()
+    assert backend.get("entry:" + next(iter(cache.cache.keys()))) is None
+
+
+COMPRESSIBLE_BODY = json.dumps({"items": [{"id": number, "name": "widget"} for number in range(100)]}).encode()
+
+
+@pytest.mark.asyncio
+async def test_hits_are_served_from_precompressed_variants(cache_factory):
+    """Test that each accepted encoding is compressed once, suffixes the ETag and is charged to the entry"""
+    cache = cache_factory(compressor=AdaptiveCompressor())
+    backend = Backend(body=COMPRESSIBLE_BODY)
+
+    identity = await cache(make_request(), backend)
+    key = next(iter(cache.cache.keys()))
+    identity_size = cache.cache.size_of(key)
+    etag = identity.headers["etag"]
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["vary"] == "Accept-Encoding"
+
+    br = await cache(make_request(headers={"Accept-Encoding": "gzip, br"}), backend)
+    assert br.headers["x-cache"] == "HIT"
+    assert br.headers["content-encoding"] == "br"
+    assert br.headers["etag"] == etag[:-1] + '-br"'
+    assert int(br.headers["content-length"]) == len(br.body) < len(COMPRESSIBLE_BODY)
+    assert brotli.decompress(br.body) == COMPRESSIBLE_BODY
+
+    gz = await cache(make_request(headers={"Accept-Encoding": "gzip"}), backend)
+    assert gz.headers["etag"] == etag[:-1] + '-gzip"'
+    assert gzip.decompress(gz.body) == COMPRESSIBLE_BODY
+
+    entry = cache.cache.get(key)
+    assert cache.cache.size_of(key) == entry_size(entry) == identity_size + len(br.body) + len(gz.body)
+    assert cache.cache.bytes_used == entry_size(entry)
+
+    await cache(make_request(headers={"Accept-Encoding": "br"}), backend)
+    assert backend.calls == 1
+    assert cache.precompress_stats == {"compressed": 2, "served": 3, "identity": 1}
+
+
+@pytest.mark.asyncio
+async def test_variant_etag_answers_conditional_requests_per_encoding(cache_factory):
+    """Test that a client holding the br representation gets a 304 only for br"""
+    cache = cache_factory(compressor=AdaptiveCompressor())
+    backend = Backend(body=COMPRESSIBLE_BODY)
+    br_etag = (await cache(make_request(headers={"Accept-Encoding": "br"}), backend)).headers["etag"]
+
+    not_modified = await cache(make_request(headers={"Accept-Encoding": "br", "If-None-Match": br_etag}), backend)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == br_etag
+
+    other_encoding = await cache(make_request(headers={"Accept-Encoding": "gzip", "If-None-Match": br_etag}), backend)
+    assert other_encoding.status_code == 200
+    assert other_encoding.headers["content-encoding"] == "gzip"
+
+
+@pytest.mark.asyncio
+async def test_incompressible_bodies_are_served_as_identity(cache_factory):
+    """Test that a variant that would not shrink the body is recorded empty and never served"""
+    cache = cache_factory(compressor=AdaptiveCompressor())
+    backend = Backend(body=os.urandom(2000))
+
+    response = await cache(make_request(headers={"Accept-Encoding": "br"}), backend)
+    assert "content-encoding" not in response.headers
+    assert response.body == backend.body
+    assert not response.headers["etag"].endswith('-br"')
+
+    key = next(iter(cache.cache.keys()))
+    assert cache.cache.get(key)["variants"] == {"br": b""}
+    await cache(make_request(headers={"Accept-Encoding": "br"}), backend)
+    assert cache.precompress_stats["compressed"] == 1
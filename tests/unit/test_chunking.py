@@ -0,0 +1,27 @@
+from src.chunking import StructureAwareChunker, TextBlock
+
+
+def test_structure_aware_chunker():
+    """Test chunking on headings with page ranges and heading paths"""
+    blocks = [
+        TextBlock(page=1, text="Project Management", font_size=18.0, bold=True),
+        TextBlock(page=1, text="Intro paragraph about projects.", font_size=10.0, bold=False),
+        TextBlock(page=1, text="Service Areas", font_size=14.0, bold=True),
+        TextBlock(page=1, text="A" * 60, font_size=10.0, bold=False),
+        TextBlock(page=2, text="B" * 60, font_size=10.0, bold=False),
+        TextBlock(page=3, text="Products", font_size=14.0, bold=True),
+        TextBlock(page=3, text="CSP products are selected per project.", font_size=10.0, bold=False),
+    ]
+
+    chunker = StructureAwareChunker(chunk_size=100, chunk_overlap=0)
+    chunks = chunker.chunk(blocks)
+
+    assert [chunk.heading_path for chunk in chunks] == [
+        ("Project Management",),
+        ("Project Management", "Service Areas"),
+        ("Project Management", "Service Areas"),
+        ("Project Management", "Products"),
+    ]
+    assert (chunks[1].page_start, chunks[2].page_end) == (1, 2)
+    assert chunks[3].metadata["heading_path"] == "Project Management > Products"
+    assert chunks[3].metadata["page_start"] == 3
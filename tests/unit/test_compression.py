@@ -0,0 +1,286 @@
+import asyncio
+import gzip
+import json
+import os
+import zlib
+
+import brotli
+import pytest
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.api.middleware import compression_middleware
+from src.api.middleware.asgi import MiddlewareStack
+from src.api.middleware.compression_middleware import AdaptiveCompressor, StreamingCompressionMiddleware
+
+ITEMS = [{"id": number, "name": "widget", "tags": ["a", "b"]} for number in range(100)]
+LINES = [json.dumps(item).encode() + b"\n" for item in ITEMS[:5]]
+RANDOM_BODY = os.urandom(4000)
+
+
+async def json_endpoint(request):
+    return JSONResponse(ITEMS, headers={"etag": '"abc"', "vary": "Origin"})
+
+
+async def weak_etag_endpoint(request):
+    return JSONResponse(ITEMS, headers={"etag": 'W/"abc"'})
+
+
+async def small_endpoint(request):
+    return JSONResponse({"ok": True})
+
+
+async def random_endpoint(request):
+    return Response(RANDOM_BODY, media_type="application/octet-stream")
+
+
+async def encoded_endpoint(request):
+    return Response(gzip.compress(json.dumps(ITEMS).encode()), headers={"content-encoding": "gzip"})
+
+
+async def stream_endpoint(request):
+    async def chunks():
+        for item in ITEMS:
+            yield json.dumps(item).encode()
+
+    total = sum(len(json.dumps(item)) for item in ITEMS)
+    return StreamingResponse(chunks(), media_type="application/json", headers={"content-length": str(total)})
+
+
+async def ndjson_endpoint(request):
+    async def lines():
+        for line in LINES:
+            yield line
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def make_app():
+    return Starlette(routes=[
+        Route("/json", json_endpoint),
+        Route("/weak", weak_etag_endpoint),
+        Route("/small", small_endpoint),
+        Route("/random", random_endpoint),
+        Route("/encoded", encoded_endpoint),
+        Route("/stream", stream_endpoint),
+        Route("/ndjson", ndjson_endpoint),
+        Route("/health", json_endpoint)
+    ])
+
+
+def decode(body, encoding):
+    if encoding == "br":
+        return brotli.decompress(body)
+    return gzip.decompress(body)
+
+
+@pytest.fixture
+def compression():
+    stack = MiddlewareStack().add(StreamingCompressionMiddleware, compressor=AdaptiveCompressor())
+    with TestClient(stack.build(make_app())) as client:
+        yield client, stack.get("StreamingCompressionMiddleware")
+
+
+def get_raw(client, path, encoding):
+    """Response headers and the body exactly as sent (TestClient would otherwise decode it)"""
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+        return response.headers, b"".join(response.iter_raw())
+
+
+@pytest.mark.parametrize("encoding", ["br", "gzip"])
+def test_complete_body_is_compressed_with_length_and_validators(compression, encoding):
+    """Test that a single-message body gets an exact Content-Length, suffixed ETag and merged Vary"""
+    client, middleware = compression
+    headers, body = get_raw(client, "/json", encoding)
+
+    assert headers["content-encoding"] == encoding
+    assert int(headers["content-length"]) == len(body)
+    assert headers["etag"] == f'"abc-{encoding}"'
+    assert headers["vary"] == "Origin, Accept-Encoding"
+    assert json.loads(decode(body, encoding)) == ITEMS
+    assert middleware.compression_stats[encoding] == 1
+
+
+def test_weak_etags_are_left_alone(compression):
+    """Test that only strong validators are made encoding-specific"""
+    client, _ = compression
+    headers, _ = get_raw(client, "/weak", "gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert headers["etag"] == 'W/"abc"'
+
+
+@pytest.mark.parametrize("encoding", ["br", "gzip"])
+def test_streams_drop_content_length_and_decode_whole(compression, encoding):
+    """Test that a multi-message body is compressed incrementally and sent without a length"""
+    client, middleware = compression
+    headers, body = get_raw(client, "/stream", encoding)
+
+    assert headers["content-encoding"] == encoding
+    assert "content-length" not in headers
+    assert decode(body, encoding) == b"".join(json.dumps(item).encode() for item in ITEMS)
+    assert middleware.compression_stats["streamed"] == 1
+
+
+@pytest.mark.parametrize("path, body", [("/small", b'{"ok":true}'), ("/random", RANDOM_BODY)])
+def test_bodies_that_do_not_benefit_pass_through(compression, path, body):
+    """Test that small bodies and bodies compression would grow are sent unchanged"""
+    client, middleware = compression
+    headers, raw = get_raw(client, path, "gzip")
+
+    assert "content-encoding" not in headers
+    assert raw == body
+    assert int(headers["content-length"]) == len(body)
+    assert middleware.compression_stats["uncompressed"] == 1
+
+
+def test_encoded_and_excluded_responses_pass_through(compression):
+    """Test that upstream encodings, excluded paths and clients without Accept-Encoding are untouched"""
+    client, middleware = compression
+    headers, raw = get_raw(client, "/encoded", "br")
+    assert headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(raw)) == ITEMS
+    assert middleware.compression_stats["precompressed"] == 1
+
+    assert "content-encoding" not in get_raw(client, "/health", "br")[0]
+    assert "content-encoding" not in get_raw(client, "/json", "identity")[0]
+
+
+@pytest.mark.parametrize("encoding", ["br", "gzip"])
+@pytest.mark.asyncio
+async def test_ndjson_chunks_are_flushed_as_they_are_sent(encoding):
+    """Test that every sent chunk of an NDJSON stream decodes to complete lines without waiting for the end"""
+    middleware = StreamingCompressionMiddleware(make_app(), compressor=AdaptiveCompressor())
+    decoder = brotli.Decompressor() if encoding == "br" else zlib.decompressobj(31)
+    decoded = []
+
+    async def receive():
+        await asyncio.Event().wait()  # The client never disconnects
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert (b"content-encoding", encoding.encode()) in message["headers"]
+            return
+        if message.get("body"):
+            data = decoder.process(message["body"]) if encoding == "br" else decoder.decompress(message["body"])
+            decoded.append(data)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/ndjson",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", encoding.encode())]
+    }
+    await middleware(scope, receive, send)
+
+    assert decoded[:len(LINES)] == LINES
+
+
+@pytest.mark.asyncio
+async def test_invalid_content_length_is_treated_as_unknown():
+    """Test that a malformed Content-Length falls back to the body size instead of failing the response"""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", b"not-a-number")
+        ]})
+        await send({"type": "http.response.body", "body": json.dumps(ITEMS).encode()})
+
+    middleware = StreamingCompressionMiddleware(app, compressor=AdaptiveCompressor())
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/json", "query_string": b"", "headers": [(b"accept-encoding", b"gzip")]}
+    await middleware(scope, None, send)
+
+    headers = dict(sent[0]["headers"])
+    assert len(headers) == len(sent[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert int(headers[b"content-length"]) == len(sent[1]["body"])
+    assert json.loads(gzip.decompress(sent[1]["body"])) == ITEMS
+    await middleware.compressor.monitor.stop()
+
+
+@pytest.fixture
+def cpu_load(monkeypatch):
+    """Settable load average per core seen by AdaptiveCompressor"""
+    load = [0.0]
+    monkeypatch.setattr(compression_middleware, "_cpu_load", lambda: load[0])
+    return load
+
+
+@pytest.mark.parametrize("lag, load, expected", [
+    (0.0, 0.0, (6, 4)),
+    (0.02, 0.0, (6, 4)),
+    (0.03, 0.0, (3, 2)),
+    (0.0, 0.5, (3, 2)),
+    (0.05, 0.0, (1, 0)),
+    (0.0, 1.2, (1, 0)),
+])
+def test_choose_levels_drop_as_pressure_rises(cpu_load, lag, load, expected):
+    """Test that loop lag or CPU load lowers levels in two steps"""
+    compressor = AdaptiveCompressor()
+    compressor.monitor.recent_lag = lag
+    cpu_load[0] = load
+
+    assert compressor.choose_levels(6, 4) == expected
+    assert compressor.stats["reduced_level"] == (0 if expected == (6, 4) else 1)
+
+
+def test_choose_levels_never_raise_configured_levels(cpu_load):
+    """Test that levels already below the reduced ones are kept and not counted as reduced"""
+    compressor = AdaptiveCompressor()
+    cpu_load[0] = 0.5
+    assert compressor.choose_levels(2, 1) == (2, 1)
+    assert compressor.stats["reduced_level"] == 0
+
+
+@pytest.mark.asyncio
+async def test_large_payloads_are_compressed_off_the_loop():
+    """Test that payloads at the offload threshold run on the pool and both paths are accounted"""
+    compressor = AdaptiveCompressor(offload_threshold=1000)
+    small = json.dumps(ITEMS[:5]).encode()
+    large = json.dumps(ITEMS).encode()
+
+    assert gzip.decompress(await compressor.compress(small, "gzip")) == small
+    assert brotli.decompress(await compressor.compress(large, "br")) == large
+
+    stats = compressor.get_stats()
+    assert (stats["inline"], stats["offloaded"]) == (1, 1)
+    assert stats["bytes_in"] == len(small) + len(large)
+    assert stats["bytes_saved"] == stats["bytes_in"] - stats["bytes_out"] > 0
+    await compressor.monitor.stop()
+
+
+def test_lag_monitor_follows_the_compressor_to_each_new_loop():
+    """Test that a compressor outliving its first event loop keeps sampling lag on the next one"""
+    compressor = AdaptiveCompressor()
+    compressor.monitor.interval = 0.01
+    small = json.dumps(ITEMS[:5]).encode()
+
+    async def compress_and_sample():
+        await compressor.compress(small, "gzip")
+        await asyncio.sleep(0.05)
+        return compressor.monitor._task.get_loop() is asyncio.get_running_loop()
+
+    assert asyncio.run(compress_and_sample())
+    samples = compressor.monitor.samples
+    assert asyncio.run(compress_and_sample())
+    assert compressor.monitor.samples > samples
+
+
+def test_streaming_middleware_uses_fastest_level_under_pressure(cpu_load):
+    """Test that a response compressed under full pressure is encoded at gzip level 1"""
+    stack = MiddlewareStack().add(StreamingCompressionMiddleware, compressor=AdaptiveCompressor())
+    with TestClient(stack.build(make_app())) as client:
+        _, relaxed = get_raw(client, "/json", "gzip")
+        cpu_load[0] = 2.0
+        _, pressured = get_raw(client, "/json", "gzip")
+
+    # The gzip XFL header byte is 4 for the fastest level and 0 for the default one
+    assert (relaxed[8], pressured[8]) == (0, 4)
+    assert json.loads(gzip.decompress(pressured)) == ITEMS
+    assert stack.get("StreamingCompressionMiddleware").compressor.stats["reduced_level"] == 1
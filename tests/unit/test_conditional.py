@@ -0,0 +1,122 @@
+import json
+
+import pytest
+from fastapi import Request
+
+from src.api.middleware.conditional import (
+    compute_etag,
+    etag_matches,
+    find_last_modified,
+    is_not_modified,
+    not_modified_response
+)
+
+ETAG = '"abc123"'
+LAST_MODIFIED = "Tue, 02 Jan 2024 03:04:05 GMT"
+
+
+def make_request(method="GET", headers=None):
+    return Request({
+        "type": "http",
+        "method": method,
+        "path": "/api/v1/projects",
+        "query_string": b"",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+    })
+
+
+def test_compute_etag_is_stable_and_optionally_weak():
+    """Test that equal bodies share a tag and weak tags carry the W/ prefix"""
+    assert compute_etag(b"body") == compute_etag(b"body") != compute_etag(b"other")
+    assert compute_etag(b"body", weak=True) == "W/" + compute_etag(b"body")
+
+
+@pytest.mark.parametrize("if_none_match, etag, expected", [
+    (ETAG, ETAG, True),
+    ('"other"', ETAG, False),
+    ('"other", "abc123"', ETAG, True),
+    ('"other","abc123" , "third"', ETAG, True),
+    ("*", ETAG, True),
+    (" * ", ETAG, True),
+    ('W/"abc123"', ETAG, True),
+    (ETAG, 'W/"abc123"', True),
+    ('W/"other", W/"abc123"', 'W/"abc123"', True),
+    ('"abc"', ETAG, False),
+    (None, ETAG, False),
+    ("", ETAG, False),
+    ("*", None, False),
+])
+def test_etag_matches_uses_weak_comparison(if_none_match, etag, expected):
+    """Test If-None-Match lists, the * wildcard and W/ prefixes"""
+    assert etag_matches(if_none_match, etag) is expected
+
+
+def body(data):
+    return json.dumps(data).encode()
+
+
+@pytest.mark.parametrize("data, expected", [
+    ({"id": 1, "updated_at": "2024-01-02T03:04:05"}, LAST_MODIFIED),
+    ({"id": 1, "updated_at": "2024-01-02T03:04:05.999999Z"}, LAST_MODIFIED),
+    ({"id": 1, "updated_at": "2024-01-02T04:04:05+01:00"}, LAST_MODIFIED),
+    (
+        [{"updated_at": "2023-12-31T00:00:00"}, {"updated_at": "2024-01-02T03:04:05"}, {"updated_at": None}],
+        LAST_MODIFIED
+    ),
+    ({"data": [{"updated_at": "2024-01-02T03:04:05"}], "total": 1}, LAST_MODIFIED),
+    ({"data": {"updated_at": "2024-01-02T03:04:05"}}, LAST_MODIFIED),
+    ({"data": [{"id": 1}], "meta": {"updated_at": "2024-01-02T03:04:05"}}, None),
+    ({"updated_at": "yesterday"}, None),
+    ({"updated_at": 1704164645}, None),
+    (["updated_at", "2024-01-02T03:04:05"], None),
+    ({"id": 1}, None),
+])
+def test_find_last_modified(data, expected):
+    """Test that the latest updated_at is found in objects, lists and data envelopes"""
+    assert find_last_modified(body(data)) == expected
+
+
+def test_find_last_modified_ignores_unparseable_bodies():
+    """Test that non-JSON bodies that mention updated_at yield no validator"""
+    assert find_last_modified(b'"updated_at" is not json') is None
+    assert find_last_modified(b'\xff"updated_at"') is None
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"If-None-Match": ETAG}, True),
+    ({"If-None-Match": '"stale"'}, False),
+    # If-None-Match wins; If-Modified-Since is only a fallback
+    ({"If-None-Match": '"stale"', "If-Modified-Since": "Wed, 03 Jan 2024 00:00:00 GMT"}, False),
+    ({"If-Modified-Since": LAST_MODIFIED}, True),
+    ({"If-Modified-Since": "Wed, 03 Jan 2024 00:00:00 GMT"}, True),
+    ({"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}, False),
+    ({"If-Modified-Since": "not a date"}, False),
+    ({}, False),
+])
+def test_is_not_modified(headers, expected):
+    """Test If-None-Match evaluation and the If-Modified-Since fallback"""
+    assert is_not_modified(make_request(headers=headers), ETAG, LAST_MODIFIED) is expected
+
+
+def test_is_not_modified_needs_a_validator_and_a_safe_method():
+    """Test that writes and responses without Last-Modified are never answered 304"""
+    assert not is_not_modified(make_request("PUT", {"If-None-Match": ETAG}), ETAG, LAST_MODIFIED)
+    assert is_not_modified(make_request("HEAD", {"If-None-Match": ETAG}), ETAG, LAST_MODIFIED)
+    assert not is_not_modified(make_request(headers={"If-Modified-Since": LAST_MODIFIED}), ETAG, None)
+
+
+def test_not_modified_response_keeps_only_validators_and_caching_headers():
+    """Test that a 304 repeats validators but drops the body and content headers"""
+    response = not_modified_response({
+        "ETag": ETAG,
+        "Last-Modified": LAST_MODIFIED,
+        "Cache-Control": "max-age=60",
+        "Vary": "Accept-Encoding",
+        "Content-Type": "application/json",
+        "Content-Length": "42"
+    })
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == ETAG
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "content-type" not in response.headers
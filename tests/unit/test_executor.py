@@ -0,0 +1,71 @@
+import asyncio
+import contextvars
+import time
+
+import pytest
+
+from src.utils import executor as executor_module
+from src.utils.executor import BlockingExecutor, LoopLagMonitor, get_executor, run_blocking, run_cpu
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_run_blocking_keeps_loop_responsive():
+    """Blocking work in the executor leaves the loop free; inline work stalls it"""
+    executor = BlockingExecutor(thread_workers=2)
+
+    async def measure(offload: bool):
+        async with LoopLagMonitor(interval=0.01, threshold=0.1) as monitor:
+            await asyncio.sleep(0.02)
+            if offload:
+                await executor.run_blocking(time.sleep, 0.2)
+            else:
+                time.sleep(0.2)
+            await asyncio.sleep(0.02)
+        return monitor.stats()
+
+    try:
+        assert asyncio.run(measure(offload=True))["stalls"] == 0
+        inline = asyncio.run(measure(offload=False))
+        assert inline["stalls"] == 1 and inline["max_lag_ms"] >= 150
+    finally:
+        executor.shutdown()
+
+
+def test_run_blocking_copies_context_and_run_cpu_uses_processes():
+    """Context variables reach worker threads; CPU work can run in a process pool"""
+    executor = BlockingExecutor(thread_workers=1, process_workers=1)
+
+    async def run():
+        request_id.set("abc")
+        seen = await executor.run_blocking(request_id.get)
+        return seen, await executor.run_cpu(pow, 2, 10)
+
+    try:
+        assert asyncio.run(run()) == ("abc", 1024)
+        assert executor.run_cpu_sync(pow, 3, 2) == 9
+    finally:
+        executor.shutdown()
+
+
+@pytest.fixture
+def fresh_default_executor(monkeypatch):
+    """Drop the process-wide executor so get_executor() is built again from the environment"""
+    monkeypatch.setattr(executor_module, "_default_executor", None)
+    yield
+    if executor_module._default_executor is not None:
+        executor_module._default_executor.shutdown()
+
+
+def test_module_level_helpers_build_the_default_executor_from_env(monkeypatch, fresh_default_executor):
+    """run_blocking/run_cpu go through get_executor(), sized by EXECUTOR_* variables"""
+    monkeypatch.setenv("EXECUTOR_THREAD_WORKERS", "3")
+    monkeypatch.setenv("EXECUTOR_PROCESS_WORKERS", "not a number")
+
+    async def run():
+        return await run_blocking(sum, [1, 2, 3]), await run_cpu(pow, 2, 5)
+
+    assert asyncio.run(run()) == (6, 32)
+    default = get_executor()
+    assert (default.thread_workers, default.process_workers) == (3, 0)
+    assert get_executor() is default
@@ -0,0 +1,45 @@
+import asyncio
+import json
+import math
+
+from src.fake_backends import FakeChatModel, HashEmbeddings, LatencyModel
+
+
+def test_hash_embeddings_are_deterministic_unit_vectors():
+    """Same text gives the same normalized vector; different text differs"""
+    embeddings = HashEmbeddings(dimensions=64)
+    first, second, other = embeddings.embed_documents(["alpha", "alpha", "beta"])
+    assert first == second
+    assert first != other
+    assert len(first) == 64
+    assert math.isclose(sum(v * v for v in first), 1.0, rel_tol=1e-9)
+    assert embeddings.embed_query("alpha") == first
+
+
+def test_latency_model_is_seeded_and_tracks_mean():
+    """Samples are reproducible per seed and average near the configured mean"""
+    samples = [LatencyModel("lognormal", mean=0.5, spread=0.3, seed=7).sample() for _ in range(2)]
+    assert samples[0] == samples[1]
+    model = LatencyModel("lognormal", mean=0.5, spread=0.3, seed=7)
+    mean = sum(model.sample() for _ in range(2000)) / 2000
+    assert abs(mean - 0.5) < 0.05
+    assert LatencyModel("uniform", mean=0.0, spread=1.0).sample() == 0.0
+
+
+def test_fake_chat_model_returns_review_json_and_usage():
+    """Review prompts get the canned verdict; other prompts get section markdown"""
+    model = FakeChatModel(sections=["Summary", "Rules"])
+    review = asyncio.run(model.agenerate([[
+        {"role": "assistant", "content": 'Format: {"needs_revision": true/false}'},
+        {"role": "user", "content": "Report to Review: ..."}
+    ]]))
+    assert json.loads(review.generations[0][0].text)["needs_revision"] is False
+
+    report = asyncio.run(model.agenerate([[
+        {"role": "assistant", "content": "You write reports"},
+        {"role": "user", "content": "Analyze this"}
+    ]]))
+    generation = report.generations[0][0]
+    assert "## Summary" in generation.text and "## Rules" in generation.text
+    assert generation.message.usage_metadata["input_tokens"] == 5
+    assert model.calls == 2
@@ -0,0 +1,65 @@
+import pytest
+
+from src.utils.json_stream import JSONObjectStream, SchemaError, loads_tolerant, validate_schema
+
+
+def feed_in_pieces(stream, text, size=5):
+    for i in range(0, len(text), size):
+        stream.feed(text[i:i + size])
+    return stream.result
+
+
+def test_stream_finds_object_after_prose_and_fences():
+    """Leading prose, code fences and braces inside strings are handled"""
+    text = 'Here is my review:\n```json\n{"needs_revision": true, "notes": "use {x} here"}\n```\nThanks'
+    stream = JSONObjectStream()
+    assert feed_in_pieces(stream, text) == {"needs_revision": True, "notes": "use {x} here"}
+
+
+def test_stream_skips_invalid_candidate_and_repairs_trailing_commas():
+    """A non-JSON brace group is skipped; the next object parses leniently"""
+    stream = JSONObjectStream()
+    result = feed_in_pieces(stream, 'Set {a b} first. {"issues": ["x",], "ok": True,}')
+    assert result == {"issues": ["x"], "ok": True}
+    assert loads_tolerant('[1, 2,]') == [1, 2]
+
+
+def test_scan_boolean_before_object_closes():
+    """A boolean field is visible as soon as it is streamed"""
+    stream = JSONObjectStream()
+    stream.feed('{"needs_revision": false, "critical_issues": [')
+    assert not stream.done
+    assert stream.scan_boolean("needs_revision") is False
+    assert stream.scan_boolean("missing") is None
+
+
+def test_scan_boolean_ignores_strings_and_nested_objects():
+    """Only top-level fields count, not quoted prose or nested objects"""
+    stream = JSONObjectStream()
+    stream.feed('{"feedback": "The draft claims \'needs_revision\': false, which is wrong", ')
+    assert stream.scan_boolean("needs_revision") is None
+    stream.feed('"details": {"needs_revision": false}, "issues": ["needs_revision", false], ')
+    assert stream.scan_boolean("needs_revision") is None
+    stream.feed('"needs_revision": "false alarm", ')
+    assert stream.scan_boolean("needs_revision") is None
+    stream.feed('"needs_revision": true')
+    assert stream.scan_boolean("needs_revision") is True
+    assert stream.scan_boolean("feedback") is None
+
+
+def test_scan_boolean_reads_quoted_and_python_literals():
+    """Lenient boolean spellings are still recognised at the top level"""
+    stream = JSONObjectStream()
+    stream.feed('Review: {"approved": "true", "needs_revision": False')
+    assert stream.scan_boolean("approved") is True
+    assert stream.scan_boolean("needs_revision") is False
+
+
+def test_validate_schema_fills_defaults_and_rejects_bad_types():
+    """Optional fields get defaults, simple coercions apply, required fields are enforced"""
+    schema = {"flag": (bool, True, None), "items": (list, False, list), "note": (str, False, "")}
+    assert validate_schema({"flag": "true", "items": "one"}, schema) == {"flag": True, "items": ["one"], "note": ""}
+    with pytest.raises(SchemaError):
+        validate_schema({"items": []}, schema)
+    with pytest.raises(SchemaError):
+        validate_schema({"flag": 3}, schema)
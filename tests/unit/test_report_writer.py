@@ -0,0 +1,60 @@
+import io
+import pytest
+from src.swarm.agents import ImplementationPlanner, ReportGenerator
+from src.swarm.report_writer import iter_rule_groups
+
+
+def _generator():
+    rules = [
+        {"type": "service_area", "rule": "service area A", "page": 1, "category": "Service Area Management"},
+        {"type": "service_area", "rule": "service area B", "page": 2, "category": "Service Area Management"},
+        {"type": "product", "rule": "CSP list", "page": 2, "category": "Product Management"},
+    ]
+    doc_content = {"page_count": 2, "metadata": {}}
+    return ReportGenerator(doc_content, rules, ImplementationPlanner(rules).create_plan())
+
+
+def test_write_report_streams_same_content():
+    """Test that streaming output matches the joined report"""
+    sink = io.StringIO()
+    lines = _generator().write_report(sink)
+    assert lines > 0
+
+    report = _generator().generate_report()
+    assert sink.getvalue() == report + "\n"
+    assert report.count("### Service Area Management") == 1
+
+
+def test_write_report_can_skip_a_prewritten_summary():
+    """Test that a summary streamed ahead of analysis is not written twice"""
+    sink = io.StringIO()
+    sink.write("\n".join(ReportGenerator.summary_lines({"page_count": 2, "metadata": {}})) + "\n")
+    _generator().write_report(sink, include_summary=False)
+
+    assert sink.getvalue() == _generator().generate_report() + "\n"
+
+
+def test_iter_rule_groups_handles_interleaved_categories():
+    """Test that non-contiguous input still yields one group per category"""
+    rules = iter([
+        {"rule": "a1", "category": "A"},
+        {"rule": "b1", "category": "B"},
+        {"rule": "a2", "category": "A"},
+    ])
+
+    groups = [(category, [rule["rule"] for rule in group]) for category, group in iter_rule_groups(rules)]
+
+    assert groups == [("A", ["a1", "a2"]), ("B", ["b1"])]
+
+
+@pytest.mark.asyncio
+async def test_awrite_report_streams_to_async_sink():
+    """Test streaming to an async sink"""
+    chunks = []
+
+    async def sink(text):
+        chunks.append(text)
+
+    await _generator().awrite_report(sink)
+    assert len(chunks) == 3
+    assert "".join(chunks) == _generator().generate_report() + "\n"
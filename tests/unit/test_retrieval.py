@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+from src.retrieval import RetrievalPostProcessor
+
+
+class FakeVectorStore:
+    """Vector store returning canned (document, distance) results per query"""
+
+    def __init__(self, results):
+        self.results = results
+
+    def similarity_search_with_score(self, query, k=4):
+        return self.results[query][:k]
+
+
+def _doc(text, **metadata):
+    return SimpleNamespace(page_content=text, metadata=metadata)
+
+
+def test_retrieval_deduplicates_across_queries():
+    """Test that overlapping chunks are only kept once"""
+    shared = _doc("Service area mileage must be validated before saving.")
+    near_duplicate = _doc("service area  mileage MUST be validated before saving")
+    store = FakeVectorStore({
+        "q1": [(shared, 0.1), (_doc("Projects have a state code prefix."), 0.5)],
+        "q2": [(near_duplicate, 0.05), (_doc("Products are loaded from CSP tables."), 0.3)]
+    })
+
+    processor = RetrievalPostProcessor(token_budget=1000)
+    result = processor.process(store, ["q1", "q2"])
+
+    assert result.stats["retrieved_chunks"] == 4
+    assert result.stats["unique_chunks"] == 3
+    assert result.stats["tokens_saved"] > 0
+    # The duplicate is attributed to the query that ranked it best
+    assert len(result.chunks_by_query["q2"]) == 2
+    assert processor.format_prompt_context(result).count("Query:") == 2
+
+
+def test_retrieval_respects_token_budget():
+    """Test that MMR selection stops at the token budget"""
+    store = FakeVectorStore({
+        "q": [(_doc(" ".join(["word%d" % i] * 100)), 0.1 * i) for i in range(5)]
+    })
+
+    processor = RetrievalPostProcessor(token_budget=300, k=5)
+    result = processor.process(store, ["q"])
+
+    assert result.stats["selected_tokens"] <= 300
+    assert result.stats["selected_chunks"] == 2
@@ -0,0 +1,23 @@
+import json
+from src.swarm.rule_store import RuleStore
+
+
+def test_rule_store_queries_and_round_trip():
+    """Test grouping, page-range queries and columnar serialization"""
+    store = RuleStore()
+    store.add("service_area", "Service Area Management", "service area A", page=1, offset=10)
+    store.add("product", "Product Management", "CSP produkt ü", page=2)
+    store.add("service_area", "Service Area Management", "service area B", page=3, offset=5)
+
+    assert len(store) == 3
+    assert store.categories() == ["Service Area Management", "Product Management"]
+    assert list(store.group_by_category()["Service Area Management"]) == [0, 2]
+    assert [record.rule for record in store.iter_grouped()] == [
+        "service area A", "service area B", "CSP produkt ü"
+    ]
+    assert [record["page"] for record in store.in_page_range(2, 3)] == [2, 3]
+    assert [record.offset for record in store.by_category("Service Area Management")] == [10, 5]
+
+    restored = RuleStore.from_columns(json.loads(json.dumps(store.to_columns())))
+    assert restored.to_dicts() == store.to_dicts()
+    assert restored.record(1).rule == "CSP produkt ü"
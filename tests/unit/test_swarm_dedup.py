@@ -0,0 +1,101 @@
+from src.swarm import dedup
+from src.swarm.dedup import RuleDeduplicator
+from src.swarm.rule_store import RuleStore
+
+
+def _rule(text, page, rule_type="business_rule", category="Business Rules"):
+    return {"type": rule_type, "rule": text, "page": page, "category": category}
+
+
+def test_rule_deduplicator_clusters_near_duplicates():
+    """Test that near-identical rules collapse with all source pages kept"""
+    text = "The project manager must validate the service area mileage before submitting the request"
+    rules = [
+        _rule(text, 4),
+        _rule("Products are selected from the CSP catalogue for each region", 2),
+        _rule(text + ".", 9),
+        _rule(text.upper(), 7),
+    ]
+
+    representatives, stats = RuleDeduplicator(threshold=0.8).deduplicate(rules)
+
+    assert len(representatives) == 2
+    assert representatives[0]["pages"] == [4, 7, 9]
+    assert representatives[0]["duplicates"] == 2
+    assert stats["compression_ratio"] == 0.5
+
+
+def test_rule_deduplicator_never_merges_across_categories():
+    """Test that identical text in different categories stays in both sections"""
+    text = "The project manager must validate the service area mileage before submitting the request"
+    rules = [
+        _rule(text, 4, "workflow", "Workflow Management"),
+        _rule(text, 9),
+    ]
+
+    representatives, stats = RuleDeduplicator(threshold=0.8).deduplicate(rules)
+
+    assert [rule["category"] for rule in representatives] == ["Workflow Management", "Business Rules"]
+    assert stats["output_rules"] == 2
+
+
+class FixedSignatures:
+    def __init__(self, signatures):
+        self.signatures = signatures
+
+    def signature(self, text):
+        return self.signatures[text]
+
+
+def test_rule_deduplicator_compares_every_cluster_in_a_bucket():
+    """Test that a later rule matching a non-first bucket member still clusters"""
+    deduplicator = RuleDeduplicator(threshold=0.7, num_perm=4, bands=2)
+    # All three share band 0; only b and c are similar enough (0.75)
+    deduplicator.hasher = FixedSignatures({
+        "a": (1, 1, 9, 9),
+        "b": (1, 1, 2, 2),
+        "c": (1, 1, 2, 3),
+    })
+
+    assert deduplicator.cluster(["a", "b", "c"]) == [[0], [1, 2]]
+    assert deduplicator.cluster(["a", "b", "c"], ["x", "x", "y"]) == [[0], [1], [2]]
+
+
+def test_rule_deduplicator_work_is_linear_in_duplicates(monkeypatch):
+    """Test that a bucket full of one cluster costs one comparison per rule, not one per member"""
+    finds = []
+    original_find = dedup._UnionFind.find
+
+    def counting_find(self, item):
+        finds.append(item)
+        return original_find(self, item)
+
+    monkeypatch.setattr(dedup._UnionFind, "find", counting_find)
+    deduplicator = RuleDeduplicator(threshold=0.7, num_perm=4, bands=2)
+    deduplicator.hasher = FixedSignatures({"a": (1, 1, 2, 2)})
+
+    assert deduplicator.cluster(["a"] * 200) == [list(range(200))]
+    assert len(finds) < 10 * 200 * deduplicator.bands
+
+
+def test_rule_deduplicator_keeps_rule_store_compact():
+    """Test that a RuleStore is deduplicated into a RuleStore with merged pages"""
+    text = "Service area mileage must be validated before the project is submitted"
+    store = RuleStore()
+    store.add("business_rule", "Business Rules", text, page=3, offset=12)
+    store.add("business_rule", "Business Rules", "Products come from the CSP catalogue", page=4)
+    store.add("business_rule", "Business Rules", text + ".", page=8)
+
+    deduplicated, stats = RuleDeduplicator(threshold=0.8).deduplicate(store)
+
+    assert isinstance(deduplicated, RuleStore)
+    assert len(deduplicated) == 2
+    merged = deduplicated.record(0)
+    assert (merged.page, merged.offset, merged.pages, merged.duplicates) == (3, 12, [3, 8], 1)
+    assert merged["pages"] == [3, 8]
+    assert deduplicated.record(1).pages is None
+    assert stats["input_rules"] == 3 and stats["output_rules"] == 2
+
+    restored = RuleStore.from_columns(deduplicated.to_columns())
+    assert restored.to_dicts() == deduplicated.to_dicts()
+    assert restored.to_dicts()[0]["pages"] == [3, 8]
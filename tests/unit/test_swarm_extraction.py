@@ -0,0 +1,21 @@
+from src.swarm.extraction import ParagraphRuleExtractor
+
+
+def test_paragraph_rule_extractor():
+    """Test single-pass paragraph classification"""
+    text = (
+        "Intro text.\n\n"
+        "The service area workflow\nmust be approved.\n\n"
+        "CSP products are listed here.\n \n"
+        "Nothing relevant."
+    )
+
+    items = list(ParagraphRuleExtractor().extract(text, page=7))
+    by_category = {item.category: item for item in items}
+
+    assert set(by_category) == {"service_areas", "workflows", "business_rules", "products"}
+    assert by_category["service_areas"].text == "service area workflow\nmust be approved."
+    assert by_category["business_rules"].text == "must be approved."
+    assert by_category["products"].text == "CSP products are listed here."
+    assert text[by_category["products"].offset:].startswith("CSP")
+    assert all(item.page == 7 for item in items)
@@ -0,0 +1,122 @@
+from src.swarm import incremental
+from src.swarm.incremental import IncrementalPageCache, diff_rules
+
+
+class FakePage:
+    rect = "0 0 612 792"
+
+    def __init__(self, text, xobjects=()):
+        self.text = text
+        self.xobjects = list(xobjects)
+        self.parent = None
+
+    def read_contents(self):
+        return self.text.encode()
+
+    def get_text(self):
+        return self.text
+
+    def get_fonts(self, full=False):
+        return []
+
+    def get_images(self, full=False):
+        return []
+
+    def get_xobjects(self):
+        return [(xref, f"Fm{xref}", 0, None) for xref in self.xobjects]
+
+
+class FakeDoc(list):
+    """Pages plus an xref table of {xref: (object source, raw stream)}"""
+
+    metadata = {"title": "fake"}
+
+    def __init__(self, pages, objects=None):
+        super().__init__(pages)
+        self.objects = objects or {}
+        for page in self:
+            page.parent = self
+
+    def xref_object(self, xref, compressed=False):
+        return self.objects[xref][0]
+
+    def xref_is_stream(self, xref):
+        return self.objects[xref][1] is not None
+
+    def xref_stream_raw(self, xref):
+        return self.objects[xref][1]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+def test_incremental_cache_only_reanalyzes_changed_pages(tmp_path, monkeypatch):
+    """Test that unchanged pages are reused from the manifest"""
+    pages = ["page one", "page two", "page three"]
+    monkeypatch.setattr(incremental.fitz, "open", lambda path: FakeDoc(FakePage(t) for t in pages), raising=False)
+    analyzed = []
+
+    def analyze(text):
+        analyzed.append(text)
+        return text.upper()
+
+    cache = IncrementalPageCache(tmp_path / "doc.pdf", namespace="test", cache_dir=tmp_path)
+    first = cache.process(analyze)
+    assert first.changed_pages == [1, 2, 3]
+    assert first.previous_results is None
+
+    pages[:] = ["new first page", "page one", "page three"]
+    analyzed.clear()
+    second = cache.process(analyze)
+
+    assert analyzed == ["new first page"]
+    assert second.changed_pages == [1]
+    assert second.removed_pages == [2]
+    assert second.page_results == ["NEW FIRST PAGE", "PAGE ONE", "PAGE THREE"]
+    assert second.previous_results == ["PAGE ONE", "PAGE TWO", "PAGE THREE"]
+
+
+def test_changed_xobject_invalidates_page(tmp_path, monkeypatch):
+    """Test that revising only a referenced form XObject (or what it references) re-analyzes the page"""
+    objects = {
+        7: ("<</Type/XObject/Subtype/Form/Resources<</Font<</F1 8 0 R>>>>>>", b"BT (logo v1) Tj ET"),
+        8: ("<</Type/Font/Subtype/Type1/BaseFont/Helvetica/ToUnicode 9 1 R>>", None),  # Revised object: generation 1
+        9: ("<</Length 10>>", b"cmap v1"),
+    }
+    monkeypatch.setattr(
+        incremental.fitz, "open",
+        lambda path: FakeDoc([FakePage("same stream", xobjects=[7]), FakePage("other")], dict(objects)),
+        raising=False
+    )
+    analyzed = []
+
+    def analyze(text):
+        analyzed.append(text)
+        return text
+
+    cache = IncrementalPageCache(tmp_path / "doc.pdf", namespace="test", cache_dir=tmp_path)
+    cache.process(analyze)
+
+    analyzed.clear()
+    objects[7] = (objects[7][0], b"BT (logo v2) Tj ET")
+    assert cache.process(analyze).changed_pages == [1]
+
+    analyzed.clear()
+    objects[9] = (objects[9][0], b"cmap v2")
+    assert cache.process(analyze).changed_pages == [1]
+    assert analyzed == ["same stream"]
+
+    assert cache.process(analyze).changed_pages == []
+
+
+def test_diff_rules():
+    """Test added/removed rule detection"""
+    previous = [{"type": "workflow", "rule": "a", "page": 1}, {"type": "workflow", "rule": "b", "page": 2}]
+    current = [{"type": "workflow", "rule": "b", "page": 1}, {"type": "product", "rule": "c", "page": 3}]
+
+    changes = diff_rules(previous, current)
+    assert [rule["rule"] for rule in changes["added"]] == ["c"]
+    assert [rule["rule"] for rule in changes["removed"]] == ["a"]
@@ -0,0 +1,123 @@
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pytest
+
+from src.swarm import page_text
+from src.swarm.page_text import PageTextProvider, page_ranges
+
+
+class FakePage:
+    def __init__(self, text):
+        self.text = text
+
+    def get_text(self):
+        return self.text
+
+
+class FakeDoc(list):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def close(self):
+        pass
+
+
+def open_fake_pdf(path):
+    """Treat form feeds in a text file as page breaks"""
+    with open(path, encoding="utf-8") as f:
+        return FakeDoc(FakePage(text) for text in f.read().split("\f"))
+
+
+@pytest.fixture
+def fake_fitz(monkeypatch):
+    opened = []
+
+    def fake_open(path):
+        opened.append(str(path))
+        return open_fake_pdf(path)
+
+    monkeypatch.setattr(page_text.fitz, "open", fake_open, raising=False)
+    return opened
+
+
+def write_doc(path, pages):
+    path.write_text("\f".join(pages), encoding="utf-8")
+    return path
+
+
+def test_page_ranges_cover_every_page_once():
+    """Test that shards are contiguous and balanced"""
+    assert page_ranges(5, 2) == [(0, 3), (3, 5)]
+    assert page_ranges(2, 8) == [(0, 1), (1, 2)]
+    assert page_ranges(1, 1) == [(0, 1)]
+
+
+def test_pages_are_cached_on_disk_by_md5(tmp_path, fake_fitz):
+    """Test that a second provider for the same bytes reuses the disk cache"""
+    doc = write_doc(tmp_path / "doc.pdf", ["page one", "page two"])
+    cache_dir = tmp_path / "cache"
+
+    first = PageTextProvider(doc, cache_dir=cache_dir)
+    assert first.pages() == ["page one", "page two"]
+    assert first.fingerprint == hashlib.md5(doc.read_bytes()).hexdigest()
+    assert first.cache_path == cache_dir / f"{first.fingerprint}.json"
+    assert first.cache_path.exists()
+    opens_after_miss = len(fake_fitz)
+    assert opens_after_miss > 0
+
+    second = PageTextProvider(doc, cache_dir=cache_dir)
+    assert second.pages() == ["page one", "page two"]
+    assert len(fake_fitz) == opens_after_miss
+
+
+def test_changed_document_misses_the_cache(tmp_path, fake_fitz):
+    """Test that new document bytes are re-extracted under a new key"""
+    doc = write_doc(tmp_path / "doc.pdf", ["page one", "page two"])
+    cache_dir = tmp_path / "cache"
+    original = PageTextProvider(doc, cache_dir=cache_dir)
+    original.pages()
+
+    write_doc(doc, ["page one", "page two revised"])
+    revised = PageTextProvider(doc, cache_dir=cache_dir)
+
+    assert revised.pages() == ["page one", "page two revised"]
+    assert revised.cache_path != original.cache_path
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+
+def test_corrupt_cache_file_is_re_extracted(tmp_path, fake_fitz):
+    """Test that an unreadable cache entry falls back to extraction"""
+    doc = write_doc(tmp_path / "doc.pdf", ["page one"])
+    provider = PageTextProvider(doc, cache_dir=tmp_path / "cache")
+    provider.cache_path.parent.mkdir(parents=True)
+    provider.cache_path.write_text("{not json", encoding="utf-8")
+
+    assert provider.pages() == ["page one"]
+    assert PageTextProvider(doc, cache_dir=tmp_path / "cache")._load_cache() == ["page one"]
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="workers inherit the patched fitz.open only when forked"
+)
+def test_process_pool_extraction_keeps_page_order(tmp_path, fake_fitz, monkeypatch):
+    """Test that sharded extraction across worker processes matches a single pass"""
+    pages = [f"page {number}" for number in range(7)]
+    doc = write_doc(tmp_path / "doc.pdf", pages)
+    monkeypatch.setattr(
+        page_text,
+        "ProcessPoolExecutor",
+        partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("fork"))
+    )
+
+    parallel = PageTextProvider(doc, cache_dir=tmp_path / "parallel", workers=3)
+    sequential = PageTextProvider(doc, cache_dir=tmp_path / "sequential", workers=1)
+
+    assert parallel.pages() == pages
+    assert parallel.pages() == sequential.pages()
@@ -0,0 +1,57 @@
+import fitz
+
+from src.swarm.agents import BusinessAnalyzer, DocumentProcessor
+from src.swarm.parallel import ParallelDocumentAnalyzer, merge_shards
+
+
+def _shard(pages, items):
+    structured_content = {
+        "service_areas": [],
+        "products": [],
+        "workflows": [],
+        "business_rules": []
+    }
+    for category, text, page in items:
+        structured_content[category].append({"text": text, "page": page})
+    doc_content = {
+        "content": "\n".join(pages),
+        "structured_content": structured_content,
+        "page_count": 4,
+        "metadata": {}
+    }
+    return doc_content, BusinessAnalyzer(doc_content).analyze()
+
+
+def test_merge_shards_matches_sequential_order():
+    """Test that merged shard output equals single-pass output"""
+    first = [("products", "CSP list", 1), ("service_areas", "service area A", 2)]
+    second = [("products", "product B", 3), ("service_areas", "service area C", 4)]
+
+    merged_content, merged_rules = merge_shards(
+        [_shard(["p1", "p2"], first), _shard(["p3", "p4"], second)],
+        metadata={"title": "doc"}
+    )
+    sequential_content, sequential_rules = _shard(["p1", "p2", "p3", "p4"], first + second)
+
+    assert merged_rules == sequential_rules
+    assert merged_content["content"] == sequential_content["content"]
+    assert merged_content["structured_content"] == sequential_content["structured_content"]
+    assert merged_content["metadata"] == {"title": "doc"}
+
+
+def test_analyze_matches_sequential_run_with_an_empty_page(tmp_path):
+    """Test that a shard holding only an empty page still contributes its page break"""
+    doc_path = tmp_path / "doc.pdf"
+    doc = fitz.open()
+    for text in ["Product A covers the north service area.", "", "Workflow: approve the product list."]:
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 72), text)
+    doc.save(doc_path)
+    doc.close()
+
+    parallel_content, parallel_rules = ParallelDocumentAnalyzer(doc_path, workers=3).analyze()
+    sequential_content = DocumentProcessor(doc_path).process()
+
+    assert parallel_content == sequential_content
+    assert parallel_rules == BusinessAnalyzer(sequential_content).analyze()
@@ -0,0 +1,34 @@
+import asyncio
+from src.utils.tracing import Tracer, trace_span
+
+
+def test_tracer_records_nested_spans(tmp_path):
+    """Test span nesting, counters and summary output"""
+    tracer = Tracer(run_id="test")
+
+    async def pipeline():
+        with trace_span("agent.reader"):
+            with trace_span("llm.Reader Agent", tokens_in=100, tokens_out=20) as span:
+                span.add("llm_calls")
+            with trace_span("llm.Reader Agent", tokens_in=50, tokens_out=10, llm_calls=1):
+                await asyncio.sleep(0)
+
+    with tracer.activate():
+        asyncio.run(pipeline())
+
+    parent = next(span for span in tracer.spans if span.name == "agent.reader")
+    assert all(span.parent_id == parent.span_id for span in tracer.spans if span is not parent)
+
+    llm_row = next(row for row in tracer.summary() if row["name"] == "llm.Reader Agent")
+    assert (llm_row["count"], llm_row["tokens_in"], llm_row["llm_calls"]) == (2, 150, 2)
+    assert "llm.Reader Agent" in tracer.format_summary()
+
+    trace_path = tmp_path / "trace.jsonl"
+    tracer.write(str(trace_path))
+    assert len(trace_path.read_text().splitlines()) == 4
+
+
+def test_trace_span_is_noop_without_tracer():
+    """Test that instrumentation is inert when no tracer is active"""
+    with trace_span("ingest") as span:
+        span.add("chunks", 3)